@@ -1,10 +1,7 @@
 import os
-import sys
 import json
 import pyodbc
 import requests
-import time
-import threading
 from datetime import timedelta
 from cryptography.fernet import Fernet
 from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
@@ -13,6 +10,11 @@ from sqlalchemy import create_engine
 
 # --- INTERNAL IMPORTS ---
 from extensions import db
+from db_engine import engine_options, read_only_autocommit
+from job_runner import configured_job_limit
+from county_context import generic_import_mode
+from server_control import schedule_restart
+from perf_metrics import init_perf_metrics
 from models import Users 
 from blueprints.auth import auth_bp
 from blueprints.StateManagement import state_mgmt_bp
@@ -35,10 +37,13 @@ from blueprints.InitialPreparation import initial_prep_bp
 from blueprints.InstrumentTypeCorrections import inst_type_bp
 from blueprints.InitialKeliLinkup import initial_linkup_bp
 from blueprints.EDataErrors import edata_errors_bp
+from blueprints.ImportEDataErrors import import_edata_errors_bp
 from blueprints.ReviewLegalTypeOthers import review_legal_bp
 from blueprints.AdditionsCorrections import additions_bp
 from blueprints.MissingNamesCorrections import missing_names_bp
 from blueprints.FinalPreparation import final_prep_bp
+from blueprints.LiveUpdates import live_updates_bp
+from blueprints.BackgroundJobs import jobs_bp
 
 
 app = Flask(__name__)
@@ -77,6 +82,10 @@ try:
     if db_config:
         app.config['SQLALCHEMY_DATABASE_URI'] = get_db_uri(db_config)
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(db_config)
+        app.config['DB_READ_ONLY_AUTOCOMMIT'] = read_only_autocommit(db_config)
+        app.config['JOB_MAX_CONCURRENT'] = configured_job_limit(db_config)
+        app.config['GENERIC_IMPORT_MODE'] = generic_import_mode(db_config)
         db.init_app(app)
 except Exception as e:
     print(f" >>> CONFIG/KEY ERROR: {e}")
@@ -85,10 +94,18 @@ except Exception as e:
     cipher = Fernet(load_key())
     db_config = None
 
+# Whether db_config.json exists, kept in memory so check_db_config does not stat the
+# file on every request (static files, tiles, polls). Set here at startup and by
+# first_time_setup; the config is only read again when the app restarts.
+app.config['DB_CONFIGURED'] = db_config is not None
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 
+# Request and SQL statement timings for the SystemTools performance dashboard
+init_perf_metrics(app)
+
 @login_manager.user_loader
 def load_user(user_id):
     if 'SQLALCHEMY_DATABASE_URI' not in app.config: return None
@@ -111,19 +128,22 @@ app.register_blueprint(patch_bp)
 app.register_blueprint(initial_prep_bp)
 app.register_blueprint(inst_type_bp)
 app.register_blueprint(edata_errors_bp)
+app.register_blueprint(import_edata_errors_bp)
 app.register_blueprint(initial_linkup_bp) 
 app.register_blueprint(review_legal_bp)
 app.register_blueprint(additions_bp)
 app.register_blueprint(missing_names_bp)
 app.register_blueprint(final_prep_bp)
+app.register_blueprint(live_updates_bp)
+app.register_blueprint(jobs_bp)
+
+SETUP_ENDPOINTS = frozenset(('first_time_setup', 'restart_app'))
 
 @app.before_request
 def check_db_config():
-    config_path = os.path.join(app.root_path, 'db_config.json')
-    is_configured = os.path.exists(config_path)
-    allowed_endpoints = ['first_time_setup', 'restart_app']
-    if request.endpoint and ('static' in request.endpoint or request.endpoint in allowed_endpoints): return
-    if not is_configured: return redirect(url_for('first_time_setup'))
+    if app.config['DB_CONFIGURED']: return
+    if request.endpoint and ('static' in request.endpoint or request.endpoint in SETUP_ENDPOINTS): return
+    return redirect(url_for('first_time_setup'))
 
 @app.route('/')
 @login_required
@@ -147,16 +167,13 @@ def first_time_setup():
 
         with open('db_config.json', 'w') as f:
             json.dump({"server": server, "database": database, "user": user, "password": encrypt_password(password)}, f)
+        app.config['DB_CONFIGURED'] = True
         return """<div style="text-align:center;padding:50px;background:#222;color:#fff;"><h1>Saved!</h1><form action="/restart" method="POST"><button type="submit">Restart App</button></form></div>"""
     return render_template('setup.html')
 
 @app.route('/restart', methods=['POST'])
 def restart_app():
-    def restart_job():
-        time.sleep(1) 
-        print(" >>> RESTARTING APPLICATION...")
-        os.execv(sys.executable, [sys.executable] + sys.argv)
-    threading.Thread(target=restart_job).start()
+    schedule_restart(delay=1)
     return """
     <html><head><title>Restarting...</title><meta http-equiv="refresh" content="5;url=/"><style>body{background-color:#222;color:#fff;font-family:sans-serif;display:flex;justify-content:center;align-items:center;height:100vh;margin:0;}.loader{border:4px solid #333;border-top:4px solid #3498db;border-radius:50%;width:40px;height:40px;animation:spin 1s linear infinite;margin:20px auto;}@keyframes spin{0%{transform:rotate(0deg);}100%{transform:rotate(360deg);}}</style></head><body><div style="text-align:center;"><h1>Restarting System</h1><div class="loader"></div><p>Please wait...</p></div></body></html>
     """
@@ -168,4 +185,5 @@ def keep_alive(): return jsonify({'status': 'active'})
 if __name__ == '__main__':
     if not db_config and not os.environ.get("WERKZEUG_RUN_MAIN"):
         print(" !! WARNING: Database not configured. Go to /setup !!")
+    # Development server (reloader, debugger). Production: python wsgi.py
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Per-request overhead of the global check_db_config before_request hook.
+
+Compares the old hook body (os.path.exists('db_config.json') on every request) with
+the in-memory DB_CONFIGURED flag, for a static-file endpoint and an app endpoint.
+Flask is not needed: both hook bodies are reproduced here against a stand-in request.
+
+Pass a directory to stat a file there instead of a temp dir; pointing it at the
+deployment folder (e.g. a network share) shows the cost that matters in production.
+
+Usage: python benchmarks/before_request_hook.py [directory] [iterations]
+"""
+import os
+import sys
+import time
+import tempfile
+
+ALLOWED_ENDPOINTS = ['first_time_setup', 'restart_app']
+SETUP_ENDPOINTS = frozenset(ALLOWED_ENDPOINTS)
+REDIRECT = object()
+
+
+class Request:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+
+def old_hook(root_path, request):
+    config_path = os.path.join(root_path, 'db_config.json')
+    is_configured = os.path.exists(config_path)
+    if request.endpoint and ('static' in request.endpoint or request.endpoint in ALLOWED_ENDPOINTS): return
+    if not is_configured: return REDIRECT
+
+
+def new_hook(config, request):
+    if config['DB_CONFIGURED']: return
+    if request.endpoint and ('static' in request.endpoint or request.endpoint in SETUP_ENDPOINTS): return
+    return REDIRECT
+
+
+def per_call(fn, arg, request, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations): fn(arg, request)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+
+    tmp = None
+    if not directory:
+        tmp = tempfile.TemporaryDirectory()
+        directory = tmp.name
+    created = not os.path.exists(os.path.join(directory, 'db_config.json'))
+    if created:
+        with open(os.path.join(directory, 'db_config.json'), 'w') as f: f.write('{}')
+
+    config = {'DB_CONFIGURED': True}
+    ok = True
+    try:
+        print(f"Directory: {directory}  Iterations: {iterations}")
+        for endpoint in ('static', 'map_viz.get_counties'):
+            request = Request(endpoint)
+            ok = ok and old_hook(directory, request) == new_hook(config, request)
+            t_old = per_call(old_hook, directory, request, iterations)
+            t_new = per_call(new_hook, config, request, iterations)
+            print(f"  {endpoint:<22} stat: {t_old * 1e6:8.3f} us   flag: {t_new * 1e6:8.3f} us   ({t_old / t_new:6.1f}x)")
+
+        # Unconfigured: both must redirect app endpoints and let setup / static through
+        config['DB_CONFIGURED'] = False
+        with tempfile.TemporaryDirectory() as empty:
+            for endpoint in ('static', 'first_time_setup', 'restart_app', 'dashboard', None):
+                ok = ok and old_hook(empty, Request(endpoint)) == new_hook(config, Request(endpoint))
+        print(f"  Same decisions       : {ok}")
+    finally:
+        if created: os.remove(os.path.join(directory, 'db_config.json'))
+        if tmp: tmp.cleanup()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Throughput check for the client-side CSV loader (bulk_loader.bulk_load_csv).
+
+Writes a synthetic Keli-style CSV and loads it into a local SQLite stand-in three ways:
+row-by-row INSERTs (the naive client path), bulk_load_csv in parameter-array batches,
+and a single in-memory executemany (the "file already on the server" ceiling that
+BULK INSERT approximates). Row counts and contents are compared after each load.
+
+With an ODBC connection string (and pyodbc installed) the same file is also loaded into
+SQL Server with BULK INSERT and with bulk_load_csv (fast_executemany). The BULK INSERT
+leg only works when the server can read the generated file's path.
+
+Usage: python benchmarks/bulk_loader.py [rows] ["<odbc connection string>"]
+"""
+import os
+import sys
+import csv
+import time
+import random
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bulk_loader import bulk_load_csv  # noqa: E402
+
+SURNAMES = ['Smith', 'Jones', "O'Brien", 'Lee']
+COLUMNS = ['id', 'book', 'page_number', 'key_id', 'path', 'created', 'name']
+CREATE_SQL = "CREATE TABLE [{table}] ([id] VARCHAR(60), [book] VARCHAR(60), [page_number] INT, [key_id] VARCHAR(60), [path] VARCHAR(300), [created] DATE, [name] VARCHAR(300))"
+
+
+def write_csv(path, rows):
+    rnd = random.Random(7)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f, lineterminator='\n')
+        w.writerow(COLUMNS)
+        for i in range(rows):
+            book = f"{rnd.randint(1, 900):06d}"
+            page = rnd.randint(1, 999)
+            w.writerow([
+                i + 1, book, page, f"{book}-{page}",
+                f"MS{book}/{page:04d}.tif", f"20{rnd.randint(10, 24)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+                f'Grantor, {rnd.choice(SURNAMES)} "{i % 50}"' if i % 11 else ""
+            ])
+
+
+def fresh_sqlite(table):
+    conn = sqlite3.connect(':memory:')
+    conn.execute(CREATE_SQL.format(table=table))
+    return conn
+
+
+def load_row_by_row(conn, table, path):
+    cur = conn.cursor()
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            cur.execute(f"INSERT INTO [{table}] VALUES (?, ?, ?, ?, ?, ?, ?)", [v or None for v in row])
+            conn.commit()
+
+
+def load_in_memory(conn, table, path):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        rows = [[v or None for v in row] for row in reader]
+    conn.executemany(f"INSERT INTO [{table}] VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def snapshot(conn, table):
+    return conn.execute(f"SELECT * FROM [{table}] ORDER BY CAST(id AS INT)").fetchall()
+
+
+def run_sqlite(path, rows):
+    table = 'bench_keli_combined_manifest'
+    naive_rows = min(rows, 20000)   # row-by-row with per-row commit is too slow to run in full
+
+    naive = fresh_sqlite(table)
+    naive_path = path + '.naive.csv'
+    with open(path, newline='', encoding='utf-8') as src, open(naive_path, 'w', newline='', encoding='utf-8') as dst:
+        for i, line in enumerate(src):
+            if i > naive_rows: break
+            dst.write(line)
+    t_naive = timed(load_row_by_row, naive, table, naive_path) * (rows / naive_rows)
+    os.remove(naive_path)
+
+    client = fresh_sqlite(table)
+    t_client = timed(bulk_load_csv, client, f"[{table}]", path, COLUMNS)
+
+    ceiling = fresh_sqlite(table)
+    t_ceiling = timed(load_in_memory, ceiling, table, path)
+
+    same = snapshot(client, table) == snapshot(ceiling, table)
+    print("SQLite stand-in")
+    print(f"  Row-by-row (est.)    : {t_naive:8.3f}s  ({rows / t_naive:10,.0f} rows/s)")
+    print(f"  bulk_load_csv        : {t_client:8.3f}s  ({rows / t_client:10,.0f} rows/s)")
+    print(f"  In-memory ceiling    : {t_ceiling:8.3f}s  ({rows / t_ceiling:10,.0f} rows/s)")
+    print(f"  Identical contents   : {same}")
+    return same
+
+
+def run_sql_server(path, rows, conn_str):
+    try:
+        import pyodbc
+    except ImportError:
+        print("pyodbc not installed; skipping SQL Server run.")
+        return True
+
+    table = 'bench_keli_bulk_loader'
+    conn = pyodbc.connect(conn_str)
+    cur = conn.cursor()
+
+    def reset():
+        cur.execute(f"DROP TABLE IF EXISTS [dbo].[{table}]")
+        cur.execute(CREATE_SQL.format(table=table).replace(f"[{table}]", f"[dbo].[{table}]"))
+        conn.commit()
+
+    def server_bulk():
+        sql_path = os.path.abspath(path).replace("'", "''")
+        cur.execute(f"BULK INSERT [dbo].[{table}] FROM '{sql_path}' WITH (FORMAT = 'CSV', FIRSTROW = 2, FIELDQUOTE = '\"', FIELDTERMINATOR = ',', ROWTERMINATOR = '0x0a', TABLOCK)")
+        conn.commit()
+
+    print("SQL Server")
+    reset()
+    try:
+        t_bulk = timed(server_bulk)
+        print(f"  BULK INSERT          : {t_bulk:8.3f}s  ({rows / t_bulk:10,.0f} rows/s)")
+    except pyodbc.Error as e:
+        print(f"  BULK INSERT          : failed ({e.args[-1] if e.args else e})")
+        conn.rollback()
+
+    reset()
+    t_client = timed(bulk_load_csv, conn, f"[dbo].[{table}]", path, COLUMNS)
+    loaded = cur.execute(f"SELECT COUNT(*) FROM [dbo].[{table}]").fetchone()[0]
+    print(f"  bulk_load_csv        : {t_client:8.3f}s  ({rows / t_client:10,.0f} rows/s)")
+    print(f"  Rows loaded          : {loaded} / {rows}")
+
+    cur.execute(f"DROP TABLE IF EXISTS [dbo].[{table}]")
+    conn.commit()
+    conn.close()
+    return loaded == rows
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    conn_str = sys.argv[2] if len(sys.argv) > 2 else None
+
+    fd, path = tempfile.mkstemp(suffix='.csv', prefix='keli_bench_')
+    os.close(fd)
+    try:
+        write_csv(path, rows)
+        print(f"Rows: {rows}  File: {os.path.getsize(path) / 1048576:.1f} MB")
+        ok = run_sqlite(path, rows)
+        if conn_str: ok = run_sql_server(path, rows, conn_str) and ok
+    finally:
+        os.remove(path)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Timing comparison for the Initial Preparation "Generating Instrument IDs" step.
+
+Runs the legacy REPLACE-chain numbering and the steps InitialPreparation.generate_prep_sql
+produces today ('Computing Base Filename Keys' + 'Generating Instrument IDs') against the
+same synthetic GenericDataImport rows on a local backend (local_backend: DuckDB, or SQLite
+when DuckDB is not installed), checks that both assign identical instrument IDs and prints
+the timings. Both sides save the old instrumentid values into a snapshot's undo log first,
+like the tool does.
+
+The legacy numbering used a @numbering table variable; locals have no variables, so it is a
+#numbering temp table here. SQLite auto-indexes that temp table for the join, so the stand-in
+understates the gap seen on SQL Server, where the table variable join has no index.
+
+Usage: python benchmarks/instrument_ids.py [rows_per_file] [batches] [--backend duckdb|sqlite]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+from local_backend import LocalDatabase  # noqa: E402
+from table_snapshots import begin_snapshot_sql, capture_sql  # noqa: E402
+
+TABLE = 'GenericDataImport'
+
+LEGACY_SQL = """
+CREATE TABLE #numbering (id INT IDENTITY(1,1) PRIMARY KEY, fn VARCHAR(200), col01varchar VARCHAR(200));
+INSERT INTO #numbering (fn, col01varchar)
+SELECT DISTINCT REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(fn,'Header',''),'Legal',''),'Name',''),'Image',''), 'Reference',''), CAST(col01varchar AS INT)
+FROM GenericDataImport
+ORDER BY REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(fn,'Header',''),'Legal',''),'Name',''),'Image',''), 'Reference',''), CAST(col01varchar AS INT);
+
+UPDATE GenericDataImport SET instrumentid = numb.id
+FROM GenericDataImport, #numbering numb
+WHERE REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(GenericDataImport.fn,'Header',''),'Legal',''),'Name',''),'Image',''), 'Reference','') = numb.fn
+  AND GenericDataImport.col01varchar = numb.col01varchar;
+
+DROP TABLE #numbering;
+"""
+
+NEW_STEPS = ('Computing Base Filename Keys', 'Generating Instrument IDs')
+
+
+def build_rows(rows_per_file, batches, seed=42):
+    rnd = random.Random(seed)
+    rows = []
+    for batch in range(batches):
+        for kind in ('Header', 'Legal', 'Name', 'Image', 'Reference'):
+            fn = f"County_{kind}_{batch:03d}.csv"
+            for n in range(rows_per_file):
+                inst = str(rnd.randint(1, rows_per_file))
+                # A few zero-padded numbers exercise the text/INT mismatch the old join relied on
+                if rnd.random() < 0.01: inst = inst.zfill(6)
+                rows.append((fn, inst))
+    return rows
+
+
+def prep_steps():
+    """(name, sql) of the current numbering, as the Initial Preparation tool generates it."""
+    from blueprints.InitialPreparation import generate_prep_sql
+    steps = dict(generate_prep_sql('Benchmark', TABLE, created_by='benchmark'))
+    return [(name, steps[name]) for name in NEW_STEPS]
+
+
+def fresh_db(rows, backend):
+    local = LocalDatabase(engine=backend)
+    local.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, fn VARCHAR(1000), col01varchar VARCHAR(1000), instrumentid INT)")
+    local.insert_rows(TABLE, ('id', 'fn', 'col01varchar'), [(i, fn, inst) for i, (fn, inst) in enumerate(rows, 1)])
+    local.run_steps([('Creating Snapshot', begin_snapshot_sql(TABLE, 'Benchmark', 'benchmark'))])
+    return local
+
+
+def timed(local, steps):
+    """[(name, seconds)] of the steps, run in one transaction like the tool."""
+    return [(name, seconds) for name, seconds, _ in local.run_steps(steps)]
+
+
+def instrument_ids(local):
+    return local.query(f"SELECT id, instrumentid FROM {TABLE} ORDER BY id")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('rows_per_file', nargs='?', type=int, default=20000)
+    parser.add_argument('batches', nargs='?', type=int, default=4)
+    parser.add_argument('--backend', choices=('duckdb', 'sqlite'), default=None, help="local engine (default: duckdb when installed)")
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows_per_file, args.batches)
+    steps = prep_steps()
+
+    legacy = fresh_db(rows, args.backend)
+    print(f"Rows: {len(rows)} ({legacy.engine})")
+    t_legacy = timed(legacy, [('Legacy numbering', capture_sql(TABLE, {'instrumentid': "fn IS NOT NULL"}) + LEGACY_SQL)])[0][1]
+    ids_legacy = instrument_ids(legacy)
+    legacy.close()
+
+    current = fresh_db(rows, args.backend)
+    (_, t_key), (_, t_window) = timed(current, steps)
+    ids_current = instrument_ids(current)
+    current.close()
+
+    identical = [tuple(r) for r in ids_legacy] == [tuple(r) for r in ids_current]
+    print(f"Legacy REPLACE-chain : {t_legacy:8.3f}s")
+    print(f"base_fn key (once)   : {t_key:8.3f}s")
+    print(f"base_fn + DENSE_RANK : {t_window:8.3f}s")
+    print(f"Speedup              : {t_legacy / t_window:8.1f}x" if t_window else "")
+    print(f"Identical IDs        : {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
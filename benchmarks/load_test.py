@@ -0,0 +1,131 @@
+"""
+Concurrent reviewer throughput against a running server.
+
+Logs in once, then runs N reviewer threads that loop over the per-click endpoints for a
+fixed duration, while H "hold" threads keep long streaming requests open (by default the
+SSE stream, which holds a server thread just like an import or scan does). Reports
+throughput, latency percentiles and errors.
+
+Run it against `python app.py` (the debug server) and `python wsgi.py` to compare, and
+raise --hold past the server's thread count to see where reviewers start queueing.
+
+Usage:
+    python benchmarks/load_test.py http://localhost:5000 --user admin --password secret \
+        [--reviewers 20] [--hold 8] [--duration 30] [--url /api/map/county-status ...]
+"""
+import sys
+import time
+import argparse
+import threading
+import http.cookiejar
+import urllib.parse
+import urllib.request
+
+DEFAULT_URLS = [
+    '/api/map/county-status',
+    '/api/map/counties?status=0&zoom=6',
+    '/api/counties',
+]
+HOLD_URL = '/api/events/stream'
+
+
+def login(base, user, password):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    body = urllib.parse.urlencode({'username': user, 'password': password}).encode()
+    opener.open(base + '/login', body, timeout=30).read()
+    cookie = '; '.join(f"{c.name}={c.value}" for c in jar)
+    if 'session' not in cookie: raise SystemExit("Login failed (no session cookie)")
+    return cookie
+
+
+def fetch(base, path, cookie, timeout):
+    req = urllib.request.Request(base + path, headers={'Cookie': cookie, 'Accept-Encoding': 'gzip'})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+        return resp.status
+
+
+def percentile(values, pct):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def hold_stream(base, path, cookie, stop, opened):
+    req = urllib.request.Request(base + path, headers={'Cookie': cookie})
+    try:
+        resp = urllib.request.urlopen(req, timeout=60)
+    except Exception:
+        opened.append(None)   # e.g. 503 when the SSE listener cap is reached
+        return
+    opened.append(resp.status)
+    # The stream sends a heartbeat every 20s, so reads never wait longer than the timeout
+    try:
+        with resp:
+            while not stop.is_set() and resp.readline(): pass
+    except Exception:
+        pass
+
+
+def reviewer(base, urls, cookie, deadline, timeout, latencies, errors, lock):
+    i = 0
+    local_lat, local_err = [], 0
+    while time.monotonic() < deadline:
+        path = urls[i % len(urls)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            fetch(base, path, cookie, timeout)
+            local_lat.append(time.perf_counter() - start)
+        except Exception:
+            local_err += 1
+    with lock:
+        latencies.extend(local_lat)
+        errors.append(local_err)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--reviewers', type=int, default=20)
+    parser.add_argument('--hold', type=int, default=8, help="long streams held open during the run")
+    parser.add_argument('--hold-url', default=HOLD_URL)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--url', action='append', help="reviewer endpoint (repeatable)")
+    args = parser.parse_args()
+
+    base = args.base.rstrip('/')
+    urls = args.url or DEFAULT_URLS
+    cookie = login(base, args.user, args.password)
+
+    stop, opened = threading.Event(), []
+    holders = [threading.Thread(target=hold_stream, args=(base, args.hold_url, cookie, stop, opened), daemon=True)
+               for _ in range(args.hold)]
+    for t in holders: t.start()
+    time.sleep(1)
+
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + args.duration
+    workers = [threading.Thread(target=reviewer, args=(base, urls, cookie, deadline, args.timeout, latencies, errors, lock))
+               for _ in range(args.reviewers)]
+    start = time.perf_counter()
+    for t in workers: t.start()
+    for t in workers: t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    done, failed = len(latencies), sum(errors)
+    print(f"Server: {base}  Reviewers: {args.reviewers}  Held streams: {sum(1 for s in opened if s)}/{args.hold}")
+    print(f"  Requests ok / failed : {done} / {failed}")
+    print(f"  Throughput           : {done / elapsed:8.1f} req/s")
+    print(f"  Latency p50/p95/p99  : {percentile(latencies, 50) * 1000:.0f} / "
+          f"{percentile(latencies, 95) * 1000:.0f} / {percentile(latencies, 99) * 1000:.0f} ms")
+    return 0 if done and not failed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
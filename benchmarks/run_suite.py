@@ -0,0 +1,658 @@
+"""
+End-to-end benchmark suite: times the tool pipeline on a synthetic county and writes a JSON
+report, so a patch (e.g. one applied through PatchManager) can be checked for slowdowns.
+
+Stages, in order (each records seconds, items and, for SQL stages, per-step timings):
+  generate       synthetic eData / Keli / TIFF files (benchmarks/synthetic_county.py)
+  parse          SetupEDataTable.parse_line_waterfall over every eData line
+  keli_schema    keli_tables.plan_keli_table (type inference) over every Keli CSV
+  import_edata   parse + batched INSERTs of 1000 rows, as the Setup eData tool does
+  alter_fields   the alter_db_config.json renames / new columns (Alter Database Fields)
+  import_keli    keli_tables.import_keli_file for every Keli CSV (client loader by default)
+  initial_prep   InitialPreparation.generate_prep_sql steps in one transaction
+  linkup         Keli pages_internal + lookup indexes + InitialKeliLinkup.generate_linkup_sql (manifest mode)
+  error_scan     EDataErrors.build_scan_queries (SELECT ... INTO per rule)
+  final_prep     FinalPreparation.build_final_prep_steps
+  render_images  the TIFF -> JPEG (Unindexed Images) and TIFF -> PNG (eData Errors) conversions
+
+The tool code is imported from the app, so the app's requirements (and Python 3.12, for
+SetupEDataTable) are needed; stages whose imports fail are reported as skipped, and so are the
+database stages that read their tables (STAGE_DEPENDS).
+The database stages run on --backend:
+  sqlserver  a scratch SQL Server database given with --db-uri (a local Developer / Express
+             instance or container); its <County>_* tables are dropped first
+  duckdb     in process (pip install duckdb); the default without --db-uri
+  sqlite     in process, standard library only; the fallback when duckdb is missing
+The local backends run the same generated T-SQL through sql_dialect / local_backend (which
+need sqlglot), so their timings show relative changes, not SQL Server figures; reports from
+different backends are not compared. --check-backends runs the database stages on both local
+backends and compares every resulting <County>_* table (exit code 1 on a difference), which
+catches translation bugs that change results rather than fail.
+
+--compare OLD.json prints per-stage deltas and exits with 1 when a stage that ran in both
+reports is more than --threshold percent slower.
+
+Usage: python benchmarks/run_suite.py [--instruments N] [--backend NAME] [--db-uri URI] [--local-db PATH] [--report PATH]
+                                      [--compare OLD.json] [--threshold 10] [--workdir DIR] [--check-backends]
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+import synthetic_county  # noqa: E402
+
+SUITE_VERSION = 1
+INSERT_BATCH = 1000   # rows per INSERT batch in the Setup eData tool
+ORIGINAL_COLUMNS = (
+    ['FN', 'OriginalValue'] + [f"col{i:02d}varchar" for i in range(1, 11)]
+    + [f"col{i:02d}other" for i in range(1, 21)] + ['uf1', 'uf2', 'uf3', 'leftovers']
+)
+
+
+class Skip(Exception):
+    """A stage that cannot run in this environment (missing database or dependency)."""
+
+
+# --- Stage bookkeeping ---
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.status = 'ok'
+        self.seconds = 0.0
+        self.items = 0
+        self.steps = []
+        self.message = None
+
+    def step(self, name, fn):
+        start = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - start
+        self.steps.append({'name': name, 'seconds': round(elapsed, 4), 'rows': rows if isinstance(rows, int) and rows >= 0 else None})
+        return rows
+
+    def as_dict(self):
+        out = {'name': self.name, 'status': self.status, 'seconds': round(self.seconds, 4), 'items': self.items}
+        if self.items and self.seconds: out['items_per_second'] = round(self.items / self.seconds, 1)
+        if self.steps: out['steps'] = self.steps
+        if self.message: out['message'] = self.message
+        return out
+
+
+def run_stage(report, name, fn, *args):
+    stage = Stage(name)
+    start = time.perf_counter()
+    try:
+        fn(stage, *args)
+    except Skip as e:
+        stage.status, stage.message = 'skipped', str(e)
+    except Exception as e:
+        stage.status, stage.message = 'error', f"{type(e).__name__}: {e}"[:2000]
+    stage.seconds = time.perf_counter() - start
+    report['stages'].append(stage.as_dict())
+    label = f"{stage.seconds:9.3f}s  {stage.items:>9,} items" if stage.status == 'ok' else stage.status.upper()
+    print(f"  {name:<14} {label}" + (f"  ({stage.message})" if stage.message and stage.status != 'ok' else ""))
+    return stage
+
+
+def require(module_name, attr):
+    try:
+        module = __import__(module_name, fromlist=[attr])
+        return getattr(module, attr)
+    except Exception as e:
+        raise Skip(f"cannot import {module_name}.{attr}: {e}")
+
+
+def edata_files(manifest):
+    folder = os.path.join(manifest['root'], 'eData Files')
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith('.csv'))
+
+
+def keli_files(manifest):
+    folder = os.path.join(manifest['root'], 'Keli Files')
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith('.csv'))
+
+
+# --- Pure Python stages ---
+
+def stage_parse(stage, manifest):
+    parse_line_waterfall = require('blueprints.SetupEDataTable', 'parse_line_waterfall')
+    for path in edata_files(manifest):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                clean = line.strip()
+                if not clean: continue
+                parse_line_waterfall(clean)
+                stage.items += 1
+
+
+def stage_keli_schema(stage, manifest):
+    plan_keli_table = require('keli_tables', 'plan_keli_table')
+    for path in keli_files(manifest):
+        plan = stage.step(os.path.basename(path), lambda: plan_keli_table(path, manifest['county'])['row_count'])
+        stage.items += plan or 0
+
+
+def stage_render_images(stage, manifest):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise Skip("Pillow is not installed")
+    folder = os.path.join(manifest['root'], 'Images')
+    paths = sorted(os.path.join(root, f) for root, _, files in os.walk(folder) for f in files if f.upper().endswith('.TIF'))
+    if not paths: raise Skip("no TIFF files were generated (--images 0)")
+
+    def as_jpeg(path):
+        # UnindexedImages.view_local_image
+        with Image.open(path) as image:
+            image.seek(0)
+            if image.mode in ('P', 'CMYK', 'RGBA', 'LA', 'I', 'I;16', '1'):
+                image = image.convert('RGB')
+            image.save(io.BytesIO(), 'JPEG', quality=85)
+
+    def as_png(path):
+        # EDataErrors.view_image
+        img = Image.open(path)
+        if img.mode in ("I", "F"):
+            img = img.convert("RGB")
+        img.save(io.BytesIO(), 'PNG')
+
+    stage.step('TIFF -> JPEG', lambda: [as_jpeg(p) for p in paths] and len(paths))
+    stage.step('TIFF -> PNG', lambda: [as_png(p) for p in paths] and len(paths))
+    stage.items = len(paths) * 2
+
+
+# --- Database stages ---
+
+def iter_parsed_rows(manifest, parse_line_waterfall):
+    """Rows (in ORIGINAL_COLUMNS order) as the Setup eData tool builds them (see run_generic_import)."""
+    for path in edata_files(manifest):
+        filename = os.path.basename(path)
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                clean_line = line.strip()
+                if not clean_line: continue
+                c_vals, o_vals, left_val = parse_line_waterfall(clean_line)
+                yield (filename, clean_line[:8000], *c_vals, *o_vals, '', '', '', left_val)
+
+
+DB_STAGES = ('import_edata', 'alter_fields', 'import_keli', 'initial_prep', 'linkup', 'error_scan', 'final_prep')
+# The earlier stages whose tables a database stage reads; it is skipped when one did not run
+STAGE_DEPENDS = {
+    'alter_fields': ('import_edata',),
+    'initial_prep': ('alter_fields',),
+    'linkup': ('initial_prep', 'import_keli'),
+    'error_scan': ('alter_fields',),
+    'final_prep': ('linkup',),
+}
+
+
+def run_db_stages(report, suite, label=''):
+    """
+    Runs DB_STAGES in order. A stage whose upstream stage was skipped or failed is recorded as
+    skipped with that stage's reason rather than run into missing tables and shown as an error.
+    """
+    blocked = {}
+    for name in DB_STAGES:
+        reason = next((blocked[dep] for dep in STAGE_DEPENDS.get(name, ()) if dep in blocked), None)
+        if reason:
+            report['stages'].append({'name': label + name, 'status': 'skipped', 'seconds': 0, 'items': 0, 'message': reason})
+            print(f"  {label + name:<14} SKIPPED  ({reason})")
+            blocked[name] = reason
+            continue
+        stage = run_stage(report, label + name, getattr(suite, name))
+        if stage.status != 'ok':
+            blocked[name] = f"{name} {stage.status}: {stage.message}"
+
+
+class PipelineSuite:
+    """
+    The database stages, shared by both backends. Subclasses provide reset(), execute(),
+    run_steps(), insert_rows(), load_keli() and keli_index_steps(). The tools' SQL builders
+    need an app context (per-county table names), so a minimal Flask app is pushed.
+    """
+
+    def __init__(self, manifest):
+        from flask import Flask
+        self.manifest = manifest
+        self.county = manifest['county']
+        self.app = Flask('gsi_benchmark', root_path=REPO)
+        self.app.config.update(GENERIC_IMPORT_MODE='per_county')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        from county_context import generic_import_table, GENERIC_IMPORT_TABLE
+        # State abbreviation the way county_context derives it when a state has none
+        self.data_table = generic_import_table(self.county, manifest['state'][:2].upper())
+        self.scratch_prefix = self.data_table[:-len(GENERIC_IMPORT_TABLE)]
+        self.county_row = SimpleNamespace(id=None, county_name=self.county, is_split_job=False)
+
+    def close(self):
+        self.ctx.pop()
+
+    def timed_steps(self, stage, steps):
+        self.run_steps(stage, steps)
+        stage.items = len(steps)
+
+    def import_edata(self, stage):
+        parse_line_waterfall = require('blueprints.SetupEDataTable', 'parse_line_waterfall')
+        self.reset()
+        # Same table as Setup eData (mode D)
+        columns = ", ".join(f"{c} VARCHAR(MAX)" if c == 'OriginalValue' else f"{c} VARCHAR(1000)" for c in ORIGINAL_COLUMNS)
+        self.execute(f"CREATE TABLE [dbo].[{self.data_table}] (ID INT NOT NULL IDENTITY(1,1) PRIMARY KEY, {columns})")
+        batch = []
+        for row in iter_parsed_rows(self.manifest, parse_line_waterfall):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH:
+                stage.items += self.insert_rows(self.data_table, ORIGINAL_COLUMNS, batch)
+                batch = []
+        if batch:
+            stage.items += self.insert_rows(self.data_table, ORIGINAL_COLUMNS, batch)
+
+    def alter_fields(self, stage):
+        with open(os.path.join(REPO, 'alter_db_config.json')) as f:
+            config = json.load(f)
+        t = self.data_table
+        steps = [(f"rename {old}", f"EXEC sp_rename '[{t}].{old}', '{new}', 'COLUMN'")
+                 for old, new in config.get('renames', {}).items() if old != new]
+        steps += [(f"add {f['name']}", f"ALTER TABLE [{t}] ADD [{f['name']}] {f['type']}") for f in config.get('adds', [])]
+        self.timed_steps(stage, steps)
+
+    def import_keli(self, stage):
+        for path in keli_files(self.manifest):
+            stage.items += stage.step(os.path.basename(path), lambda path=path: self.load_keli(path)) or 0
+
+    def initial_prep(self, stage):
+        generate_prep_sql = require('blueprints.InitialPreparation', 'generate_prep_sql')
+        m = self.manifest
+        self.timed_steps(stage, generate_prep_sql(self.county, self.data_table, m['book_start'], m['book_end'], m['image_path_prefix'], created_by='benchmark'))
+
+    def linkup(self, stage):
+        generate_linkup_sql = require('blueprints.InitialKeliLinkup', 'generate_linkup_sql')
+        m = self.manifest
+        build_final_prep_steps = require('blueprints.FinalPreparation', 'build_final_prep_steps')
+        steps = generate_linkup_sql(self.county, self.data_table, True, m['book_start'], m['book_end'], True, m['image_path_prefix'], 'manifest', False)
+        # Manifest linkup reads <County>_keli_pages_internal, which a county gets from an earlier
+        # Final Preparation run; build it here from the same query
+        pages_internal = dict(build_final_prep_steps(self.county_row, self.data_table, m['book_start'], m['book_end']))['Keli Pages Internal']
+        pages_internal = pages_internal.replace(f"{self.scratch_prefix}KeliPagesInternal", f"{self.county}_keli_pages_internal")
+        steps[1:1] = [('Keli Pages Internal', pages_internal)] + self.keli_index_steps()
+        self.timed_steps(stage, steps)
+
+    def error_scan(self, stage):
+        build_scan_queries = require('blueprints.EDataErrors', 'build_scan_queries')
+        parse_townships = require('blueprints.EDataErrors', 'parse_townships')
+        m = self.manifest
+        townships = ", ".join(f"'{t},{r}'" for t, r in synthetic_county.TOWNSHIP_RANGES)
+        queries = build_scan_queries(self.county_row, self.data_table, m['book_start'], m['book_end'], parse_townships(townships))
+        steps = []
+        for clean_name, target_table, sql in queries:
+            steps.append((f"{clean_name} (drop)", f"IF OBJECT_ID('[{target_table}]', 'U') IS NOT NULL DROP TABLE [{target_table}]"))
+            steps.append((clean_name, sql))
+        self.run_steps(stage, steps)
+        stage.items = len(queries)
+
+    def final_prep(self, stage):
+        build_final_prep_steps = require('blueprints.FinalPreparation', 'build_final_prep_steps')
+        m = self.manifest
+        self.timed_steps(stage, build_final_prep_steps(self.county_row, self.data_table, m['book_start'], m['book_end']))
+
+
+class SqlServerSuite(PipelineSuite):
+    """Runs the stages through the app's db.session against a scratch SQL Server database."""
+
+    def __init__(self, db_uri, manifest, keli_loader):
+        super().__init__(manifest)
+        from extensions import db
+        from db_engine import engine_options
+        self.db = db
+        self.keli_loader = keli_loader
+        self.app.config.update(SQLALCHEMY_DATABASE_URI=db_uri, SQLALCHEMY_TRACK_MODIFICATIONS=False,
+                               SQLALCHEMY_ENGINE_OPTIONS=engine_options({}))
+        db.init_app(self.app)
+        self.name = 'sqlserver'
+        self.version = db.session.execute(self.text("SELECT CAST(SERVERPROPERTY('ProductVersion') AS VARCHAR(50))")).scalar()
+
+    def close(self):
+        self.db.session.remove()
+        super().close()
+
+    @staticmethod
+    def text(sql):
+        from sqlalchemy import text
+        return text(sql)
+
+    def execute(self, sql, params=None):
+        result = self.db.session.execute(self.text(sql), params or {})
+        self.db.session.commit()
+        return -1 if result.returns_rows else result.rowcount
+
+    def run_steps(self, stage, steps):
+        """Runs (name, sql) steps in one transaction, like the tools, timing each step."""
+        def run(sql):
+            result = self.db.session.execute(self.text(sql))
+            return -1 if result.returns_rows else result.rowcount
+        try:
+            for name, sql in steps:
+                stage.step(name, lambda sql=sql: run(sql))
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
+
+    def insert_rows(self, table, columns, rows):
+        sql = f"INSERT INTO [{table}] ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        self.db.session.connection().exec_driver_sql(sql, rows)
+        self.db.session.commit()
+        return len(rows)
+
+    def reset(self):
+        """Drops the county's tables left by an earlier run, so every run starts from the same state."""
+        like = self.county.replace('_', '[_]') + '[_]%'
+        names = [r[0] for r in self.db.session.execute(self.text(
+            "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = 'dbo' AND TABLE_TYPE = 'BASE TABLE' AND TABLE_NAME LIKE :p"
+        ), {'p': like})]
+        for name in names:
+            self.db.session.execute(self.text(f"DROP TABLE [dbo].[{name}]"))
+        self.db.session.commit()
+
+    def load_keli(self, path):
+        import_keli_file = require('keli_tables', 'import_keli_file')
+        with self.db.engine.connect() as conn:
+            try:
+                return import_keli_file(conn, path, self.county, loader=self.keli_loader)['row_count']
+            except Exception:
+                conn.rollback()
+                raise
+
+    def keli_index_steps(self):
+        return require('keli_tables', 'build_keli_index_steps')(self.county)
+
+
+class LocalSuite(PipelineSuite):
+    """Runs the same generated T-SQL on an in-process DuckDB / SQLite database (local_backend)."""
+
+    def __init__(self, engine, manifest, path=':memory:'):
+        LocalDatabase = require('local_backend', 'LocalDatabase')
+        super().__init__(manifest)
+        try:
+            self.local = LocalDatabase(path, engine)
+        except Exception:
+            super().close()
+            raise
+        self.name = self.local.engine
+        self.version = self.local.version
+
+    def close(self):
+        self.local.close()
+        super().close()
+
+    def execute(self, sql, params=None):
+        return self.local.run_script(sql)
+
+    def run_steps(self, stage, steps):
+        def record(name, seconds, rows):
+            stage.steps.append({'name': name, 'seconds': round(seconds, 4), 'rows': rows if rows >= 0 else None})
+        self.local.run_steps(steps, on_step=record)
+
+    def insert_rows(self, table, columns, rows):
+        self.local.begin()
+        try:
+            count = self.local.insert_rows(table, columns, rows)
+            self.local.commit()
+        except Exception:
+            self.local.rollback()
+            raise
+        return count
+
+    def reset(self):
+        self.local.drop_tables_like(self.county + '_%')
+
+    def load_keli(self, path):
+        # Same plan as import_keli_file (schema inference, CREATE, load, lookup indexes)
+        plan = require('keli_tables', 'plan_keli_table')(path, self.county)
+        self.local.run_script(plan['create_sql'])
+        self.local.load_csv(plan['table_name'], path, [c[0] for c in plan['columns']])
+        if plan['index_sql']: self.local.run_script(plan['index_sql'])
+        return plan['row_count']
+
+    def keli_index_steps(self):
+        # build_keli_index_steps reads column names from db.session; the same SQL from the local catalog
+        keli_index_sql_for = require('keli_tables', 'keli_index_sql_for')
+        KELI_LOOKUP_KEYS = require('keli_tables', 'KELI_LOOKUP_KEYS')
+        steps = []
+        for suffix in KELI_LOOKUP_KEYS:
+            table = f"{self.county}_keli_{suffix}"
+            if not self.local.table_exists(table): continue
+            sql = keli_index_sql_for(self.county, suffix, self.local.columns(table))
+            if sql: steps.append((f"Indexing {table}", sql))
+        return steps
+
+
+# --- Backend check ---
+
+def _normalized(value):
+    if isinstance(value, float) and value.is_integer(): return int(value)
+    if isinstance(value, (int, float, str)) or value is None: return value
+    return str(value)
+
+
+def local_tables(local, prefixes):
+    """{table: (columns, sorted rows)} of the tables named <prefix>..., columns in name order, values comparable across engines."""
+    out = {}
+    names = {n for prefix in prefixes for n in local.tables_like(prefix + '%')}
+    for name in sorted(names):
+        columns = sorted(local.columns(name), key=str.lower)
+        select = ", ".join(local.dialect.quote(c) for c in columns)
+        rows = local.query(f"SELECT {select} FROM {local.dialect.quote(name)}")
+        out[name.lower()] = ([c.lower() for c in columns], sorted((tuple(_normalized(v) for v in r) for r in rows), key=repr))
+    return out
+
+
+# Values the tools leave to the engine: created_at is the run time, and "Syncing Stech Paths to
+# Instruments" is an UPDATE ... FROM with several matching image rows, which takes any of them
+# (on SQL Server too). Undo log rows for these columns are ignored as well.
+UNORDERED_COLUMNS = ('created_at', 'stech_image_path')
+
+
+def _comparable(columns, rows, ignore_columns):
+    keep = [i for i, c in enumerate(columns) if c not in ignore_columns]
+    logged = columns.index('col') if 'col' in columns else None
+    return sorted((tuple(r[i] for i in keep) for r in rows if logged is None or str(r[logged]).lower() not in ignore_columns), key=repr)
+
+
+def check_backends(report, manifest, ignore_columns=UNORDERED_COLUMNS):
+    """
+    Runs the database stages on DuckDB and on SQLite and compares every <County>_* and
+    <State>_<County>_* table.
+    The translation differs per engine, so a mismatch points at a translation bug.
+    Returns the differing table names.
+    """
+    results = {}
+    for engine in ('duckdb', 'sqlite'):
+        print(f"\n{engine}:")
+        suite = LocalSuite(engine, manifest)
+        try:
+            run_db_stages(report, suite, f"{engine}:")
+            results[engine] = local_tables(suite.local, (suite.county + '_', suite.scratch_prefix))
+        finally:
+            suite.close()
+
+    duck, lite = results['duckdb'], results['sqlite']
+    differences = []
+    print("\nBackend check (duckdb vs sqlite):")
+    for table in sorted(set(duck) | set(lite)):
+        if table not in duck or table not in lite:
+            differences.append(table)
+            print(f"  {table:<60} only on {'duckdb' if table in duck else 'sqlite'}")
+            continue
+        (d_cols, d_rows), (s_cols, s_rows) = duck[table], lite[table]
+        if d_cols != s_cols:
+            differences.append(table)
+            print(f"  {table:<60} columns differ: {sorted(set(d_cols) ^ set(s_cols))}")
+            continue
+        d_rows, s_rows = _comparable(d_cols, d_rows, ignore_columns), _comparable(s_cols, s_rows, ignore_columns)
+        if d_rows != s_rows:
+            differences.append(table)
+            print(f"  {table:<60} rows differ ({len(d_rows)} vs {len(s_rows)})")
+    if not differences: print(f"  {len(duck)} tables identical")
+    report['backend_check'] = {'tables': len(set(duck) | set(lite)), 'differences': differences}
+    return differences
+
+
+# --- Report ---
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def app_version():
+    try:
+        with open(os.path.join(REPO, 'version.json')) as f:
+            return json.load(f).get('string')
+    except Exception:
+        return None
+
+
+def default_local_backend():
+    try:
+        import duckdb  # noqa: F401
+        return 'duckdb'
+    except ImportError:
+        return 'sqlite'
+
+
+def compare(old_path, report, threshold):
+    with open(old_path) as f:
+        old_report = json.load(f)
+    old = {s['name']: s for s in old_report.get('stages', [])}
+    regressions = []
+    old_backend = (old_report.get('database') or {}).get('backend')
+    if old_backend != report['database']['backend']:
+        print(f"\nNot compared with {old_path}: it ran on {old_backend}, this run on {report['database']['backend']}")
+        return regressions
+    print(f"\nCompared with {old_path} (threshold {threshold:.0f}%)")
+    for stage in report['stages']:
+        before = old.get(stage['name'])
+        if stage['name'] == 'generate' or not before or before['status'] != 'ok' or stage['status'] != 'ok' or not before['seconds']:
+            continue
+        delta = (stage['seconds'] - before['seconds']) / before['seconds'] * 100
+        flag = ''
+        if delta > threshold:
+            flag = '  <-- slower'
+            regressions.append(stage['name'])
+        print(f"  {stage['name']:<14} {before['seconds']:9.3f}s -> {stage['seconds']:9.3f}s  {delta:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the GSI tool pipeline on a synthetic county.")
+    parser.add_argument('--instruments', type=int, default=5000)
+    parser.add_argument('--batches', type=int, default=4)
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--backend', choices=('sqlserver', 'duckdb', 'sqlite'),
+                        help="default: sqlserver with --db-uri, otherwise duckdb if installed, else sqlite")
+    parser.add_argument('--db-uri', help="SQLAlchemy URI of a scratch SQL Server database")
+    parser.add_argument('--local-db', default=':memory:', help="database file for the duckdb / sqlite backends")
+    parser.add_argument('--keli-loader', choices=('client', 'server'), default='client',
+                        help="server = BULK INSERT (the server must be able to read --workdir)")
+    parser.add_argument('--workdir', help="where the synthetic county is written (default: a temp dir)")
+    parser.add_argument('--report', help="report path (default: benchmarks/reports/suite_<UTC time>.json)")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0, help="percent slowdown counted as a regression")
+    parser.add_argument('--check-backends', action='store_true',
+                        help="run the database stages on duckdb and sqlite and compare the resulting tables")
+    args = parser.parse_args()
+    backend = args.backend or ('sqlserver' if args.db_uri else default_local_backend())
+    if backend == 'sqlserver' and not args.db_uri: parser.error("--backend sqlserver needs --db-uri")
+
+    tmp = None
+    workdir = args.workdir
+    if not workdir:
+        tmp = tempfile.TemporaryDirectory()
+        workdir = tmp.name
+    started = datetime.now(timezone.utc)
+    report = {
+        'suite_version': SUITE_VERSION,
+        'created_at': started.isoformat(),
+        'app_version': app_version(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': {'backend': backend},
+        'params': {'instruments': args.instruments, 'batches': args.batches, 'images': args.images,
+                   'seed': args.seed, 'keli_loader': args.keli_loader},
+        'stages': [],
+    }
+
+    print(f"Synthetic county: {args.instruments:,} instruments, seed {args.seed}")
+    manifest = {}
+
+    def generate(stage):
+        manifest.update(synthetic_county.generate(workdir, args.instruments, args.batches, args.seed, args.images))
+        stage.items = sum(manifest['counts'].values())
+
+    run_stage(report, 'generate', generate)
+    report['data'] = {k: manifest.get(k) for k in ('counts', 'book_start', 'book_end')}
+    run_stage(report, 'parse', stage_parse, manifest)
+    run_stage(report, 'keli_schema', stage_keli_schema, manifest)
+
+    suite, reason, differences = None, None, []
+    if args.check_backends:
+        report['database'] = {'backend': 'duckdb+sqlite'}
+        differences = check_backends(report, manifest)
+    else:
+        try:
+            if backend == 'sqlserver':
+                suite = SqlServerSuite(args.db_uri, manifest, args.keli_loader)
+            else:
+                suite = LocalSuite(backend, manifest, args.local_db)
+            report['database']['version'] = suite.version
+        except Skip as e:
+            reason = str(e)
+        except Exception as e:
+            reason = f"cannot open the {backend} database: {e}"
+
+    if suite:
+        try:
+            run_db_stages(report, suite)
+            if backend != 'sqlserver' and suite.local.skipped:
+                report['database']['skipped_statements'] = len(suite.local.skipped)
+        finally:
+            suite.close()
+    elif not args.check_backends:
+        for name in DB_STAGES:
+            report['stages'].append({'name': name, 'status': 'skipped', 'seconds': 0, 'items': 0, 'message': reason})
+            print(f"  {name:<14} SKIPPED  ({reason})")
+
+    run_stage(report, 'render_images', stage_render_images, manifest)
+    report['total_seconds'] = round(sum(s['seconds'] for s in report['stages'] if s['name'] != 'generate'), 4)
+
+    report_path = args.report or os.path.join(REPO, 'benchmarks', 'reports', f"suite_{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nTotal (excluding generate): {report['total_seconds']:.3f}s\nReport: {report_path}")
+
+    regressions = compare(args.compare, report, args.threshold) if args.compare else []
+    if tmp: tmp.cleanup()
+    failed = [s['name'] for s in report['stages'] if s['status'] == 'error']
+    if failed: print(f"Failed stages: {', '.join(failed)}")
+    return 1 if regressions or failed or differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
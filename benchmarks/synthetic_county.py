@@ -0,0 +1,203 @@
+"""
+Synthetic county data for the end-to-end benchmark suite (benchmarks/run_suite.py).
+
+Writes the folder layout the tools read, data/<State>/<County>/:
+  eData Files/  Batch###Header|Legal|Name|Image|Reference.csv in the waterfall format
+                (10 quoted values, then up to 20 comma-separated values; see
+                SetupEDataTable.parse_line_waterfall)
+  Keli Files/   instrument_types, additions, record_series, party_suffixes, township_ranges,
+                combined_manifest and pages CSVs (loaded as <County>_keli_<name>)
+  Images/       <book>/<page>.TIF, uncompressed 8-bit grayscale pages
+
+Everything derives from --seed, so the same arguments always produce the same files.
+A small share of rows carries the defects the eData error scan looks for (missing or
+non-numeric numbers, duplicate book/page, out-of-range sections and quarters).
+Only the standard library is used.
+
+Usage: python benchmarks/synthetic_county.py <out_dir> [instruments] [--seed N] [--images N]
+"""
+import os
+import sys
+import csv
+import json
+import random
+import struct
+import argparse
+
+STATE = 'Testland'
+COUNTY = 'Synthetic'
+INSTRUMENT_TYPES = ['WARRANTY DEED', 'QUIT CLAIM DEED', 'MORTGAGE', 'RELEASE', 'AFFIDAVIT', 'EASEMENT', 'LIEN', 'ASSIGNMENT']
+ADDITIONS = ['ORIGINAL TOWN', 'NORTH ADDITION', 'RAILROAD ADDITION', 'PARK PLACE', 'HILLCREST', 'WESTVIEW']
+QUARTERS = ['NE', 'NW', 'SE', 'SW', 'N2', 'S2', 'E2', 'W2']
+SURNAMES = ['SMITH', 'JOHNSON', "O'BRIEN", 'MILLER', 'DAVIS', 'GARCIA', 'WILSON', 'ANDERSON', 'TAYLOR', 'THOMAS']
+GIVEN = ['JOHN', 'MARY', 'ROBERT', 'PATRICIA', 'JAMES', 'LINDA', 'MICHAEL', 'BARBARA']
+TOWNSHIP_RANGES = [(f"{t}S", f"{r}W") for t in range(10, 16) for r in range(1, 6)]
+
+PAGE_WIDTH = 850     # 8.5" x 11" at 100 dpi
+PAGE_HEIGHT = 1100
+
+
+def county_folder(out_dir, state=STATE, county=COUNTY):
+    return os.path.join(out_dir, 'data', state, county)
+
+
+def waterfall_line(quoted, other=()):
+    """One eData line: 10 quoted values, then the unquoted ones (o1 is the empty field before the first comma)."""
+    quoted = list(quoted) + [''] * (10 - len(quoted))
+    return ",".join(f'"{v}"' for v in quoted) + ("," + ",".join(other) if other else "")
+
+
+def write_tiff(path, width, height, rnd):
+    """Baseline uncompressed grayscale TIFF with a few text-like dark rows."""
+    pixels = bytearray(b'\xff' * (width * height))
+    y = 60
+    while y < height - 60:
+        x0 = rnd.randint(60, 120)
+        x1 = rnd.randint(width // 2, width - 60)
+        for line in range(y, y + 6):
+            start = line * width
+            pixels[start + x0:start + x1] = b'\x20' * (x1 - x0)
+        y += rnd.choice((18, 18, 24, 40))
+
+    entries = [
+        (256, 4, width), (257, 4, height), (258, 3, 8), (259, 3, 1), (262, 3, 1),
+        (273, 4, 8 + 2 + 9 * 12 + 4), (277, 3, 1), (278, 4, height), (279, 4, len(pixels)),
+    ]
+    ifd = struct.pack('<H', len(entries))
+    for tag, typ, value in entries:
+        ifd += struct.pack('<HHIHH', tag, typ, 1, value, 0) if typ == 3 else struct.pack('<HHII', tag, typ, 1, value)
+    ifd += struct.pack('<I', 0)
+    with open(path, 'wb') as f:
+        f.write(b'II*\x00' + struct.pack('<I', 8) + ifd + pixels)
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f, lineterminator='\n')
+        w.writerow(header)
+        w.writerows(rows)
+
+
+def generate(out_dir, instruments=5000, batches=4, seed=7, images=200, error_rate=0.02,
+             book_start=100, image_size=(PAGE_WIDTH, PAGE_HEIGHT)):
+    """
+    Writes a synthetic county under out_dir and returns a manifest dict (paths, counts,
+    book range) that is also saved as manifest.json next to the data folder.
+    images caps how many TIFFs are written (every image row still gets a CSV line).
+    """
+    rnd = random.Random(seed)
+    root = county_folder(out_dir)
+    edata_dir = os.path.join(root, 'eData Files')
+    keli_dir = os.path.join(root, 'Keli Files')
+    images_dir = os.path.join(root, 'Images')
+    for d in (edata_dir, keli_dir, images_dir): os.makedirs(d, exist_ok=True)
+
+    def defect():
+        return rnd.random() < error_rate
+
+    counts = {'header': 0, 'legal': 0, 'name': 0, 'image': 0, 'reference': 0, 'tiff': 0}
+    pages = []          # (book, page) of every image row
+    book, page = book_start, 1
+    per_batch = -(-instruments // batches)
+    recorded = []
+
+    for b in range(batches):
+        prefix = f"Batch{b + 1:03d}"
+        files = {kind: open(os.path.join(edata_dir, f"{prefix}{kind}.csv"), 'w', encoding='utf-8', newline='\n')
+                 for kind in ('Header', 'Legal', 'Name', 'Image', 'Reference')}
+        try:
+            for seq in range(1, per_batch + 1):
+                n = b * per_batch + seq
+                if n > instruments: break
+                page_count = rnd.choice((1, 1, 2, 2, 3, 4))
+                if page + page_count > 600:
+                    book, page = book + 1, 1
+                inst_no = f"{2000000 + n}"
+                book_txt, page_txt = f"{book:06d}", f"{page:06d}"
+                if defect(): inst_no = ''
+                elif defect(): inst_no += 'X'
+                if defect(): page_txt = f"{page:05d}A"
+                if defect() and recorded: book_txt, page_txt = recorded[-1]
+                recorded.append((book_txt, page_txt))
+                rec_date = f"{rnd.randint(1995, 2024)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+                files['Header'].write(waterfall_line(
+                    [seq, inst_no, rnd.choice(INSTRUMENT_TYPES), book_txt, page_txt, rec_date]) + "\n")
+                counts['header'] += 1
+
+                for _ in range(rnd.choice((0, 1, 1, 1, 2))):
+                    township, rng = rnd.choice(TOWNSHIP_RANGES)
+                    section = str(rnd.randint(1, 36)) if not defect() else str(rnd.randint(37, 99))
+                    quarter = rnd.choice(QUARTERS) if not defect() else 'XX'
+                    addition = rnd.choice(ADDITIONS) if rnd.random() < 0.3 else ''
+                    files['Legal'].write(waterfall_line([seq, section, township, rng, addition, '', '', quarter]) + "\n")
+                    counts['legal'] += 1
+
+                for role in ('Grantor', 'Grantee'):
+                    for _ in range(rnd.choice((1, 1, 1, 2, 3))):
+                        name = '' if defect() else f"{rnd.choice(SURNAMES)}, {rnd.choice(GIVEN)}"
+                        files['Name'].write(waterfall_line([seq, role, name]) + "\n")
+                        counts['name'] += 1
+
+                for p in range(page_count):
+                    pg = page + p
+                    files['Image'].write(waterfall_line([seq, f"{pg:04d}", f"{book:06d}\\{pg:04d}.TIF"]) + "\n")
+                    pages.append((book, pg))
+                    counts['image'] += 1
+
+                if rnd.random() < 0.15 and n > 10:
+                    ref_book, ref_page = recorded[rnd.randint(0, len(recorded) - 2)]
+                    ref = ref_book if not defect() else f"{book + 50:06d}"
+                    files['Reference'].write(waterfall_line([seq, ref, ref_page], [''] * 18 + ['REF']) + "\n")
+                    counts['reference'] += 1
+                page += page_count
+        finally:
+            for f in files.values(): f.close()
+
+    # Keli exports: lookup tables plus the page/manifest lists the linkup joins against
+    write_csv(os.path.join(keli_dir, 'instrument_types.csv'), ['id', 'name', 'record_type', 'active'],
+              [[i + 1, name, 'Instrument', 1 if i < len(INSTRUMENT_TYPES) - 1 else 0] for i, name in enumerate(INSTRUMENT_TYPES)])
+    write_csv(os.path.join(keli_dir, 'additions.csv'), ['id', 'name'], [[i + 1, name] for i, name in enumerate(ADDITIONS)])
+    write_csv(os.path.join(keli_dir, 'record_series.csv'), ['id', 'name'], [[i + 1, str(y)] for i, y in enumerate(range(1995, 2025))])
+    write_csv(os.path.join(keli_dir, 'party_suffixes.csv'), ['id', 'name'], [[1, 'et al'], [2, 'et ux'], [3, 'et vir']])
+    write_csv(os.path.join(keli_dir, 'township_ranges.csv'), ['id', 'Township', 'Range'],
+              [[i + 1, t, r] for i, (t, r) in enumerate(TOWNSHIP_RANGES)])
+    write_csv(os.path.join(keli_dir, 'combined_manifest.csv'), ['id', 'book', 'page', 'path'],
+              [[100000 + i, f"{bk:06d}", f"{pg:04d}", f"MS{bk:04d}/{pg:04d}.TIF"] for i, (bk, pg) in enumerate(pages)])
+    # No path column: Final Preparation's KeliPagesInternal adds one (SELECT *, ... AS path)
+    write_csv(os.path.join(keli_dir, 'pages.csv'), ['id', 'book', 'page_number', 'key_id'],
+              [[500000 + i, f"{bk:06d}", f"{pg:04d}", f"{bk:06d}{pg:04d}"] for i, (bk, pg) in enumerate(pages)])
+
+    for bk, pg in pages[:images]:
+        folder = os.path.join(images_dir, f"{bk:06d}")
+        os.makedirs(folder, exist_ok=True)
+        write_tiff(os.path.join(folder, f"{pg:04d}.TIF"), image_size[0], image_size[1], rnd)
+        counts['tiff'] += 1
+
+    manifest = {
+        'state': STATE, 'county': COUNTY, 'root': root, 'seed': seed, 'instruments': instruments,
+        'batches': batches, 'error_rate': error_rate, 'counts': counts,
+        'book_start': f"{book_start:06d}", 'book_end': f"{book:06d}",
+        'image_path_prefix': images_dir + os.sep, 'image_size': list(image_size),
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f: json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic county for the benchmark suite.")
+    parser.add_argument('out_dir')
+    parser.add_argument('instruments', nargs='?', type=int, default=5000)
+    parser.add_argument('--batches', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--images', type=int, default=200, help="TIFF files to write (0 for none)")
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    args = parser.parse_args()
+
+    manifest = generate(args.out_dir, args.instruments, args.batches, args.seed, args.images, args.error_rate)
+    print(json.dumps(manifest['counts']))
+    print(f"Books {manifest['book_start']}-{manifest['book_end']} under {manifest['root']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
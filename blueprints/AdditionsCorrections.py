@@ -8,6 +8,8 @@ from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from werkzeug.utils import secure_filename
+from county_context import get_county_context
+from db_engine import read_only_connection
 
 # Try to import PIL for image serving
 try:
@@ -18,10 +20,12 @@ except ImportError:
 additions_bp = Blueprint('additions_corrections', __name__)
 
 # [GSI_BLOCK: ac_get_tables]
-def get_tables(county_name):
+def get_tables(ctx):
+    county_name = ctx['county_name']
     return {
         'corrections': f"{county_name}_Additions_Corrections",
-        'additions': f"{county_name}_keli_additions"
+        'additions': f"{county_name}_keli_additions",
+        'data': ctx['tables']['generic_import']
     }
 # [GSI_END: ac_get_tables]
 
@@ -35,7 +39,7 @@ def init_tool():
     c = db.session.get(IndexingCounties, county_id)
     if not c: return jsonify({'success': False, 'message': 'County not found'})
     
-    tables = get_tables(c.county_name)
+    tables = get_tables(get_county_context(c.id))
     
     try:
         # 1. Create Table
@@ -53,7 +57,7 @@ def init_tool():
         sql_merge = f"""
         UPDATE g
         SET g.col05varchar = c.CorrectedCol05Varchar
-        FROM GenericDataImport g
+        FROM [{tables['data']}] g
         INNER JOIN {tables['corrections']} c ON g.col05varchar = c.OriginalCol05Varchar
         WHERE g.fn LIKE '%legal%'
           AND c.CorrectedCol05Varchar IS NOT NULL 
@@ -65,7 +69,7 @@ def init_tool():
         sql_seed = f"""
         INSERT INTO {tables['corrections']} (OriginalCol05Varchar, CorrectedCol05Varchar)
         SELECT DISTINCT col05varchar, NULL
-        FROM GenericDataImport
+        FROM [{tables['data']}]
         WHERE fn LIKE '%legal%' 
           AND col05varchar IS NOT NULL 
           AND col05varchar <> ''
@@ -87,15 +91,17 @@ def get_correction_list():
     county_id = request.json.get('county_id')
     hide_completed = request.json.get('hide_completed', True)
     
-    c = db.session.get(IndexingCounties, county_id)
-    tables = get_tables(c.county_name)
+    ctx = get_county_context(county_id)
+    if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+    tables = get_tables(ctx)
     
     sql = f"SELECT id, OriginalCol05Varchar, CorrectedCol05Varchar FROM {tables['corrections']}"
     if hide_completed:
         sql += " WHERE CorrectedCol05Varchar IS NULL OR CorrectedCol05Varchar = ''"
     sql += " ORDER BY OriginalCol05Varchar"
     
-    results = db.session.execute(text(sql)).fetchall()
+    with read_only_connection() as conn:
+        results = conn.execute(text(sql)).fetchall()
     
     return jsonify({
         'success': True, 
@@ -115,10 +121,12 @@ def get_images_for_record():
     original_val = request.json.get('value')
     relative_base_path = request.json.get('base_path') 
     
-    c = db.session.get(IndexingCounties, county_id)
+    ctx = get_county_context(county_id)
+    if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+    data_table = ctx['tables']['generic_import']
     
     # 1. Find a Legal row using this addition name to get the key link
-    sql_link = "SELECT TOP 1 keyOriginalValue FROM GenericDataImport WHERE col05varchar = :val AND fn LIKE '%legal%'"
+    sql_link = f"SELECT TOP 1 keyOriginalValue FROM [{data_table}] WHERE col05varchar = :val AND fn LIKE '%legal%'"
     link_res = db.session.execute(text(sql_link), {'val': original_val}).fetchone()
     
     header_text = "No Document Found"
@@ -129,7 +137,7 @@ def get_images_for_record():
         header_text = f"Linked Header Key: {key_val}"
 
         # 2. Get images linked to the Header via the key
-        sql_imgs = "SELECT col03varchar FROM GenericDataImport WHERE fn LIKE '%image%' AND keyOriginalValue = :key ORDER BY fn"
+        sql_imgs = f"SELECT col03varchar FROM [{data_table}] WHERE fn LIKE '%image%' AND keyOriginalValue = :key ORDER BY fn"
         imgs = db.session.execute(text(sql_imgs), {'key': key_val}).fetchall()
         
         # 3. Resolve Path
@@ -165,10 +173,10 @@ def search_additions():
     term = data.get('term', '')
     county_id = data.get('county_id')
     
-    c = db.session.get(IndexingCounties, county_id)
-    if not c: return jsonify([])
+    ctx = get_county_context(county_id)
+    if not ctx: return jsonify([])
 
-    tables = get_tables(c.county_name)
+    tables = get_tables(ctx)
     target_table = tables['additions'] 
     
     try:
@@ -180,7 +188,8 @@ def search_additions():
         WHERE name LIKE :term OR comments LIKE :term
         """
         
-        results = db.session.execute(text(sql), {'term': f'%{term}%'}).fetchall()
+        with read_only_connection() as conn:
+            results = conn.execute(text(sql), {'term': f'%{term}%'}).fetchall()
         
         out = []
         for r in results:
@@ -211,13 +220,13 @@ def save_correction():
     if current_user.role != 'admin': return jsonify({'success': False}), 403
     data = request.json
     c = db.session.get(IndexingCounties, data['county_id'])
-    tables = get_tables(c.county_name)
+    tables = get_tables(get_county_context(c.id))
     try:
         # Update Corrections Table
         db.session.execute(text(f"UPDATE {tables['corrections']} SET CorrectedCol05Varchar = :new WHERE OriginalCol05Varchar = :old"), {'new': data['corrected'], 'old': data['original']})
         
-        # Update GenericDataImport (Legals only)
-        db.session.execute(text("UPDATE GenericDataImport SET col05varchar = :new WHERE col05varchar = :old AND fn LIKE '%legal%'"), {'new': data['corrected'], 'old': data['original']})
+        # Update the county's GenericDataImport (Legals only)
+        db.session.execute(text(f"UPDATE [{tables['data']}] SET col05varchar = :new WHERE col05varchar = :old AND fn LIKE '%legal%'"), {'new': data['corrected'], 'old': data['original']})
         
         db.session.commit()
         return jsonify({'success': True})
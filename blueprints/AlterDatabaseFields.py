@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify, current_app, Response, stream_wit
 from flask_login import login_required, current_user
 from sqlalchemy import text, inspect
 from extensions import db
+from county_context import list_generic_import_tables, GENERIC_IMPORT_TABLE
 
 alter_db_bp = Blueprint('alter_db', __name__)
 
@@ -56,6 +57,11 @@ def load_config():
 def save_config(data):
     path = os.path.join(current_app.root_path, CONFIG_FILE)
     with open(path, 'w') as f: json.dump(data, f, indent=4)
+
+def default_constraint(table, column):
+    # Constraint names are unique per schema, so they carry the (per-county) table name
+    if table == GENERIC_IMPORT_TABLE: return f"DF_GDI_{column}"
+    return f"DF_{table}_{column}"
 # [GSI_END: alter_db_config]
 
 @alter_db_bp.route('/api/tools/alter-db/init', methods=['GET'])
@@ -65,10 +71,21 @@ def init_tool():
     if current_user.role != 'admin': return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     try:
         inspector = inspect(db.engine)
-        if not inspector.has_table('GenericDataImport'):
-            return jsonify({'success': False, 'error': 'Table GenericDataImport not found.'})
-
-        columns = inspector.get_columns('GenericDataImport')
+        tables = list_generic_import_tables(db.engine)
+        if not tables:
+            return jsonify({'success': False, 'error': 'No GenericDataImport table found.'})
+
+        # Each county has its own table; list every column that appears in any of them
+        # (renames/adds are applied per table and skip tables where they do not apply)
+        columns, seen = [], set()
+        table_columns = []
+        for table in tables:
+            cols = inspector.get_columns(table)
+            table_columns.append({c['name'].lower() for c in cols})
+            for col in cols:
+                if col['name'].lower() not in seen:
+                    seen.add(col['name'].lower())
+                    columns.append(col)
         saved_config = load_config()
         saved_renames = saved_config.get('renames', {})
         saved_adds = saved_config.get('adds', [])
@@ -89,7 +106,7 @@ def init_tool():
             field_list.append({'original': orig, 'current': current, 'type': str(col['type'])})
 
         # 2. Processing New Fields (THE FIX)
-        existing_col_names = [c['name'].lower() for c in columns]
+        existing_col_names = set.intersection(*table_columns)
         
         # Start with saved user adds
         adds_list = list(saved_adds) 
@@ -102,7 +119,7 @@ def init_tool():
             if df['name'].lower() not in existing_col_names and df['name'].lower() not in current_add_names:
                 adds_list.append(df)
 
-        return jsonify({'success': True, 'fields': field_list, 'new_fields': adds_list})
+        return jsonify({'success': True, 'fields': field_list, 'new_fields': adds_list, 'tables': tables})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
     # [GSI_END: alter_db_init]
@@ -115,14 +132,16 @@ def preview_sql():
     renames = data.get('renames', {})
     new_fields = data.get('new_fields', [])
     save_config({'renames': renames, 'adds': new_fields})
+    tables = list_generic_import_tables(db.engine)
 
-    sql_parts = ["-- DYNAMIC SCHEMA UPDATE\n"]
+    sql_parts = ["-- DYNAMIC SCHEMA UPDATE\n-- Tables: " + (', '.join(tables) or '(none)') + "\n"]
     
     # 1. Renames
     rename_ops = []
-    for old, new in renames.items():
-        if old != new:
-            rename_ops.append(f"IF EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{old}' AND Object_ID = Object_ID(N'GenericDataImport'))\nBEGIN\n    EXEC sp_rename 'GenericDataImport.{old}', '{new}', 'COLUMN';\nEND\nGO")
+    for table in tables:
+        for old, new in renames.items():
+            if old != new:
+                rename_ops.append(f"IF EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{old}' AND Object_ID = Object_ID(N'[{table}]'))\nBEGIN\n    EXEC sp_rename '[{table}].{old}', '{new}', 'COLUMN';\nEND\nGO")
 
     if rename_ops:
         sql_parts.append("-- 1. Renames")
@@ -132,13 +151,14 @@ def preview_sql():
 
     # 2. New Columns
     add_ops = []
-    for f in new_fields:
-        name, ftype, default = f['name'], f['type'], f.get('default', '')
-        op = f"IF NOT EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{name}' AND Object_ID = Object_ID(N'GenericDataImport'))\nBEGIN\n    ALTER TABLE GenericDataImport ADD [{name}] {ftype};\n"
-        if default and 'IDENTITY' not in ftype.upper():
-            op += f"    ALTER TABLE GenericDataImport ADD CONSTRAINT [DF_GDI_{name}] DEFAULT {default} FOR [{name}];\n"
-        op += "END\nGO"
-        add_ops.append(op)
+    for table in tables:
+        for f in new_fields:
+            name, ftype, default = f['name'], f['type'], f.get('default', '')
+            op = f"IF NOT EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{name}' AND Object_ID = Object_ID(N'[{table}]'))\nBEGIN\n    ALTER TABLE [{table}] ADD [{name}] {ftype};\n"
+            if default and 'IDENTITY' not in ftype.upper():
+                op += f"    ALTER TABLE [{table}] ADD CONSTRAINT [{default_constraint(table, name)}] DEFAULT {default} FOR [{name}];\n"
+            op += "END\nGO"
+            add_ops.append(op)
 
     if add_ops:
         sql_parts.append("\n-- 2. New Columns")
@@ -157,26 +177,28 @@ def download_sql():
     data = request.json
     renames = data.get('renames', {})
     new_fields = data.get('new_fields', [])
+    tables = list_generic_import_tables(db.engine)
     
     def generate():
         yield "-- GSI SCHEMA UPDATE SCRIPT\n-- Generated: " + str(sqlalchemy.func.now()) + "\n\n"
         
-        # Renames
-        yield "-- 1. Renames\n"
-        for old, new in renames.items():
-            if old != new:
-                yield f"IF EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{old}' AND Object_ID = Object_ID(N'GenericDataImport'))\n"
-                yield f"BEGIN\n    EXEC sp_rename 'GenericDataImport.{old}', '{new}', 'COLUMN';\nEND\nGO\n\n"
-        
-        # New Fields
-        yield "-- 2. New Columns\n"
-        for f in new_fields:
-            name, ftype, default = f['name'], f['type'], f.get('default', '')
-            yield f"IF NOT EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{name}' AND Object_ID = Object_ID(N'GenericDataImport'))\n"
-            yield f"BEGIN\n    ALTER TABLE GenericDataImport ADD [{name}] {ftype};\n"
-            if default and 'IDENTITY' not in ftype.upper():
-                yield f"    ALTER TABLE GenericDataImport ADD CONSTRAINT [DF_GDI_{name}] DEFAULT {default} FOR [{name}];\n"
-            yield "END\nGO\n\n"
+        for table in tables:
+            # Renames
+            yield f"-- 1. Renames ({table})\n"
+            for old, new in renames.items():
+                if old != new:
+                    yield f"IF EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{old}' AND Object_ID = Object_ID(N'[{table}]'))\n"
+                    yield f"BEGIN\n    EXEC sp_rename '[{table}].{old}', '{new}', 'COLUMN';\nEND\nGO\n\n"
+            
+            # New Fields
+            yield f"-- 2. New Columns ({table})\n"
+            for f in new_fields:
+                name, ftype, default = f['name'], f['type'], f.get('default', '')
+                yield f"IF NOT EXISTS(SELECT 1 FROM sys.columns WHERE Name = N'{name}' AND Object_ID = Object_ID(N'[{table}]'))\n"
+                yield f"BEGIN\n    ALTER TABLE [{table}] ADD [{name}] {ftype};\n"
+                if default and 'IDENTITY' not in ftype.upper():
+                    yield f"    ALTER TABLE [{table}] ADD CONSTRAINT [{default_constraint(table, name)}] DEFAULT {default} FOR [{name}];\n"
+                yield "END\nGO\n\n"
 
     return Response(stream_with_context(generate()), mimetype='application/sql', headers={'Content-Disposition': 'attachment; filename=Schema_Update.sql'})
     # [GSI_END: alter_db_download]
@@ -199,22 +221,24 @@ def run_migration():
     save_config({'renames': renames, 'adds': new_fields})
 
     try:
-        # Renames
-        for old, new in renames.items():
-            if old != new:
-                chk = text(f"SELECT 1 FROM sys.columns WHERE Name=:o AND Object_ID=Object_ID(N'GenericDataImport')")
-                if db.session.execute(chk, {'o': old}).fetchone():
-                    db.session.execute(text(f"EXEC sp_rename 'GenericDataImport.{old}', '{new}', 'COLUMN'"))
-        
-        # New Fields
-        for f in new_fields:
-            name, ftype = f['name'], f['type']
-            chk = text(f"SELECT 1 FROM sys.columns WHERE Name=:n AND Object_ID=Object_ID(N'GenericDataImport')")
-            if not db.session.execute(chk, {'n': name}).fetchone():
-                db.session.execute(text(f"ALTER TABLE GenericDataImport ADD [{name}] {ftype}"))
+        tables = list_generic_import_tables(db.engine)
+        for table in tables:
+            # Renames
+            for old, new in renames.items():
+                if old != new:
+                    chk = text(f"SELECT 1 FROM sys.columns WHERE Name=:o AND Object_ID=Object_ID(N'[{table}]')")
+                    if db.session.execute(chk, {'o': old}).fetchone():
+                        db.session.execute(text(f"EXEC sp_rename '[{table}].{old}', '{new}', 'COLUMN'"))
+            
+            # New Fields
+            for f in new_fields:
+                name, ftype = f['name'], f['type']
+                chk = text(f"SELECT 1 FROM sys.columns WHERE Name=:n AND Object_ID=Object_ID(N'[{table}]')")
+                if not db.session.execute(chk, {'n': name}).fetchone():
+                    db.session.execute(text(f"ALTER TABLE [{table}] ADD [{name}] {ftype}"))
         
         db.session.commit()
-        return jsonify({'success': True, 'message': "Schema updated successfully."})
+        return jsonify({'success': True, 'message': f"Schema updated successfully ({len(tables)} table(s))."})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
     # [GSI_END: alter_db_run]
\ No newline at end of file
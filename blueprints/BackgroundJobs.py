@@ -0,0 +1,76 @@
+import os
+from flask import Blueprint, request, jsonify, send_file
+from flask_login import login_required, current_user
+from job_runner import get_job, list_jobs, cancel_job, job_stream_response, is_live, queue_position, queue_snapshot, job_profile_path, ACTIVE_STATUSES
+from utils import format_error
+
+jobs_bp = Blueprint('background_jobs', __name__)
+
+def can_access(job):
+    return current_user.role == 'admin' or job['user_id'] == current_user.id
+
+# [GSI_BLOCK: jobs_list]
+@jobs_bp.route('/api/jobs', methods=['GET'])
+@login_required
+def get_jobs():
+    """Recent jobs (newest first). Filters: ?county_id=, ?active=1. Non-admins only see their own."""
+    try:
+        county_id = request.args.get('county_id', type=int)
+        active_only = request.args.get('active') in ('1', 'true')
+        user_id = None if current_user.role == 'admin' else current_user.id
+        return jsonify({'success': True, 'jobs': list_jobs(county_id=county_id, user_id=user_id, active_only=active_only)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': format_error(e)})
+
+@jobs_bp.route('/api/jobs/queue', methods=['GET'])
+@login_required
+def get_job_queue():
+    """Scheduler view for this server process: running jobs and the queue with positions."""
+    if current_user.role != 'admin': return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    return jsonify(dict(queue_snapshot(), success=True))
+# [GSI_END: jobs_list]
+
+# [GSI_BLOCK: jobs_detail]
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job_status(job_id):
+    job = get_job(job_id)
+    if not job or not can_access(job): return jsonify({'success': False, 'message': 'Job not found'}), 404
+    job.pop('log_path', None)
+    job['live'] = is_live(job_id)
+    job['queue'] = queue_position(job_id)
+    return jsonify({'success': True, 'job': job})
+
+@jobs_bp.route('/api/jobs/<job_id>/stream', methods=['GET'])
+@login_required
+def stream_job(job_id):
+    """
+    NDJSON progress of a job, replayed from line ?offset= (0 = from the start) and then
+    followed live until the job ends. Reconnect with the number of lines already received.
+    """
+    job = get_job(job_id)
+    if not job or not can_access(job): return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return job_stream_response(job_id, offset=request.args.get('offset', 0, type=int))
+
+@jobs_bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job_request(job_id):
+    job = get_job(job_id)
+    if not job or not can_access(job): return jsonify({'success': False, 'message': 'Job not found'}), 404
+    if job['status'] not in ACTIVE_STATUSES:
+        return jsonify({'success': False, 'message': f"Job is already {job['status']}."})
+    if not cancel_job(job_id):
+        return jsonify({'success': False, 'message': 'Job is running in another server process.'})
+    return jsonify({'success': True, 'message': 'Cancelling after the current step.'})
+
+@jobs_bp.route('/api/jobs/<job_id>/profile', methods=['GET'])
+@login_required
+def download_job_profile(job_id):
+    """The profile of a job started with "profile": true (speedscope JSON or cProfile .pstats)."""
+    job = get_job(job_id)
+    if not job or not can_access(job): return jsonify({'success': False, 'message': 'Job not found'}), 404
+    path, fmt = job_profile_path(job)
+    if not path: return jsonify({'success': False, 'message': 'No profile was recorded for this job.'}), 404
+    return send_file(path, as_attachment=True, download_name=f"{job['tool']}_{job_id}{os.path.basename(path)[len(job_id):]}",
+                     mimetype='application/json' if fmt == 'speedscope' else 'application/octet-stream')
+# [GSI_END: jobs_detail]
@@ -3,6 +3,9 @@ from flask_login import login_required, current_user
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from sqlalchemy import text
+from map_cache import invalidate_map_cache
+from county_context import invalidate_county_context
+from live_events import publish_event, EVENT_COUNTY, EVENT_MAP
 
 county_mgmt_bp = Blueprint('county_mgmt', __name__)
 
@@ -47,6 +50,8 @@ def add_county():
         )
         db.session.add(new_county)
         db.session.commit()
+        invalidate_map_cache()
+        publish_event(EVENT_MAP, reason='county_added', county_id=new_county.id)
         return jsonify({'success': True, 'message': 'County added successfully'})
     except Exception as e:
         db.session.rollback()
@@ -72,6 +77,9 @@ def edit_county():
         county.notes = data.get('notes', '')
         
         db.session.commit()
+        invalidate_map_cache()
+        invalidate_county_context(county.id)
+        publish_event(EVENT_MAP, reason='county_edited', county_id=county.id)
         return jsonify({'success': True, 'message': 'County updated successfully'})
     except Exception as e:
         db.session.rollback()
@@ -98,6 +106,13 @@ def toggle_county():
             county.is_locked = data['value']
             
         db.session.commit()
+        invalidate_map_cache()
+        invalidate_county_context(county.id)
+        # 'enabled' changes which polygons are drawn; 'active' / 'locked' only change status
+        if data['field'] == 'enabled':
+            publish_event(EVENT_MAP, reason='county_toggled', county_id=county.id)
+        else:
+            publish_event(EVENT_COUNTY, county_id=county.id, change=data['field'], value=data['value'])
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -116,8 +131,12 @@ def delete_county():
         county = db.session.get(IndexingCounties, data['id'])
         if not county: return jsonify({'success': False, 'message': 'County not found'})
             
+        county_id = county.id
         db.session.delete(county)
         db.session.commit()
+        invalidate_map_cache()
+        invalidate_county_context(county_id)
+        publish_event(EVENT_MAP, reason='county_deleted', county_id=county_id)
         return jsonify({'success': True, 'message': 'County deleted'})
     except Exception as e:
         db.session.rollback()
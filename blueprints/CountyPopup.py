@@ -6,6 +6,8 @@ from werkzeug.utils import secure_filename
 from extensions import db
 from models import IndexingCounties, CountyImages, Users, IndexingStates
 from utils import format_error
+from map_cache import bump_status_version
+from live_events import publish_event, EVENT_COUNTY
 
 workflow_bp = Blueprint('workflow', __name__)
 
@@ -57,6 +59,8 @@ def toggle_work():
                 current_user.current_working_county_id = None
                 
         db.session.commit()
+        bump_status_version()
+        publish_event(EVENT_COUNTY, county_id=int(cid), change='work', user_id=current_user.id, working=bool(status))
         return jsonify({'success': True})
     except Exception as e: return jsonify({'success': False, 'message': str(e)})
 # [GSI_END: workflow_toggle_work]
@@ -75,6 +79,8 @@ def toggle_split():
         if c:
             c.is_split_job = status
             db.session.commit()
+            bump_status_version()
+            publish_event(EVENT_COUNTY, county_id=c.id, change='split', is_split_job=bool(status))
             return jsonify({'success': True})
         return jsonify({'success': False, 'message': 'County not found'})
     except Exception as e: return jsonify({'success': False, 'message': str(e)})
@@ -89,6 +95,8 @@ def save_notes():
     if c:
         c.notes = request.json.get('notes')
         db.session.commit()
+        bump_status_version()
+        publish_event(EVENT_COUNTY, county_id=c.id, change='notes')
         return jsonify({'success': True})
     return jsonify({'success': False})
 # [GSI_END: workflow_save_notes]
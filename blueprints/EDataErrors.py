@@ -3,7 +3,7 @@ import csv
 import json
 import urllib.parse
 import io
-from flask import Blueprint, request, Response, stream_with_context, current_app, jsonify, send_file
+from flask import Blueprint, request, current_app, jsonify, send_file
 from flask_login import login_required, current_user
 from sqlalchemy import text, inspect
 # [FIX 1] Added secure_filename import
@@ -12,6 +12,11 @@ from extensions import db
 # [FIX 2] Added IndexingStates to the import from models
 from models import IndexingCounties, IndexingStates
 from utils import format_error
+from county_context import get_county_context, scope_generic_import
+from db_engine import read_only_connection
+from job_runner import run_as_job
+from query_plans import plan_preview
+from local_scan import LocalScan, local_scan_unavailable, stage_flagged_ids, flagged_rows_sql, format_age
 
 # Try to import PIL for image serving
 try:
@@ -61,6 +66,9 @@ SPLIT_OVERRIDES = {
     "headerDuplicateBookPageNumber.csv": "where fn like '%image%' and deleteFlag = 'FALSE' and keyOriginalValue in (select OriginalValue from GenericDataImport where fn like '%header%' group by OriginalValue, col04varchar + col05varchar having count(col04varchar + col05varchar) > 1) order by ord, instrumentid",
     "headerDuplicateBookPageNumber.csv": "where fn like '%header%' and deleteFlag = 'FALSE' and fn = ''"
 }
+
+# Where merge-corrections reads the corrected rows from (request "source")
+MERGE_SOURCES = ('scan', 'imported')
 # [GSI_END: edata_errors_queries]
 
 # [GSI_BLOCK: edata_errors_utils]
@@ -88,9 +96,9 @@ def get_safe_table_name(county_id, error_key):
             valid_key = True
             break
     if not valid_key: return None
-    c = db.session.get(IndexingCounties, county_id)
-    if not c: return None
-    return f"{c.county_name}_eData_Errors_{error_key}"
+    ctx = get_county_context(county_id)
+    if not ctx: return None
+    return f"{ctx['tables']['edata_errors_prefix']}{error_key}"
 
 @edata_errors_bp.route('/api/tools/edata-errors/records', methods=['POST'])
 @login_required
@@ -106,7 +114,8 @@ def get_error_records():
             return jsonify({'success': True, 'records': []})
 
         sql = f"SELECT id, OriginalValue FROM [{table_name}] ORDER BY id"
-        res = db.session.execute(text(sql)).fetchall()
+        with read_only_connection() as conn:
+            res = conn.execute(text(sql)).fetchall()
         
         records = [{'id': r.id, 'desc': r.OriginalValue} for r in res]
         return jsonify({'success': True, 'records': records})
@@ -122,22 +131,25 @@ def get_error_context():
         data = request.json
         target_id = data.get('record_id')
         if not target_id: return jsonify({'success': False})
+        ctx = get_county_context(data.get('county_id'))
+        if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+        data_table = ctx['tables']['generic_import']
 
-        sql_context = """
+        sql_context = f"""
             SELECT * FROM (
                 SELECT TOP 10 id, col01varchar, col02varchar, col03varchar, col04varchar, 
                        col05varchar, col06varchar, col07varchar, col08varchar, stech_image_path 
-                FROM GenericDataImport WHERE id < :tid ORDER BY id DESC
+                FROM [{data_table}] WHERE id < :tid ORDER BY id DESC
             ) as prev
             UNION ALL
             SELECT TOP 1 id, col01varchar, col02varchar, col03varchar, col04varchar, 
                    col05varchar, col06varchar, col07varchar, col08varchar, stech_image_path
-            FROM GenericDataImport WHERE id = :tid
+            FROM [{data_table}] WHERE id = :tid
             UNION ALL
             SELECT * FROM (
                 SELECT TOP 10 id, col01varchar, col02varchar, col03varchar, col04varchar, 
                        col05varchar, col06varchar, col07varchar, col08varchar, stech_image_path
-                FROM GenericDataImport WHERE id > :tid ORDER BY id ASC
+                FROM [{data_table}] WHERE id > :tid ORDER BY id ASC
             ) as next
             ORDER BY id
         """
@@ -214,7 +226,8 @@ def save_error_record():
         sql = f"UPDATE [{table_name}] SET {', '.join(set_clauses)} WHERE id = :id"
         db.session.execute(text(sql), params)
         
-        sql_gen = f"UPDATE GenericDataImport SET {', '.join(set_clauses)} WHERE id = :id"
+        data_table = get_county_context(data.get('county_id'))['tables']['generic_import']
+        sql_gen = f"UPDATE [{data_table}] SET {', '.join(set_clauses)} WHERE id = :id"
         db.session.execute(text(sql_gen), params)
         
         db.session.commit()
@@ -231,6 +244,8 @@ def save_generic_record():
         data = request.json
         fields = data.get('fields', {})
         record_id = data.get('record_id')
+        ctx = get_county_context(data.get('county_id'))
+        if not ctx: return jsonify({'success': False, 'message': 'County not found'})
         
         set_clauses = []
         params = {'id': record_id}
@@ -243,7 +258,7 @@ def save_generic_record():
         
         if not set_clauses: return jsonify({'success': True})
         
-        sql = f"UPDATE GenericDataImport SET {', '.join(set_clauses)} WHERE id = :id"
+        sql = f"UPDATE [{ctx['tables']['generic_import']}] SET {', '.join(set_clauses)} WHERE id = :id"
         db.session.execute(text(sql), params)
         db.session.commit()
         
@@ -282,6 +297,54 @@ def get_edata_errors_status(county_id):
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+def build_scan_queries(c, data_table, book_start, book_end, formatted_townships):
+    """(error name, target table, SELECT ... INTO sql) for every rule in QUERIES, for this county."""
+    record_series_tbl = f"{c.county_name}_keli_record_series"
+    inst_types_tbl = f"{c.county_name}_keli_instrument_types"
+    additions_tbl = f"{c.county_name}_keli_additions"
+    manifest_tbl = f"{c.county_name}_keli_combined_manifest"
+
+    scan_queries = []
+    for filename, where_clause in QUERIES.items():
+        clean_name = filename.replace('.csv', '')
+        target_table = f"{c.county_name}_eData_Errors_{clean_name}"
+
+        if c.is_split_job and filename in SPLIT_OVERRIDES:
+             where_clause = SPLIT_OVERRIDES[filename]
+        
+        clean_where = where_clause.split('order by')[0]
+        
+        final_sql = f"SELECT * INTO [{target_table}] FROM GenericDataImport {clean_where}"
+
+        if '{0}' in final_sql and '{1}' in final_sql:
+            final_sql = final_sql.replace('{0}', str(book_start)).replace('{1}', str(book_end))
+        elif '{0}' in final_sql:
+            final_sql = final_sql.replace('{0}', formatted_townships)
+        
+        final_sql = final_sql.replace('fromkellprorecord_series', record_series_tbl)
+        final_sql = final_sql.replace('fromkellproinstrument_types', inst_types_tbl)
+        final_sql = final_sql.replace('fromkellproadditions', additions_tbl)
+        final_sql = final_sql.replace('fromkellprocombined_manifest', manifest_tbl)
+        scan_queries.append((clean_name, target_table, scope_generic_import(final_sql, data_table)))
+    return scan_queries
+
+@edata_errors_bp.route('/api/tools/edata-errors/preview', methods=['POST'])
+@login_required
+def preview_edata_scan():
+    """The scan's SELECT ... INTO statements; "plan": "estimated" | "actual" adds execution plan figures per rule."""
+    if current_user.role != 'admin': return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    data = request.json
+    c = db.session.get(IndexingCounties, data.get('county_id'))
+    if not c: return jsonify({'success': False, 'message': 'County not found'})
+
+    data_table = get_county_context(c.id)['tables']['generic_import']
+    scan_queries = build_scan_queries(c, data_table, data.get('book_start', '000000'), data.get('book_end', '999999'),
+                                      parse_townships(data.get('townships', '')))
+    try:
+        return jsonify(dict(plan_preview([(name, sql) for name, _, sql in scan_queries], data), success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'message': format_error(e)})
+
 @edata_errors_bp.route('/api/tools/edata-errors/scan', methods=['POST'])
 @login_required
 def scan_edata_errors():
@@ -297,8 +360,16 @@ def scan_edata_errors():
     if not c: return jsonify({'success': False, 'message': 'County not found'})
     
     is_split_mode = c.is_split_job 
+    data_table = get_county_context(c.id)['tables']['generic_import']
 
     formatted_townships = parse_townships(townships)
+    scan_queries = build_scan_queries(c, data_table, book_start, book_end, formatted_townships)
+
+    # "engine": "local" evaluates the rules in DuckDB and writes back only the flagged IDs (see local_scan)
+    use_local = data.get('engine') == 'local'
+    refresh_cache = bool(data.get('refresh_cache'))
+    if use_local and local_scan_unavailable():
+        return jsonify({'success': False, 'message': local_scan_unavailable()})
     
     def generate_scan_stream():
         yield json.dumps({'type': 'start', 'message': f'Starting Error Scan for {c.county_name} (Split Mode: {is_split_mode})...'}) + '\n'
@@ -308,43 +379,43 @@ def scan_edata_errors():
             count = 0
             tables_created = 0
 
-            record_series_tbl = f"{c.county_name}_keli_record_series"
-            inst_types_tbl = f"{c.county_name}_keli_instrument_types"
-            additions_tbl = f"{c.county_name}_keli_additions"
-            manifest_tbl = f"{c.county_name}_keli_combined_manifest"
+            # rule index -> flagged IDs; rules the local engine cannot run stay on SQL Server
+            flagged = {}
+            if use_local:
+                yield json.dumps({'type': 'log', 'message': 'Local scan: loading eData into DuckDB...'}) + '\n'
+                scan = LocalScan(data_table, scan_queries, refresh=refresh_cache)
+                try:
+                    rows, cache_age = scan.load()
+                    if cache_age is None:
+                        source = 'copied from SQL Server'
+                    else:
+                        source = f"from the Parquet cache saved {format_age(cache_age)} ago (Refresh Cache reloads it)"
+                    yield json.dumps({'type': 'log', 'message': f"Local scan: {rows} rows {source}", 'cache_age': cache_age}) + '\n'
+                    for rule_no, (clean_name, _, _) in enumerate(scan_queries):
+                        try:
+                            flagged[rule_no] = scan.flagged_ids(clean_name)
+                        except Exception as local_ex:
+                            yield json.dumps({'type': 'log', 'message': f"{clean_name} runs on SQL Server ({format_error(local_ex)})"}) + '\n'
+                finally:
+                    scan.close()
 
             with db.session.begin():
-                for filename, where_clause in QUERIES.items():
+                if flagged: stage_flagged_ids(db.session, flagged)
+                for rule_no, (clean_name, target_table, final_sql) in enumerate(scan_queries):
                     count += 1
-                    clean_name = filename.replace('.csv', '')
-                    target_table = f"{c.county_name}_eData_Errors_{clean_name}"
                     
                     db.session.execute(text(f"IF OBJECT_ID('[{target_table}]', 'U') IS NOT NULL DROP TABLE [{target_table}]"))
-                    
-                    if is_split_mode and filename in SPLIT_OVERRIDES:
-                         where_clause = SPLIT_OVERRIDES[filename]
-                    
-                    clean_where = where_clause.split('order by')[0]
-                    
-                    final_sql = f"SELECT * INTO [{target_table}] FROM GenericDataImport {clean_where}"
-
-                    if '{0}' in final_sql and '{1}' in final_sql:
-                        final_sql = final_sql.replace('{0}', str(book_start)).replace('{1}', str(book_end))
-                    elif '{0}' in final_sql:
-                        final_sql = final_sql.replace('{0}', formatted_townships)
-                    
-                    final_sql = final_sql.replace('fromkellprorecord_series', record_series_tbl)
-                    final_sql = final_sql.replace('fromkellproinstrument_types', inst_types_tbl)
-                    final_sql = final_sql.replace('fromkellproadditions', additions_tbl)
-                    final_sql = final_sql.replace('fromkellprocombined_manifest', manifest_tbl)
 
                     try:
-                        db.session.execute(text(final_sql))
-                        row_count = db.session.execute(text(f"SELECT COUNT(*) FROM [{target_table}]")).scalar()
-                        
-                        if row_count == 0:
-                            db.session.execute(text(f"DROP TABLE [{target_table}]"))
+                        if rule_no in flagged:
+                            row_count = len(flagged[rule_no])
+                            if row_count: db.session.execute(text(flagged_rows_sql(target_table, data_table, rule_no)))
                         else:
+                            db.session.execute(text(final_sql))
+                            row_count = db.session.execute(text(f"SELECT COUNT(*) FROM [{target_table}]")).scalar()
+                            if row_count == 0: db.session.execute(text(f"DROP TABLE [{target_table}]"))
+
+                        if row_count:
                             tables_created += 1
                             yield json.dumps({'type': 'log', 'message': f"Found {row_count} errors in {clean_name}"}) + '\n'
 
@@ -359,7 +430,7 @@ def scan_edata_errors():
         except Exception as e:
              yield json.dumps({'type': 'error', 'message': format_error(e)}) + '\n'
 
-    return Response(stream_with_context(generate_scan_stream()), mimetype='application/json')
+    return run_as_job('edata_error_scan', generate_scan_stream(), county_id=c.id, tables=(data_table,))
 
 @edata_errors_bp.route('/api/tools/edata-errors/get-defaults/<int:county_id>', methods=['GET'])
 @login_required
@@ -401,21 +472,28 @@ def merge_edata_corrections():
         data = request.json
         county_id = data.get('county_id')
         merge_type = data.get('merge_type') # e.g., 'edata_errors'
+        # 'scan': the error tables the scan wrote ([County]_eData_Errors_[File], corrected in place).
+        # 'imported': the corrected files loaded by Import eData Errors ([StateAbbr]_[County]_eData_Errors_[File]).
+        source = data.get('source') or 'scan'
+        if source not in MERGE_SOURCES: return jsonify({'success': False, 'message': f'Unknown merge source: {source}'})
         
-        c = db.session.get(IndexingCounties, county_id)
-        if not c: return jsonify({'success': False, 'message': 'County not found'})
+        ctx = get_county_context(county_id)
+        if not ctx: return jsonify({'success': False, 'message': 'County not found'})
 
-        tables_merged = 0
+        tables_merged = []
         
         if merge_type == 'edata_errors':
             # 1. Identify all active error tables for this county
             insp = inspect(db.engine)
             all_tables = insp.get_table_names()
+
+            # Both kinds carry an INT ID, so the join below seeks on it
+            prefix = ctx['tables']['imported_errors_prefix' if source == 'imported' else 'edata_errors_prefix']
+            data_table = ctx['tables']['generic_import']
             
             # QUERIES is defined at top of file
             for key in QUERIES.keys():
-                clean_name = key.replace('.csv', '')
-                error_table = f"{c.county_name}_eData_Errors_{clean_name}"
+                error_table = f"{prefix}{key.replace('.csv', '')}"
                 
                 if error_table in all_tables:
                     # 2. Construct Merge SQL (Update Main from Error Table)
@@ -433,14 +511,17 @@ def merge_edata_corrections():
                             g.col09varchar = t.col09varchar,
                             g.col10varchar = t.col10varchar,
                             g.OriginalValue = t.OriginalValue
-                        FROM GenericDataImport g
+                        FROM [{data_table}] g
                         INNER JOIN [{error_table}] t ON g.id = t.id
                     """
                     db.session.execute(text(sql))
-                    tables_merged += 1
+                    tables_merged.append(error_table)
             
             db.session.commit()
-            return jsonify({'success': True, 'message': f'Successfully merged {tables_merged} error tables.'})
+            print(f" >>> MERGED eData ERROR CORRECTIONS ({source}) into {data_table}: {', '.join(tables_merged) or 'none'}")
+            label = 'imported correction' if source == 'imported' else 'scan error'
+            return jsonify({'success': True, 'source': source, 'tables': tables_merged,
+                            'message': f"Successfully merged {len(tables_merged)} {label} tables into {data_table}."})
             
         return jsonify({'success': False, 'message': 'Unknown merge type'})
 
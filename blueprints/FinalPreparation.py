@@ -1,12 +1,19 @@
 import os
-from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties
+from job_runner import run_as_job
+from county_context import get_county_context, scope_generic_import, GENERIC_IMPORT_TABLE
+from query_plans import plan_preview
+from utils import format_error
 
 final_prep_bp = Blueprint('final_prep', __name__)
 
+# Work tables the queries below create (replaced with per-county names alongside GenericDataImport)
+SCRATCH_TABLES = ('KeliPageCount', 'KeliPagesInternal', 'KeliBegEndPageNumbers', 'partySuffixCount', 'KeliGrantorGranteeSuffix')
+
 # SQL Queries from your uploads
 QUERIES = [
     {
@@ -70,19 +77,8 @@ QUERIES = [
     }
 ]
 
-@final_prep_bp.route('/api/tools/final-preparation/execute', methods=['POST'])
-@login_required
-def execute_final_prep():
-    if current_user.role != 'admin': return jsonify({'message': 'Unauthorized'}), 403
-    
-    data = request.json
-    county_id = data.get('county_id')
-    book_start = data.get('book_start', '000000')
-    book_end = data.get('book_end', '999999')
-
-    c = db.session.get(IndexingCounties, county_id)
-    if not c: return jsonify({'message': 'County not found'}), 404
-
+def build_final_prep_steps(c, data_table, book_start, book_end):
+    """(name, sql) steps of QUERIES for a county: placeholders filled and table names resolved."""
     # Replace placeholders in SQL
     processed_queries = []
     for q in QUERIES:
@@ -91,16 +87,52 @@ def execute_final_prep():
         if '{0}' in sql:
             sql = sql.replace('{0}', book_start).replace('{1}', book_end)
         
-        # Replace table names with county specific names if needed (assuming these are shared tables or specific to county context?)
-        # Based on your previous tools, you often prefix tables. 
-        # However, these scripts use "GenericDataImport" (main table) and create new tables (e.g. KeliPageCount).
-        # Assuming standard behavior is running this ON the county's database connection.
+        # The county's GenericDataImport; with per-county tables the work tables get the same
+        # state/county prefix too, so two counties can run Final Preparation at the same time
+        if data_table != GENERIC_IMPORT_TABLE:
+            prefix = data_table[:-len(GENERIC_IMPORT_TABLE)]
+            for name in SCRATCH_TABLES:
+                sql = sql.replace(name, f"{prefix}{name}")
+        sql = scope_generic_import(sql, data_table)
         
         # Specific replacements for 'fromkellpropages' and 'fromkellproparty_suffixes' if they are county specific
         sql = sql.replace('fromkellpropages', f"{c.county_name}_keli_pages")
         sql = sql.replace('fromkellproparty_suffixes', f"{c.county_name}_keli_party_suffixes")
         
-        processed_queries.append({'name': q['name'], 'sql': sql})
+        processed_queries.append((q['name'], sql))
+    return processed_queries
+
+@final_prep_bp.route('/api/tools/final-preparation/preview', methods=['POST'])
+@login_required
+def preview_final_prep():
+    """The Final Preparation script; "plan": "estimated" | "actual" adds execution plan figures per step."""
+    if current_user.role != 'admin': return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    data = request.json
+    c = db.session.get(IndexingCounties, data.get('county_id'))
+    if not c: return jsonify({'success': False, 'message': 'County not found'})
+
+    data_table = get_county_context(c.id)['tables']['generic_import']
+    steps = build_final_prep_steps(c, data_table, data.get('book_start', '000000'), data.get('book_end', '999999'))
+    try:
+        return jsonify(dict(plan_preview(steps, data), success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'message': format_error(e)})
+
+@final_prep_bp.route('/api/tools/final-preparation/execute', methods=['POST'])
+@login_required
+def execute_final_prep():
+    if current_user.role != 'admin': return jsonify({'message': 'Unauthorized'}), 403
+    
+    data = request.json
+    county_id = data.get('county_id')
+    book_start = data.get('book_start', '000000')
+    book_end = data.get('book_end', '999999')
+
+    c = db.session.get(IndexingCounties, county_id)
+    if not c: return jsonify({'message': 'County not found'}), 404
+
+    data_table = get_county_context(c.id)['tables']['generic_import']
+    processed_queries = build_final_prep_steps(c, data_table, book_start, book_end)
 
     def generate():
         import json
@@ -108,10 +140,10 @@ def execute_final_prep():
         
         try:
             with db.session.begin():
-                for step in processed_queries:
-                    yield json.dumps({'type': 'log', 'message': f"Running: {step['name']}..."}) + '\n'
-                    db.session.execute(text(step['sql']))
-                    yield json.dumps({'type': 'log', 'message': f"Completed: {step['name']}"}) + '\n'
+                for name, sql in processed_queries:
+                    yield json.dumps({'type': 'log', 'message': f"Running: {name}..."}) + '\n'
+                    db.session.execute(text(sql))
+                    yield json.dumps({'type': 'log', 'message': f"Completed: {name}"}) + '\n'
             
             db.session.commit()
             yield json.dumps({'type': 'complete', 'message': 'Final Preparation Completed Successfully.'}) + '\n'
@@ -119,4 +151,4 @@ def execute_final_prep():
             db.session.rollback()
             yield json.dumps({'type': 'error', 'message': str(e)}) + '\n'
 
-    return Response(stream_with_context(generate()), mimetype='application/json')
\ No newline at end of file
+    return run_as_job('final_prep', generate(), county_id=c.id, tables=(data_table,))
\ No newline at end of file
@@ -1,21 +1,24 @@
 import os
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import Blueprint, request, Response, stream_with_context, current_app, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from utils import format_error
+from bulk_loader import LOADER_CLIENT, resolve_loader, bulk_load_csv
+from job_runner import run_as_job
 from werkzeug.utils import secure_filename
 
 import_edata_errors_bp = Blueprint('import_edata_errors', __name__)
 
 # [GSI_BLOCK: import_edata_constants]
-# Standard Schema
+# Standard Schema (ID / instrumentid typed to match GenericDataImport so merges join on INT)
 CREATE_TABLE_SQL = """
 CREATE TABLE [{table_name}] (
-    [ID] varchar(255), [FN] varchar(255), [OriginalValue] varchar(max),
+    [ID] int, [FN] varchar(255), [OriginalValue] varchar(max),
     [col01varchar] varchar(255), [col02varchar] varchar(255), [col03varchar] varchar(255),
     [col04varchar] varchar(255), [col05varchar] varchar(255), [col06varchar] varchar(255),
     [col07varchar] varchar(255), [col08varchar] varchar(255), [col09varchar] varchar(255),
@@ -29,12 +32,68 @@ CREATE TABLE [{table_name}] (
     [township_range_internal_id] varchar(255), [township_range_external_id] varchar(255),
     [col20other] varchar(255), [uf1] varchar(255), [uf2] varchar(255), [uf3] varchar(255),
     [leftovers] varchar(max), [instTypeOriginal] varchar(255), [keyOriginalValue] varchar(255),
-    [deleteFlag] varchar(50), [change_script_locations] varchar(max), [instrumentid] varchar(50),
+    [deleteFlag] varchar(50), [change_script_locations] varchar(max), [instrumentid] int,
     [checked] varchar(50)
 )
 """
+
+# Clustered on ID after the load (cheaper than loading into a clustered table)
+INDEX_SQL = "CREATE CLUSTERED INDEX [IX_{table_name}_ID] ON [{table_name}] ([ID])"
+
+BULK_INSERT_SQL = "BULK INSERT [{table_name}] FROM '{path}' WITH (FORMAT = 'CSV', FIRSTROW = 2, FIELDTERMINATOR = ',', ROWTERMINATOR = '\\n', TABLOCK)"
+
+# Files are independent tables, so they load on parallel connections
+DEFAULT_IMPORT_WORKERS = 4
+MAX_IMPORT_WORKERS = 8
 # [GSI_END: import_edata_constants]
 
+# [GSI_BLOCK: import_edata_utils]
+def error_table_name(state_abbr, county_name, filename):
+    # Naming Convention: [StateAbbr]_[County]_eData_Errors_[File]
+    # Clean filename: remove extension, replace spaces/dashes
+    clean_name = os.path.splitext(filename)[0].replace(' ', '_').replace('-', '_')
+    return f"{state_abbr}_{county_name}_eData_Errors_{clean_name}"
+
+def import_script(table_name, file_full_path):
+    """SSMS script for one file (preview / download)."""
+    return (
+        f"IF OBJECT_ID('{table_name}', 'U') IS NOT NULL DROP TABLE [{table_name}]\n"
+        + CREATE_TABLE_SQL.format(table_name=table_name) + "\n"
+        + BULK_INSERT_SQL.format(table_name=table_name, path=file_full_path.replace("'", "''")) + "\n"
+        + INDEX_SQL.format(table_name=table_name) + "\nGO\n\n"
+    )
+
+def import_error_file(engine, table_name, file_full_path, loader):
+    """
+    Worker: drop/create, load and index one error table on its own raw connection.
+    Returns the loaded row count; rolls back and re-raises on failure.
+    """
+    connection = engine.raw_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"IF OBJECT_ID('{table_name}', 'U') IS NOT NULL DROP TABLE [{table_name}]")
+        cursor.execute(CREATE_TABLE_SQL.format(table_name=table_name))
+        connection.commit() # Commit schema change
+
+        if loader == LOADER_CLIENT:
+            # Streams the file from this host; commits on success
+            row_count = bulk_load_csv(connection, f"[{table_name}]", file_full_path)
+        else:
+            cursor.execute(BULK_INSERT_SQL.format(table_name=table_name, path=file_full_path.replace("'", "''")))
+            row_count = cursor.rowcount
+            connection.commit() # Commit data
+
+        cursor.execute(INDEX_SQL.format(table_name=table_name))
+        connection.commit()
+        return row_count
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+# [GSI_END: import_edata_utils]
+
 @import_edata_errors_bp.route('/api/tools/import-edata-errors/download-sql', methods=['GET'])
 @login_required
 def download_sql():
@@ -60,14 +119,11 @@ def download_sql():
             
         files = [f for f in os.listdir(base_path) if f.lower().endswith('.csv')]
         for filename in files:
-            clean_name = os.path.splitext(filename)[0].replace(' ', '_').replace('-', '_')
-            table_name = f"{state_abbr}_{c.county_name}_eData_Errors_{clean_name}"
+            table_name = error_table_name(state_abbr, c.county_name, filename)
             file_full_path = os.path.join(base_path, filename)
             
             yield f"-- File: {filename}\n"
-            yield f"IF OBJECT_ID('{table_name}', 'U') IS NOT NULL DROP TABLE [{table_name}]\n"
-            yield CREATE_TABLE_SQL.format(table_name=table_name) + "\n"
-            yield f"BULK INSERT [{table_name}] FROM '{file_full_path}' WITH (FORMAT = 'CSV', FIRSTROW = 2, FIELDTERMINATOR = ',', ROWTERMINATOR = '\\n', TABLOCK)\nGO\n\n"
+            yield import_script(table_name, file_full_path)
 
     filename = f"Import_Errors_{c.county_name}.sql"
     return Response(stream_with_context(generate()), mimetype='application/sql', headers={'Content-Disposition': f'attachment; filename={filename}'})
@@ -101,14 +157,11 @@ def preview_import():
     sql_output = f"-- PREVIEW: Found {len(files)} files to import\n\n"
     
     for filename in files:
-        clean_name = os.path.splitext(filename)[0].replace(' ', '_').replace('-', '_')
-        table_name = f"{state_abbr}_{c.county_name}_eData_Errors_{clean_name}"
+        table_name = error_table_name(state_abbr, c.county_name, filename)
         file_full_path = os.path.join(base_path, filename)
         
         sql_output += f"-- File: {filename}\n"
-        sql_output += f"IF OBJECT_ID('{table_name}', 'U') IS NOT NULL DROP TABLE [{table_name}]\n"
-        sql_output += CREATE_TABLE_SQL.format(table_name=table_name) + "\n"
-        sql_output += f"BULK INSERT [{table_name}] FROM '{file_full_path}' WITH (FORMAT = 'CSV', FIRSTROW = 2, FIELDTERMINATOR = ',', ROWTERMINATOR = '\\n', TABLOCK)\nGO\n\n"
+        sql_output += import_script(table_name, file_full_path)
         
     return jsonify({'success': True, 'sql': sql_output})
     # [GSI_END: import_edata_preview]
@@ -143,6 +196,7 @@ def execute_import():
     data = request.json
     county_id = data.get('county_id')
     debug_mode = data.get('debug', False) # Check Debug Flag
+    loader = resolve_loader(data.get('loader')) # 'server' BULK INSERT or 'client' row streaming
     
     c = db.session.get(IndexingCounties, county_id)
     if not c: return jsonify({'success': False, 'message': 'County not found'})
@@ -153,6 +207,11 @@ def execute_import():
     
     base_path = os.path.join(current_app.root_path, 'data', secure_filename(s.state_name), secure_filename(c.county_name), 'eData Errors')
     
+    try:
+        workers = int(data.get('workers') or DEFAULT_IMPORT_WORKERS)
+    except (TypeError, ValueError):
+        workers = DEFAULT_IMPORT_WORKERS
+
     def generate_stream():
         yield json.dumps({'type': 'start', 'message': f'Starting Import for {c.county_name}...'}) + '\n'
         
@@ -171,72 +230,50 @@ def execute_import():
             yield json.dumps({'type': 'complete', 'message': 'No CSV files found.'}) + '\n'
             return
 
-        # Using explicit connection for raw SQL control
+        pool_size = max(1, min(workers, MAX_IMPORT_WORKERS, total))
+        yield json.dumps({'type': 'log', 'message': f"Importing {total} files with {pool_size} connection(s) ({loader} loader)."}) + '\n'
+
         engine = db.engine
-        connection = engine.raw_connection()
-        cursor = connection.cursor()
+        start_time = time.perf_counter()
+        imported = 0
+        errors = []
 
         try:
-            for i, filename in enumerate(files):
-                # 1. Naming Convention: [StateAbbr]_[County]_eData_Errors_[File]
-                # Clean filename: remove extension, replace spaces/dashes
-                clean_name = os.path.splitext(filename)[0].replace(' ', '_').replace('-', '_')
-                table_name = f"{state_abbr}_{c.county_name}_eData_Errors_{clean_name}"
-                
-                if debug_mode:
-                    yield json.dumps({'type': 'log', 'message': f"DEBUG: Target Table -> [{table_name}]"}) + '\n'
-
-                # 2. Drop & Create
-                drop_sql = f"IF OBJECT_ID('{table_name}', 'U') IS NOT NULL DROP TABLE [{table_name}]"
-                create_sql = CREATE_TABLE_SQL.format(table_name=table_name)
-                
-                cursor.execute(drop_sql)
-                cursor.execute(create_sql)
-                connection.commit() # Commit schema change
-
-                # 3. Bulk Insert
-                file_full_path = os.path.join(base_path, filename)
-                bulk_sql = f"""
-                    BULK INSERT [{table_name}]
-                    FROM '{file_full_path}'
-                    WITH (
-                        FORMAT = 'CSV',
-                        FIRSTROW = 2,
-                        FIELDTERMINATOR = ',',
-                        ROWTERMINATOR = '\\n',
-                        TABLOCK
-                    )
-                """
-                
-                if debug_mode:
-                    yield json.dumps({'type': 'log', 'message': f"DEBUG: Executing Bulk Insert on {filename}..."}) + '\n'
-
-                try:
-                    cursor.execute(bulk_sql)
-                    connection.commit() # Commit data
-                    row_count = cursor.rowcount
-                    
-                    msg = f"Imported {filename} ({row_count} rows)"
+            with ThreadPoolExecutor(max_workers=pool_size) as pool:
+                futures = {}
+                for filename in files:
+                    table_name = error_table_name(state_abbr, c.county_name, filename)
                     if debug_mode:
-                        yield json.dumps({'type': 'log', 'message': f"SUCCESS: {msg}"}) + '\n'
-                        
-                except Exception as sql_err:
-                    connection.rollback()
-                    err_msg = f"SQL Error on {filename}: {str(sql_err)}"
-                    yield json.dumps({'type': 'log', 'message': err_msg}) + '\n'
-                    yield json.dumps({'type': 'error', 'message': err_msg}) + '\n'
+                        yield json.dumps({'type': 'log', 'message': f"DEBUG: Target Table -> [{table_name}]"}) + '\n'
+                    futures[pool.submit(import_error_file, engine, table_name, os.path.join(base_path, filename), loader)] = filename
+
+                # Results stream back in completion order
+                for i, future in enumerate(as_completed(futures)):
+                    filename = futures[future]
+                    status = f"Imported {filename}"
+                    try:
+                        row_count = future.result()
+                        imported += 1
+                        msg = f"Imported {filename} ({row_count} rows)"
+                        if debug_mode:
+                            yield json.dumps({'type': 'log', 'message': f"SUCCESS: {msg}"}) + '\n'
+                    except Exception as sql_err:
+                        err_msg = f"SQL Error on {filename}: {format_error(sql_err)}"
+                        errors.append(err_msg)
+                        status = f"Failed {filename}"
+                        yield json.dumps({'type': 'log', 'message': err_msg}) + '\n'
+                        yield json.dumps({'type': 'error', 'message': err_msg}) + '\n'
 
-                percent = int(((i + 1) / total) * 100)
-                yield json.dumps({'type': 'progress', 'percent': percent, 'message': f"Importing {filename}..."}) + '\n'
-                time.sleep(0.1)
+                    percent = int(((i + 1) / total) * 100)
+                    yield json.dumps({'type': 'progress', 'percent': percent, 'message': status}) + '\n'
 
-            yield json.dumps({'type': 'complete', 'message': 'Import Process Completed.'}) + '\n'
+            elapsed = round(time.perf_counter() - start_time, 2)
+            msg = f"Import Process Completed. {imported}/{total} files in {elapsed}s."
+            if errors: msg += f" ({len(errors)} errors)"
+            yield json.dumps({'type': 'complete', 'message': msg}) + '\n'
 
         except Exception as e:
             yield json.dumps({'type': 'error', 'message': str(e)}) + '\n'
-        finally:
-            cursor.close()
-            connection.close()
 
-    return Response(stream_with_context(generate_stream()), mimetype='application/json')
+    return run_as_job('import_edata_errors', generate_stream(), county_id=c.id)
     # [GSI_END: import_edata_execute]
\ No newline at end of file
@@ -8,18 +8,23 @@ from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from utils import format_error
+from keli_tables import build_keli_index_steps
+from job_runner import run_as_job
+from county_context import scope_generic_import, get_county_context
+from query_plans import plan_preview
 from werkzeug.utils import secure_filename
 
 initial_linkup_bp = Blueprint('initial_keli_linkup', __name__)
 
 # [GSI_BLOCK: linkup_generator]
-def generate_linkup_sql(county_name, use_book_range=False, book_start=None, book_end=None, use_path=False, image_path_prefix='', linkup_mode='neither', split_images=False):
+def generate_linkup_sql(county_name, data_table, use_book_range=False, book_start=None, book_end=None, use_path=False, image_path_prefix='', linkup_mode='neither', split_images=False):
     """
     Generates the SQL script steps for the Initial Keli Linkup Tool.
     """
     steps = []
     
     def process_sql(sql_content, step_name):
+        sql_content = scope_generic_import(sql_content, data_table)
         sql_content = sql_content.replace('fromkellproinstrument_types', f"{county_name}_keli_instrument_types")
         sql_content = sql_content.replace('fromkellproadditions', f"{county_name}_keli_additions")
         sql_content = sql_content.replace('fromkellprocombined_manifest', f"{county_name}_keli_combined_manifest")
@@ -88,7 +93,8 @@ def generate_linkup_sql(county_name, use_book_range=False, book_start=None, book
     # --- MANIFEST LOGIC ---
     if use_book_range and book_start and book_end:
         if linkup_mode == 'manifest':
-            sql_11 = r"update a set keli_image_path = b.id from GenericDataImport a, fromkellprocombined_manifest b where a.fn like '%image%' and keli_image_path = '' and b.book between '{0}' and '{1}' and a.col03varchar = replace(replace(b.path, 'MS', '00'), '/', '\')"
+            # linkup_path is the persisted, indexed form of replace(replace(path, 'MS', '00'), '/', '\') (see keli_tables)
+            sql_11 = "update a set keli_image_path = b.id from GenericDataImport a, fromkellprocombined_manifest b where a.fn like '%image%' and keli_image_path = '' and b.book between '{0}' and '{1}' and a.col03varchar = b.linkup_path"
             steps.append(process_sql(sql_11, 'Linking Combined Manifest IDs'))
 
             if not split_images:
@@ -160,14 +166,19 @@ def preview_linkup():
     c = db.session.get(IndexingCounties, data.get('county_id'))
     if not c: return jsonify({'success': False, 'message': 'County not found'})
     
+    data_table = get_county_context(c.id)['tables']['generic_import']
     steps = generate_linkup_sql(
-        c.county_name, 
+        c.county_name, data_table,
         data.get('use_book_range', False), data.get('book_start'), data.get('book_end'),
         data.get('use_path', False), data.get('image_path_prefix'),
         data.get('linkup_mode', 'neither'), data.get('split_images', False)
     )
-    full_script = "\n".join([s[1] for s in steps])
-    return jsonify({'success': True, 'sql': full_script})
+    steps[1:1] = build_keli_index_steps(c.county_name)
+    # "plan": "estimated" | "actual" adds execution plan figures to every step (see query_plans)
+    try:
+        return jsonify(dict(plan_preview(steps, data), success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'message': format_error(e)})
     # [GSI_END: linkup_preview]
 
 @initial_linkup_bp.route('/api/tools/initial-keli-linkup/download-sql', methods=['POST'])
@@ -179,10 +190,12 @@ def download_sql():
     c = db.session.get(IndexingCounties, data.get('county_id'))
     if not c: return Response("County not found", 404)
 
+    data_table = get_county_context(c.id)['tables']['generic_import']
     steps = generate_linkup_sql(
-        c.county_name, data.get('use_book_range'), data.get('book_start'), data.get('book_end'),
+        c.county_name, data_table, data.get('use_book_range'), data.get('book_start'), data.get('book_end'),
         data.get('use_path'), data.get('image_path_prefix'), data.get('linkup_mode'), data.get('split_images')
     )
+    steps[1:1] = build_keli_index_steps(c.county_name)
     
     def generate():
         for name, sql in steps:
@@ -201,12 +214,15 @@ def execute_linkup():
     c = db.session.get(IndexingCounties, data.get('county_id'))
     if not c: return jsonify({'success': False, 'message': 'County not found'})
 
+    data_table = get_county_context(c.id)['tables']['generic_import']
     steps = generate_linkup_sql(
-        c.county_name, 
+        c.county_name, data_table,
         data.get('use_book_range', False), data.get('book_start'), data.get('book_end'),
         data.get('use_path', False), data.get('image_path_prefix'),
         data.get('linkup_mode', 'neither'), data.get('split_images', False)
     )
+    # Right-size and index the Keli lookup tables first so the joins below can seek
+    steps[1:1] = build_keli_index_steps(c.county_name)
     total_steps = len(steps)
     
     def generate_stream():
@@ -222,5 +238,5 @@ def execute_linkup():
         except Exception as e:
             yield json.dumps({'type': 'error', 'message': format_error(e)}) + '\n'
 
-    return Response(stream_with_context(generate_stream()), mimetype='application/json')
+    return run_as_job('keli_linkup', generate_stream(), county_id=c.id, tables=(data_table,))
     # [GSI_END: linkup_execute]
\ No newline at end of file
@@ -8,12 +8,17 @@ from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from utils import format_error
+from job_runner import run_as_job
+from county_context import scope_generic_import, get_county_context
+from table_snapshots import begin_snapshot_sql, capture_sql, list_snapshots, restore_steps
+from db_engine import read_only_connection
+from query_plans import plan_preview
 from werkzeug.utils import secure_filename
 
 initial_prep_bp = Blueprint('initial_preparation', __name__)
 
 # [GSI_BLOCK: prep_sql_generator]
-def generate_prep_sql(county_name, book_start=None, book_end=None, image_path_prefix=''):
+def generate_prep_sql(county_name, data_table, book_start=None, book_end=None, image_path_prefix='', created_by=''):
     """
     Generates the SQL script steps for the Initial Preparation Tool.
     """
@@ -32,15 +37,15 @@ def generate_prep_sql(county_name, book_start=None, book_end=None, image_path_pr
     """
     steps.append(('Header', header))
 
-    # 1. BACKUP
-    sql_backup = """
-    IF OBJECT_ID('dbo.GenericDataImportBackup', 'U') IS NOT NULL DROP TABLE dbo.GenericDataImportBackup;
-    SELECT * INTO dbo.GenericDataImportBackup FROM dbo.GenericDataImport;
-    """
-    steps.append(('Creating Backup', sql_backup))
+    # Each step first saves the cells it is about to change into the snapshot's undo log
+    def undo(changes):
+        return capture_sql(data_table, changes)
+
+    # 1. SNAPSHOT (undo log instead of a full copy; list/restore via /api/tools/initial-prep/snapshots)
+    steps.append(('Creating Snapshot', begin_snapshot_sql(data_table, 'Initial Preparation', created_by)))
     
     # 2. FN UPDATES
-    sql_fn = """
+    sql_fn = undo({'fn': "fn LIKE '%Images%' OR fn LIKE '%Legals%' OR fn LIKE '%Names%'"}) + """
     UPDATE GenericDataImport SET fn = REPLACE(fn, 'Images', 'Image') WHERE fn LIKE '%Images%';
     UPDATE GenericDataImport SET fn = REPLACE(fn, 'Legals', 'Legal') WHERE fn LIKE '%Legals%';
     UPDATE GenericDataImport SET fn = REPLACE(fn, 'Names', 'Name') WHERE fn LIKE '%Names%';
@@ -48,48 +53,63 @@ def generate_prep_sql(county_name, book_start=None, book_end=None, image_path_pr
     steps.append(('Normalizing Filenames', sql_fn))
 
     # 3. DEFAULTS
-    sql_defaults = """
+    sql_defaults = undo({
+        'deleteFlag': "deleteFlag IS NULL OR deleteFlag <> 'FALSE'",
+        'change_script_locations': "change_script_locations IS NULL OR change_script_locations <> ''",
+    }) + """
     UPDATE GenericDataImport SET deleteFlag = 'FALSE';
     UPDATE GenericDataImport SET change_script_locations = '';
     """
     steps.append(('Setting Default Flags', sql_defaults))
 
     # 4. ORIGINAL VALUE CLEANUP
-    sql_orig = """
+    sql_orig = undo({'OriginalValue': "OriginalValue LIKE '%[\",]%'"}) + """
     UPDATE GenericDataImport SET OriginalValue = REPLACE(REPLACE(OriginalValue, '"', ''), ',', '|');
     """
     steps.append(('Cleaning Original Values', sql_orig))
 
     # 5. POPULATE ORIGINAL INSTRUMENT TYPE
-    sql_inst_orig = """
+    sql_inst_orig = undo({'instTypeOriginal': "instTypeOriginal IS NULL OR instTypeOriginal = ''"}) + """
     UPDATE GenericDataImport 
     SET instTypeOriginal = col03varchar 
     WHERE instTypeOriginal IS NULL OR instTypeOriginal = '';
     """
     steps.append(('Preserving Original Instrument Types', sql_inst_orig))
 
-    # 6. INSTRUMENT ID GENERATION
-    sql_inst = """
-    DECLARE @numbering TABLE (id INT IDENTITY(1,1), fn VARCHAR(200), col01varchar VARCHAR(200));
-    INSERT INTO @numbering (fn, col01varchar) 
-    SELECT DISTINCT REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(fn,'Header',''),'Legal',''),'Name',''),'Image',''), 'Reference',''), CAST(col01varchar AS INT) 
-    FROM GenericDataImport 
-    ORDER BY REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(fn,'Header',''),'Legal',''),'Name',''),'Image',''), 'Reference',''), CAST(col01varchar AS INT);
-    
-    UPDATE GenericDataImport SET instrumentid = numb.id 
-    FROM GenericDataImport, @numbering numb 
-    WHERE REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(GenericDataImport.fn,'Header',''),'Legal',''),'Name',''),'Image',''), 'Reference','') = numb.fn 
-      AND GenericDataImport.col01varchar = numb.col01varchar;
+    # 6. BASE FILENAME KEY
+    # Persisted once so the numbering below can rank/seek on it instead of re-evaluating the REPLACE chain per row.
+    # Kept as its own step (own batch) so the new column is visible to the next step.
+    sql_base_fn = """
+    IF COL_LENGTH('dbo.GenericDataImport', 'base_fn') IS NULL
+        ALTER TABLE dbo.GenericDataImport ADD base_fn AS CAST(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(fn,'Header',''),'Legal',''),'Name',''),'Image',''), 'Reference','') AS VARCHAR(200)) PERSISTED;
+
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_GenericDataImport_base_fn' AND object_id = OBJECT_ID('dbo.GenericDataImport'))
+        EXEC('CREATE INDEX IX_GenericDataImport_base_fn ON dbo.GenericDataImport (base_fn) INCLUDE (col01varchar)');
+    """
+    steps.append(('Computing Base Filename Keys', sql_base_fn))
+
+    # 7. INSTRUMENT ID GENERATION
+    # DENSE_RANK over (base_fn, numeric col01) yields the same 1..N sequence as the old DISTINCT/IDENTITY numbering.
+    # Only rows whose text equals the canonical INT text are updated, matching the old varchar join exactly.
+    sql_inst = undo({'instrumentid': "base_fn IS NOT NULL"}) + """
+    ;WITH numbering AS (
+        SELECT instrumentid, base_fn, col01varchar,
+               CAST(col01varchar AS INT) AS col01int,
+               DENSE_RANK() OVER (ORDER BY base_fn, CAST(col01varchar AS INT)) AS new_id
+        FROM GenericDataImport
+    )
+    UPDATE numbering SET instrumentid = new_id
+    WHERE base_fn IS NOT NULL AND col01varchar = CAST(col01int AS VARCHAR(200));
     """
     steps.append(('Generating Instrument IDs', sql_inst))
 
-    # 7. UPDATE STECH IMAGE PATH
+    # 8. UPDATE STECH IMAGE PATH
     if image_path_prefix:
-        sql_path = f"UPDATE GenericDataImport SET stech_image_path = '{image_path_prefix}' + col03varchar WHERE fn LIKE '%image%'"
+        sql_path = undo({'stech_image_path': "fn LIKE '%image%'"}) + f"UPDATE GenericDataImport SET stech_image_path = '{image_path_prefix}' + col03varchar WHERE fn LIKE '%image%'"
         steps.append(('Setting Stech Image Paths', sql_path))
         
-        # 8. SYNC PATH TO HEADER
-        sql_sync = """
+        # 9. SYNC PATH TO HEADER
+        sql_sync = undo({'stech_image_path': "fn LIKE '%header%'"}) + """
         UPDATE a 
         SET stech_image_path = b.stech_image_path 
         FROM GenericDataImport a, GenericDataImport b 
@@ -101,7 +121,7 @@ def generate_prep_sql(county_name, book_start=None, book_end=None, image_path_pr
         """
         steps.append(('Syncing Image Paths to Headers', sql_sync))
 
-    # 9. INSERT 'OTHER' LEGALS
+    # 10. INSERT 'OTHER' LEGALS (new rows are above the snapshot's max_id)
     sql_legal = """
     INSERT INTO GenericDataImport (fn, col01varchar, stech_image_path, legal_type, col20other, deleteFlag, instrumentid) 
     SELECT REPLACE(fn, 'HEADER', 'Legal'), col01varchar, stech_image_path, 'Other', 'NO LEGAL', 'FALSE', instrumentid 
@@ -111,14 +131,14 @@ def generate_prep_sql(county_name, book_start=None, book_end=None, image_path_pr
     """
     steps.append(('Inserting Placeholder Legals', sql_legal))
 
-    # 10. KEY ORIGINAL VALUE - HEADER CLEANUP
-    sql_kov_header = """
+    # 11. KEY ORIGINAL VALUE - HEADER CLEANUP
+    sql_kov_header = undo({'keyOriginalValue': "fn LIKE '%header%' AND ISNULL(keyOriginalValue, '') <> ''"}) + """
     UPDATE GenericDataImport SET keyOriginalValue = '' WHERE fn LIKE '%header%';
     """
     steps.append(('Initializing Header KeyOriginalValue', sql_kov_header))
 
-    # 11. KEY ORIGINAL VALUE - ASSIGNMENT
-    sql_kov_assign = """
+    # 12. KEY ORIGINAL VALUE - ASSIGNMENT
+    sql_kov_assign = undo({'keyOriginalValue': "fn NOT LIKE '%header%'"}) + """
     UPDATE a 
     SET keyOriginalValue = b.OriginalValue 
     FROM GenericDataImport a, GenericDataImport b 
@@ -128,9 +148,9 @@ def generate_prep_sql(county_name, book_start=None, book_end=None, image_path_pr
     """
     steps.append(('Populating KeyOriginalValue', sql_kov_assign))
     
-    # 12. SYNC IMAGE PATH TO RELATED RECORDS
+    # 13. SYNC IMAGE PATH TO RELATED RECORDS
     if image_path_prefix:
-        sql_sync_related = """
+        sql_sync_related = undo({'stech_image_path': "fn LIKE '%legal%' OR fn LIKE '%name%' OR fn LIKE '%ref%'"}) + """
         UPDATE a 
         SET stech_image_path = b.stech_image_path 
         FROM GenericDataImport a 
@@ -164,7 +184,7 @@ def generate_prep_sql(county_name, book_start=None, book_end=None, image_path_pr
     raw_tr = "IF EXISTS (SELECT * FROM sysobjects WHERE name = 'KeliTownshipRangeExternals') DROP TABLE KeliTownshipRangeExternals\nCREATE TABLE KeliTownshipRangeExternals (TownshipRangeID INT NOT NULL IDENTITY(1,1) PRIMARY KEY, Township VARCHAR(100), Range VARCHAR(100), Active INT)"
     steps.append(('Creating TownshipRange Externals', rename_table(raw_tr, 'KeliTownshipRangeExternals', 'TownshipRange_Externals')))
     
-    return steps
+    return [(name, scope_generic_import(sql, data_table)) for name, sql in steps]
 # [GSI_END: prep_sql_generator]
 
 @initial_prep_bp.route('/api/tools/initial-prep/preview', methods=['POST'])
@@ -176,9 +196,13 @@ def preview_prep():
     c = db.session.get(IndexingCounties, data.get('county_id'))
     if not c: return jsonify({'success': False, 'message': 'County not found'})
     
-    steps = generate_prep_sql(c.county_name, data.get('book_start'), data.get('book_end'), data.get('image_path_prefix'))
-    full_script = "\n".join([s[1] for s in steps])
-    return jsonify({'success': True, 'sql': full_script})
+    data_table = get_county_context(c.id)['tables']['generic_import']
+    steps = generate_prep_sql(c.county_name, data_table, data.get('book_start'), data.get('book_end'), data.get('image_path_prefix'), created_by=current_user.username)
+    # "plan": "estimated" | "actual" adds execution plan figures to every step (see query_plans)
+    try:
+        return jsonify(dict(plan_preview(steps, data), success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'message': format_error(e)})
     # [GSI_END: prep_preview]
 
 @initial_prep_bp.route('/api/tools/initial-prep/download-sql', methods=['POST'])
@@ -190,7 +214,8 @@ def download_sql():
     c = db.session.get(IndexingCounties, data.get('county_id'))
     if not c: return Response("County not found", 404)
 
-    steps = generate_prep_sql(c.county_name, data.get('book_start'), data.get('book_end'), data.get('image_path_prefix'))
+    data_table = get_county_context(c.id)['tables']['generic_import']
+    steps = generate_prep_sql(c.county_name, data_table, data.get('book_start'), data.get('book_end'), data.get('image_path_prefix'), created_by=current_user.username)
     
     def generate():
         for name, sql in steps:
@@ -209,7 +234,8 @@ def execute_prep():
     c = db.session.get(IndexingCounties, data.get('county_id'))
     if not c: return jsonify({'success': False, 'message': 'County not found'})
 
-    steps = generate_prep_sql(c.county_name, data.get('book_start'), data.get('book_end'), data.get('image_path_prefix'))
+    data_table = get_county_context(c.id)['tables']['generic_import']
+    steps = generate_prep_sql(c.county_name, data_table, data.get('book_start'), data.get('book_end'), data.get('image_path_prefix'), created_by=current_user.username)
     total_steps = len(steps)
     
     def generate_stream():
@@ -217,17 +243,71 @@ def execute_prep():
         try:
             with db.session.begin():
                 for i, (name, sql_command) in enumerate(steps):
+                    step_start = time.perf_counter()
                     db.session.execute(text(sql_command))
+                    elapsed = round(time.perf_counter() - step_start, 3)
                     percent = int(((i + 1) / total_steps) * 100)
-                    yield json.dumps({'type': 'progress', 'percent': percent, 'message': f"{name}..."}) + '\n'
+                    yield json.dumps({'type': 'progress', 'percent': percent, 'message': f"{name}...", 'step': name, 'elapsed': elapsed}) + '\n'
                     time.sleep(0.2)
             yield json.dumps({'type': 'complete', 'message': 'Preparation Completed Successfully.'}) + '\n'
         except Exception as e:
             yield json.dumps({'type': 'error', 'message': format_error(e)}) + '\n'
 
-    return Response(stream_with_context(generate_stream()), mimetype='application/json')
+    return run_as_job('initial_prep', generate_stream(), county_id=c.id, tables=(data_table,))
     # [GSI_END: prep_execute]
 
+@initial_prep_bp.route('/api/tools/initial-prep/snapshots/<int:county_id>', methods=['GET'])
+@login_required
+def get_prep_snapshots(county_id):
+    # [GSI_BLOCK: prep_snapshot_list]
+    if current_user.role != 'admin': return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    ctx = get_county_context(county_id)
+    if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+    try:
+        with read_only_connection() as conn:
+            snapshots = list_snapshots(conn, ctx['tables']['generic_import'])
+        return jsonify({'success': True, 'snapshots': snapshots})
+    except Exception as e:
+        return jsonify({'success': False, 'message': format_error(e)})
+    # [GSI_END: prep_snapshot_list]
+
+@initial_prep_bp.route('/api/tools/initial-prep/snapshots/restore', methods=['POST'])
+@login_required
+def restore_prep_snapshot():
+    """Rolls the county's GenericDataImport back to a snapshot (streams like execute; later snapshots are consumed)."""
+    # [GSI_BLOCK: prep_snapshot_restore]
+    if current_user.role != 'admin': return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    data = request.json
+    ctx = get_county_context(data.get('county_id'))
+    if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+    data_table = ctx['tables']['generic_import']
+    snapshot_id = data.get('snapshot_id')
+
+    try:
+        with read_only_connection() as conn:
+            steps = restore_steps(conn, data_table, int(snapshot_id))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid snapshot'})
+    if not steps: return jsonify({'success': False, 'message': 'Snapshot not found'})
+    total_steps = len(steps)
+
+    def generate_stream():
+        yield json.dumps({'type': 'start', 'message': f"Restoring {ctx['county_name']} to snapshot {snapshot_id}..."}) + '\n'
+        try:
+            with db.session.begin():
+                for i, (name, sql_command) in enumerate(steps):
+                    step_start = time.perf_counter()
+                    result = db.session.execute(text(sql_command))
+                    elapsed = round(time.perf_counter() - step_start, 3)
+                    percent = int(((i + 1) / total_steps) * 100)
+                    yield json.dumps({'type': 'progress', 'percent': percent, 'message': f"{name} ({result.rowcount} rows)", 'step': name, 'elapsed': elapsed}) + '\n'
+            yield json.dumps({'type': 'complete', 'message': f'Restored snapshot {snapshot_id}.'}) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'message': format_error(e)}) + '\n'
+
+    return run_as_job('prep_restore', generate_stream(), county_id=ctx['county_id'], tables=(data_table,))
+    # [GSI_END: prep_snapshot_restore]
+
 @initial_prep_bp.route('/api/tools/initial-prep/get-defaults/<int:county_id>', methods=['GET'])
 @login_required
 def get_prep_defaults(county_id):
@@ -8,6 +8,8 @@ from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from werkzeug.utils import secure_filename
+from county_context import get_county_context
+from db_engine import read_only_connection
 
 # Try to import PIL for image serving
 try:
@@ -18,10 +20,12 @@ except ImportError:
 inst_type_bp = Blueprint('instrument_type_corrections', __name__)
 
 # [GSI_BLOCK: inst_get_tables]
-def get_tables(county_name):
+def get_tables(ctx):
+    county_name = ctx['county_name']
     return {
         'corrections': f"{county_name}_Instrument_Type_Corrections",
-        'inst_types': f"{county_name}_keli_instrument_types"
+        'inst_types': f"{county_name}_keli_instrument_types",
+        'data': ctx['tables']['generic_import']
     }
 # [GSI_END: inst_get_tables]
 
@@ -35,7 +39,7 @@ def init_tool():
     c = db.session.get(IndexingCounties, county_id)
     if not c: return jsonify({'success': False, 'message': 'County not found'})
     
-    tables = get_tables(c.county_name)
+    tables = get_tables(get_county_context(c.id))
     
     try:
         # 1. Create Table
@@ -53,7 +57,7 @@ def init_tool():
         sql_merge = f"""
         UPDATE g
         SET g.col03varchar = c.CorrectedCol03Varchar
-        FROM GenericDataImport g
+        FROM [{tables['data']}] g
         INNER JOIN {tables['corrections']} c ON g.instTypeOriginal = c.OriginalCol03Varchar
         WHERE g.fn LIKE '%header%'
           AND c.CorrectedCol03Varchar IS NOT NULL 
@@ -65,7 +69,7 @@ def init_tool():
         sql_seed = f"""
         INSERT INTO {tables['corrections']} (OriginalCol03Varchar, CorrectedCol03Varchar)
         SELECT DISTINCT instTypeOriginal, NULL
-        FROM GenericDataImport
+        FROM [{tables['data']}]
         WHERE fn LIKE '%header%' 
           AND instTypeOriginal IS NOT NULL 
           AND instTypeOriginal NOT IN (SELECT OriginalCol03Varchar FROM {tables['corrections']})
@@ -86,15 +90,17 @@ def get_correction_list():
     county_id = request.json.get('county_id')
     hide_completed = request.json.get('hide_completed', True)
     
-    c = db.session.get(IndexingCounties, county_id)
-    tables = get_tables(c.county_name)
+    ctx = get_county_context(county_id)
+    if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+    tables = get_tables(ctx)
     
     sql = f"SELECT id, OriginalCol03Varchar, CorrectedCol03Varchar FROM {tables['corrections']}"
     if hide_completed:
         sql += " WHERE CorrectedCol03Varchar IS NULL OR CorrectedCol03Varchar = ''"
     sql += " ORDER BY OriginalCol03Varchar"
     
-    results = db.session.execute(text(sql)).fetchall()
+    with read_only_connection() as conn:
+        results = conn.execute(text(sql)).fetchall()
     
     return jsonify({
         'success': True, 
@@ -114,17 +120,19 @@ def get_images_for_record():
     original_val = request.json.get('value')
     relative_base_path = request.json.get('base_path') 
     
-    c = db.session.get(IndexingCounties, county_id)
+    ctx = get_county_context(county_id)
+    if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+    data_table = ctx['tables']['generic_import']
     
     # 1. Find a Header row
-    sql_sample = "SELECT TOP 1 OriginalValue FROM GenericDataImport WHERE instTypeOriginal = :val AND fn LIKE '%header%'"
+    sql_sample = f"SELECT TOP 1 OriginalValue FROM [{data_table}] WHERE instTypeOriginal = :val AND fn LIKE '%header%'"
     sample = db.session.execute(text(sql_sample), {'val': original_val}).fetchone()
     header_text = sample.OriginalValue if sample else "No Header Found"
     
     images = []
     if sample:
         # 2. Get images
-        sql_imgs = "SELECT col03varchar FROM GenericDataImport WHERE fn LIKE '%image%' AND keyOriginalValue = :key ORDER BY fn"
+        sql_imgs = f"SELECT col03varchar FROM [{data_table}] WHERE fn LIKE '%image%' AND keyOriginalValue = :key ORDER BY fn"
         imgs = db.session.execute(text(sql_imgs), {'key': sample.OriginalValue}).fetchall()
         
         # 3. Resolve Path
@@ -181,47 +189,48 @@ def search_types():
     term = data.get('term', '')
     county_id = data.get('county_id')
     
-    c = db.session.get(IndexingCounties, county_id)
-    if not c: return jsonify([])
+    ctx = get_county_context(county_id)
+    if not ctx: return jsonify([])
 
-    tables = get_tables(c.county_name)
+    tables = get_tables(ctx)
     target_table = tables['inst_types'] 
     
     try:
-        # 1. Get Column Names (to handle case sensitivity)
-        sql_cols = "SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = :tb"
-        cols_res = db.session.execute(text(sql_cols), {'tb': target_table}).fetchall()
-        columns = [row[0] for row in cols_res]
+        with read_only_connection() as conn:
+            # 1. Get Column Names (to handle case sensitivity)
+            sql_cols = "SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = :tb"
+            cols_res = conn.execute(text(sql_cols), {'tb': target_table}).fetchall()
+            columns = [row[0] for row in cols_res]
         
-        if not columns: return jsonify([])
+            if not columns: return jsonify([])
 
-        # 2. Identify Target Columns
-        name_col = next((c for c in columns if 'insttypename' == c.lower()), None)
-        if not name_col: name_col = next((c for c in columns if 'name' == c.lower()), None)
-        if not name_col: name_col = columns[0] # Fallback
+            # 2. Identify Target Columns
+            name_col = next((c for c in columns if 'insttypename' == c.lower()), None)
+            if not name_col: name_col = next((c for c in columns if 'name' == c.lower()), None)
+            if not name_col: name_col = columns[0] # Fallback
         
-        desc_col = next((c for c in columns if 'description' == c.lower()), None)
-        if not desc_col: desc_col = next((c for c in columns if 'desc' == c.lower()), None)
+            desc_col = next((c for c in columns if 'description' == c.lower()), None)
+            if not desc_col: desc_col = next((c for c in columns if 'desc' == c.lower()), None)
 
-        type_col = next((c for c in columns if 'record_type' == c.lower()), None)
-        if not type_col: type_col = next((c for c in columns if 'recordtype' == c.lower()), None)
+            type_col = next((c for c in columns if 'record_type' == c.lower()), None)
+            if not type_col: type_col = next((c for c in columns if 'recordtype' == c.lower()), None)
 
-        active_col = next((c for c in columns if 'active' == c.lower()), None)
+            active_col = next((c for c in columns if 'active' == c.lower()), None)
 
-        # 3. Build Select & Where
-        select_cols = [f"[{name_col}]"]
-        if desc_col: select_cols.append(f"[{desc_col}]")
-        if type_col: select_cols.append(f"[{type_col}]")
+            # 3. Build Select & Where
+            select_cols = [f"[{name_col}]"]
+            if desc_col: select_cols.append(f"[{desc_col}]")
+            if type_col: select_cols.append(f"[{type_col}]")
 
-        where_conds = [f"[{name_col}] LIKE :term"]
-        if desc_col: where_conds.append(f"[{desc_col}] LIKE :term")
+            where_conds = [f"[{name_col}] LIKE :term"]
+            if desc_col: where_conds.append(f"[{desc_col}] LIKE :term")
         
-        where_sql = f"({' OR '.join(where_conds)})"
-        if active_col: where_sql += f" AND [{active_col}] = 1"
+            where_sql = f"({' OR '.join(where_conds)})"
+            if active_col: where_sql += f" AND [{active_col}] = 1"
         
-        sql = f"SELECT TOP 50 {', '.join(select_cols)} FROM [{target_table}] WHERE {where_sql}"
+            sql = f"SELECT TOP 50 {', '.join(select_cols)} FROM [{target_table}] WHERE {where_sql}"
         
-        results = db.session.execute(text(sql), {'term': f'%{term}%'}).fetchall()
+            results = conn.execute(text(sql), {'term': f'%{term}%'}).fetchall()
         
         # 4. Map Results
         out = []
@@ -252,10 +261,10 @@ def save_correction():
     if current_user.role != 'admin': return jsonify({'success': False}), 403
     data = request.json
     c = db.session.get(IndexingCounties, data['county_id'])
-    tables = get_tables(c.county_name)
+    tables = get_tables(get_county_context(c.id))
     try:
         db.session.execute(text(f"UPDATE {tables['corrections']} SET CorrectedCol03Varchar = :new WHERE OriginalCol03Varchar = :old"), {'new': data['corrected'], 'old': data['original']})
-        db.session.execute(text("UPDATE GenericDataImport SET col03varchar = :new WHERE instTypeOriginal = :old AND fn LIKE '%header%'"), {'new': data['corrected'], 'old': data['original']})
+        db.session.execute(text(f"UPDATE [{tables['data']}] SET col03varchar = :new WHERE instTypeOriginal = :old AND fn LIKE '%header%'"), {'new': data['corrected'], 'old': data['original']})
         db.session.commit()
         return jsonify({'success': True})
     except Exception as e:
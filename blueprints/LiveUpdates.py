@@ -0,0 +1,34 @@
+from flask import Blueprint, Response, jsonify
+from flask_login import login_required, current_user
+from extensions import db
+from live_events import subscribe, event_stream, subscriber_count, MAX_SUBSCRIBERS
+
+live_updates_bp = Blueprint('live_updates', __name__)
+
+# [GSI_BLOCK: live_updates_stream]
+@live_updates_bp.route('/api/events/stream', methods=['GET'])
+@login_required
+def stream_events():
+    """
+    Server-Sent Events channel for county occupancy / status changes.
+    Events: 'county' {county_id, geo_id, ...changed fields} and 'map' {reason}.
+    """
+    q = subscribe()
+    if q is None:
+        return Response("Too many live listeners", 503)
+
+    # The stream needs no request context; hand the pooled DB connection (used by login) back now
+    # instead of holding it for the life of the stream
+    db.session.close()
+
+    return Response(event_stream(q), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@live_updates_bp.route('/api/events/status', methods=['GET'])
+@login_required
+def events_status():
+    if current_user.role != 'admin': return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    return jsonify({'success': True, 'listeners': subscriber_count(), 'max_listeners': MAX_SUBSCRIBERS})
+# [GSI_END: live_updates_stream]
@@ -1,41 +1,35 @@
-import os
 import json
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import login_required, current_user
 from extensions import db
 from models import IndexingStates, IndexingCounties, Users
+from map_cache import county_index, state_index, county_feature_json, geojson_response, level_for_zoom, tile_bbox, bbox_intersects
+from map_cache import cached_response, status_etag, status_version
 
 map_viz_bp = Blueprint('map_viz', __name__)
 
+# Geometry-only responses change only on county/state toggles (which the UI follows with a revalidating reload)
+GEOMETRY_MAX_AGE = 300
+
 # [GSI_BLOCK: map_viz_states]
 @map_viz_bp.route('/api/map/states', methods=['GET'])
 @login_required
 def get_state_shapes():
     states = IndexingStates.query.filter_by(is_enabled=True).all()
-    enabled_fips = {s.fips_code for s in states}
-    
-    path = os.path.join(current_app.root_path, 'static', 'us-states.json')
-    if not os.path.exists(path): return jsonify({"type": "FeatureCollection", "features": []})
+    enabled_fips = sorted({s.fips_code for s in states})
 
-    with open(path, 'r') as f: data = json.load(f)
-    
-    filtered = []
-    features = data.get('features', []) if isinstance(data, dict) else data
-    
-    for f in features:
-        props = f.get('properties', {})
-        # Robust ID check
-        fips = props.get('STATE') or props.get('id')
-        if fips in enabled_fips:
-            filtered.append(f)
-            
-    return jsonify({"type": "FeatureCollection", "features": filtered})
+    # Shapes are indexed by state FIPS once per process
+    index = state_index(current_app.root_path)
+
+    def build():
+        return [f for fips in enabled_fips for f in index.get(fips, [])]
+
+    return geojson_response('states', enabled_fips, build)
 # [GSI_END: map_viz_states]
 
 # [GSI_BLOCK: map_viz_counties]
-@map_viz_bp.route('/api/map/counties', methods=['GET'])
-@login_required
-def get_county_shapes():
+def enabled_county_meta():
+    """geo_id -> per-user status for enabled counties in enabled states."""
     # 1. Fetch Enabled Data
     states = IndexingStates.query.filter_by(is_enabled=True).all()
     enabled_state_fips = {s.fips_code for s in states}
@@ -61,38 +55,79 @@ def get_county_shapes():
                 'is_mine': c.id == current_user.current_working_county_id,
                 'notes': c.notes
             }
+    return enabled_state_fips, meta_map
 
-    # 4. Filter GeoJSON
-    path = os.path.join(current_app.root_path, 'static', 'us-counties.json')
-    if not os.path.exists(path): return jsonify({"type": "FeatureCollection", "features": []})
+@map_viz_bp.route('/api/map/counties', methods=['GET'])
+@login_required
+def get_county_shapes():
+    # Optional ?zoom= selects a Douglas-Peucker simplified geometry level (default: full resolution)
+    level = level_for_zoom(request.args.get('zoom', type=int))
+    # ?status=0 returns geometry + ids only (status comes from /api/map/county-status), which
+    # only changes when counties/states are toggled and can be cached by the browser
+    with_status = request.args.get('status', '1') != '0'
 
-    with open(path, 'r') as f: data = json.load(f)
-    
-    filtered = []
-    features = data.get('features', []) if isinstance(data, dict) else data
-    
-    for f in features:
-        props = f.get('properties', {})
-        
-        # Robust ID Construction (Padding is crucial)
-        s = props.get('STATE', '')
-        c = props.get('COUNTY', '')
-        geo_id = props.get('id') or props.get('GEO_ID')
-        
-        check_ids = []
-        if s and c: check_ids.append(s + c)
-        if geo_id: check_ids.append(geo_id)
-        
-        # Check against DB
-        found_meta = None
-        for cid in check_ids:
-            if cid in meta_map:
-                found_meta = meta_map[cid]
-                break
-        
-        if found_meta:
-            props.update(found_meta) # Inject DB data into GeoJSON
-            filtered.append(f)
-
-    return jsonify({"type": "FeatureCollection", "features": filtered})
-# [GSI_END: map_viz_counties]
\ No newline at end of file
+    enabled_state_fips, meta_map = enabled_county_meta()
+    if not with_status:
+        meta_map = {geo_id: {'db_id': m['db_id'], 'geo_id': geo_id} for geo_id, m in meta_map.items()}
+
+    # 4. Filter GeoJSON (indexed once per process; the serialized result is cached per meta_map)
+    index = county_index(current_app.root_path)
+
+    def build():
+        features = []
+        for state_fips in sorted(enabled_state_fips):
+            for entry in index['by_state'].get(state_fips, []):
+                # Check against DB
+                found_meta = next((meta_map[cid] for cid in entry['ids'] if cid in meta_map), None)
+                if found_meta:
+                    features.append(county_feature_json(entry, found_meta, level)) # Inject DB data into GeoJSON
+        return features
+
+    signature = [level, with_status, sorted(meta_map.items(), key=lambda kv: str(kv[0]))]
+    return geojson_response('counties', signature, build, max_age=0 if with_status else GEOMETRY_MAX_AGE)
+
+@map_viz_bp.route('/api/map/county-status', methods=['GET'])
+@login_required
+def get_county_status():
+    """
+    Status only, keyed by geo_id. The ETag comes from the status change counter, so an
+    unchanged poll is answered with 304 before any query runs.
+    """
+    def build():
+        _, meta_map = enabled_county_meta()
+        return json.dumps({'version': status_version(), 'counties': meta_map}, separators=(',', ':')).encode('utf-8')
+
+    return cached_response(status_etag(current_user.id), build, store=False)
+# [GSI_END: map_viz_counties]
+
+# [GSI_BLOCK: map_viz_tiles]
+@map_viz_bp.route('/api/map/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+@login_required
+def get_county_tile(z, x, y):
+    """
+    GeoJSON tile: enabled counties whose bounding box touches tile z/x/y, simplified for z.
+    Geometry and static ids only (no per-user status), so tiles cache well.
+    """
+    if z < 0 or z > 22 or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+        return jsonify({'success': False, 'message': 'Invalid tile'}), 404
+
+    enabled = db.session.query(IndexingCounties.id, IndexingCounties.geo_id)\
+        .join(IndexingStates, IndexingCounties.state_fips == IndexingStates.fips_code)\
+        .filter(IndexingCounties.is_enabled == True, IndexingStates.is_enabled == True).all()
+    db_ids = {r.geo_id: r.id for r in enabled}
+
+    index = county_index(current_app.root_path)
+    bbox = tile_bbox(z, x, y)
+    level = level_for_zoom(z)
+
+    def build():
+        features, seen = [], set()
+        for geo_id in sorted(db_ids):
+            entry = index['by_geo_id'].get(geo_id)
+            if not entry or id(entry) in seen or not bbox_intersects(entry['bbox'], bbox): continue
+            seen.add(id(entry))
+            features.append(county_feature_json(entry, {'geo_id': geo_id, 'db_id': db_ids[geo_id]}, level))
+        return features
+
+    return geojson_response('tile', [z, x, y, sorted(db_ids.items())], build)
+# [GSI_END: map_viz_tiles]
@@ -7,6 +7,7 @@ from flask_login import login_required, current_user
 from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties
+from county_context import get_county_context
 
 # Try to import PIL for image serving
 try:
@@ -16,16 +17,25 @@ except ImportError:
 
 missing_names_bp = Blueprint('missing_names_corrections', __name__)
 
+# [GSI_BLOCK: mn_get_table]
+def get_data_table():
+    """The requesting county's GenericDataImport table, or None if the county does not exist."""
+    ctx = get_county_context(request.json.get('county_id'))
+    return ctx['tables']['generic_import'] if ctx else None
+# [GSI_END: mn_get_table]
+
 @missing_names_bp.route('/api/tools/missing-names/init', methods=['POST'])
 @login_required
 def init_tool():
     # [GSI_BLOCK: mn_init_tool]
     if current_user.role != 'admin': return jsonify({'success': False}), 403
+    data_table = get_data_table()
+    if not data_table: return jsonify({'success': False, 'message': 'County not found'})
     
     try:
         # Tag missing names
-        sql_tag = """
-        UPDATE GenericDataImport 
+        sql_tag = f"""
+        UPDATE [{data_table}] 
         SET change_script_locations = 'Missing Names Corrections'
         WHERE fn LIKE '%Name%' 
           AND (col03varchar IS NULL OR LEN(LTRIM(RTRIM(col03varchar))) = 0)
@@ -43,11 +53,13 @@ def init_tool():
 @login_required
 def get_list():
     # [GSI_BLOCK: mn_get_list]
+    data_table = get_data_table()
+    if not data_table: return jsonify({'success': False, 'message': 'County not found'})
     try:
         # 1. Fetch Missing Records
-        sql_missing = """
+        sql_missing = f"""
         SELECT id, col02varchar as type, col03varchar as name, instrumentid, keyOriginalValue
-        FROM GenericDataImport
+        FROM [{data_table}]
         WHERE fn LIKE '%Name%' 
           AND (col03varchar IS NULL OR LEN(LTRIM(RTRIM(col03varchar))) = 0)
           AND deleteFlag = 'FALSE'
@@ -59,16 +71,16 @@ def get_list():
             return jsonify({'success': True, 'records': []})
 
         # 2. Fetch Related Valid Names (Optimized Bulk Fetch)
-        sql_related = """
+        sql_related = f"""
         SELECT instrumentid, col02varchar as type, col03varchar as name
-        FROM GenericDataImport
+        FROM [{data_table}]
         WHERE fn LIKE '%Name%'
           AND deleteFlag = 'FALSE'
           AND col03varchar IS NOT NULL 
           AND LEN(LTRIM(RTRIM(col03varchar))) > 0
           AND instrumentid IN (
                 SELECT DISTINCT instrumentid 
-                FROM GenericDataImport 
+                FROM [{data_table}] 
                 WHERE fn LIKE '%Name%' 
                   AND (col03varchar IS NULL OR LEN(LTRIM(RTRIM(col03varchar))) = 0)
                   AND deleteFlag = 'FALSE'
@@ -109,11 +121,13 @@ def get_list():
 @login_required
 def get_images():
     # [GSI_BLOCK: mn_get_images]
+    data_table = get_data_table()
+    if not data_table: return jsonify({'success': False, 'images': [], 'message': 'County not found'})
     try:
         record_id = request.json.get('record_id')
         
         # Fetch path directly from the record
-        sql = "SELECT stech_image_path FROM GenericDataImport WHERE id = :id"
+        sql = f"SELECT stech_image_path FROM [{data_table}] WHERE id = :id"
         row = db.session.execute(text(sql), {'id': record_id}).fetchone()
         
         if not row or not row[0]:
@@ -166,11 +180,13 @@ def save_correction():
     is_reverse = data.get('reverse')
     
     if not record_id: return jsonify({'success': False, 'message': 'No ID'})
+    data_table = get_data_table()
+    if not data_table: return jsonify({'success': False, 'message': 'County not found'})
 
     try:
         # 1. Update Name & Script Location
-        sql_update = """
-        UPDATE GenericDataImport 
+        sql_update = f"""
+        UPDATE [{data_table}] 
         SET col03varchar = :name,
             change_script_locations = 'Missing Names Corrections'
         WHERE id = :id
@@ -180,8 +196,8 @@ def save_correction():
         # 2. Handle Reverse Logic
         if is_reverse:
             # Flip current record
-            sql_flip_current = """
-            UPDATE GenericDataImport 
+            sql_flip_current = f"""
+            UPDATE [{data_table}] 
             SET col02varchar = CASE 
                 WHEN col02varchar = 'Grantor' THEN 'Grantee'
                 WHEN col02varchar = 'Grantee' THEN 'Grantor'
@@ -191,12 +207,12 @@ def save_correction():
             db.session.execute(text(sql_flip_current), {'id': record_id})
 
             # Flip siblings
-            sql_get_inst = "SELECT instrumentid FROM GenericDataImport WHERE id = :id"
+            sql_get_inst = f"SELECT instrumentid FROM [{data_table}] WHERE id = :id"
             inst_row = db.session.execute(text(sql_get_inst), {'id': record_id}).fetchone()
             
             if inst_row and inst_row.instrumentid:
-                sql_flip_others = """
-                UPDATE GenericDataImport 
+                sql_flip_others = f"""
+                UPDATE [{data_table}] 
                 SET col02varchar = CASE 
                     WHEN col02varchar = 'Grantor' THEN 'Grantee'
                     WHEN col02varchar = 'Grantee' THEN 'Grantor'
@@ -221,17 +237,19 @@ def skip_record():
     if current_user.role != 'admin': return jsonify({'success': False}), 403
     data = request.json
     record_id = data.get('id')
+    data_table = get_data_table()
+    if not data_table: return jsonify({'success': False, 'message': 'County not found'})
     
     try:
-        sql_get_inst = "SELECT instrumentid, col02varchar FROM GenericDataImport WHERE id = :id"
+        sql_get_inst = f"SELECT instrumentid, col02varchar FROM [{data_table}] WHERE id = :id"
         current_row = db.session.execute(text(sql_get_inst), {'id': record_id}).fetchone()
         
         if not current_row: return jsonify({'success': False, 'message': 'Record not found'})
         inst_id = current_row.instrumentid
         
         # Check siblings
-        sql_check_siblings = """
-        SELECT TOP 1 * FROM GenericDataImport 
+        sql_check_siblings = f"""
+        SELECT TOP 1 * FROM [{data_table}] 
         WHERE instrumentid = :inst_id 
           AND fn LIKE '%Name%' 
           AND col03varchar IS NOT NULL 
@@ -244,26 +262,26 @@ def skip_record():
             # COPY Sibling
             new_type = 'Grantor' if sibling.col02varchar == 'Grantee' else 'Grantee'
             
-            sql_insert = """
-            INSERT INTO GenericDataImport (
+            sql_insert = f"""
+            INSERT INTO [{data_table}] (
                 fn, col01varchar, col02varchar, col03varchar, 
                 instrumentid, keyOriginalValue, stech_image_path, deleteFlag, change_script_locations
             )
             SELECT 
                 fn, col01varchar, :new_type, col03varchar, 
                 instrumentid, keyOriginalValue, stech_image_path, 'FALSE', 'Missing Names Corrections Auto-Fill'
-            FROM GenericDataImport 
+            FROM [{data_table}] 
             WHERE id = :sib_id
             """
             db.session.execute(text(sql_insert), {'new_type': new_type, 'sib_id': sibling.id})
             
             # Delete current
-            db.session.execute(text("UPDATE GenericDataImport SET deleteFlag = 'TRUE' WHERE id = :id"), {'id': record_id})
+            db.session.execute(text(f"UPDATE [{data_table}] SET deleteFlag = 'TRUE' WHERE id = :id"), {'id': record_id})
             
         else:
             # DELETE ALL
-            sql_delete_all = """
-            UPDATE GenericDataImport 
+            sql_delete_all = f"""
+            UPDATE [{data_table}] 
             SET deleteFlag = 'TRUE' 
             WHERE instrumentid = :inst_id 
               AND (
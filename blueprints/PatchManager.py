@@ -1,6 +1,4 @@
 import os
-import sys
-import time
 import json
 import zipfile
 import threading
@@ -8,6 +6,7 @@ import re
 from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
+from server_control import restart_process
 
 patch_bp = Blueprint('patch_manager', __name__)
 
@@ -76,10 +75,8 @@ def create_backup(root, current_ver):
         return None
 
 def restart_server():
-    """Restarts the Flask process."""
-    print(" >>> SYSTEM UPDATE COMPLETE. RESTARTING...")
-    time.sleep(2) 
-    os.execv(sys.executable, [sys.executable] + sys.argv)
+    """Restarts the Flask process (or the gunicorn workers, see server_control)."""
+    restart_process(delay=2, message=" >>> SYSTEM UPDATE COMPLETE. RESTARTING...")
 
 # --- NEW ANCHOR PATCHER ENGINE ---
 
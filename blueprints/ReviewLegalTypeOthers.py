@@ -7,6 +7,7 @@ from flask_login import login_required, current_user
 from sqlalchemy import text, inspect
 from extensions import db
 from models import IndexingCounties, IndexingStates
+from county_context import get_county_context
 
 # Try to import PIL for image serving
 try:
@@ -17,9 +18,10 @@ except ImportError:
 review_legal_bp = Blueprint('review_legal_others', __name__)
 
 # [GSI_BLOCK: review_legal_get_tables]
-def get_tables(county_name):
+def get_tables(ctx):
+    county_name = ctx['county_name']
     return {
-        'data': 'GenericDataImport',
+        'data': ctx['tables']['generic_import'],
         'tr': f"{county_name}_keli_township_ranges",
         'adds': f"{county_name}_keli_additions"
     }
@@ -36,9 +38,13 @@ def init_tool():
     c = db.session.get(IndexingCounties, county_id)
     if not c: return jsonify({'success': False, 'message': 'County not found'})
     
+    data_table = get_tables(get_county_context(c.id))['data']
+    
     try:
         inspector = inspect(db.engine)
-        columns = [col['name'] for col in inspector.get_columns('GenericDataImport')]
+        if not inspector.has_table(data_table):
+            return jsonify({'success': False, 'message': f"Table {data_table} not found. Run 'Setup eData Table' first."})
+        columns = [col['name'] for col in inspector.get_columns(data_table)]
         
         if 'legal_type' not in columns:
             return jsonify({
@@ -47,10 +53,10 @@ def init_tool():
             })
 
         # UPDATED SQL: Added keyOriginalValue
-        sql = """
+        sql = f"""
         SELECT id, OriginalValue, keyOriginalValue, col02varchar, col03varchar, col04varchar, 
                col05varchar, col06varchar, col07varchar, col08varchar
-        FROM GenericDataImport
+        FROM [{data_table}]
         WHERE fn LIKE '%legal%' 
           AND (legal_type = 'Other' OR legal_type = 'O')
         ORDER BY id
@@ -89,9 +95,11 @@ def get_images():
     # [GSI_BLOCK: review_legal_get_images]
     try:
         record_id = request.json.get('record_id')
+        ctx = get_county_context(request.json.get('county_id'))
+        if not ctx: return jsonify({'success': False, 'images': [], 'message': 'County not found'})
         
         # New Logic: Get path directly from the record (stech_image_path)
-        sql_path = "SELECT stech_image_path FROM GenericDataImport WHERE id = :id"
+        sql_path = f"SELECT stech_image_path FROM [{ctx['tables']['generic_import']}] WHERE id = :id"
         res = db.session.execute(text(sql_path), {'id': record_id}).fetchone()
         
         if not res or not res[0]:
@@ -148,7 +156,7 @@ def search_tr():
     try:
         data = request.json
         c = db.session.get(IndexingCounties, data.get('county_id'))
-        tbl = get_tables(c.county_name)['tr']
+        tbl = get_tables(get_county_context(c.id))['tr']
         col = 'Township' if data.get('mode') == 'township' else 'Range'
         
         sql = f"SELECT DISTINCT {col} FROM {tbl} WHERE {col} LIKE :term AND Active = 1 ORDER BY {col}"
@@ -164,7 +172,7 @@ def search_adds():
     try:
         data = request.json
         c = db.session.get(IndexingCounties, data.get('county_id'))
-        tbl = get_tables(c.county_name)['adds']
+        tbl = get_tables(get_county_context(c.id))['adds']
         
         sql = f"SELECT Name FROM {tbl} WHERE Name LIKE :term AND Active = 1 ORDER BY Name"
         res = db.session.execute(text(sql), {'term': f"%{data.get('term','')}%"}).fetchall()
@@ -178,9 +186,11 @@ def save_record():
     # [GSI_BLOCK: review_legal_save]
     if current_user.role != 'admin': return jsonify({'success': False}), 403
     data = request.json
+    ctx = get_county_context(data.get('county_id'))
+    if not ctx: return jsonify({'success': False, 'message': 'County not found'})
     try:
-        sql = """
-        UPDATE GenericDataImport
+        sql = f"""
+        UPDATE [{ctx['tables']['generic_import']}]
         SET col02varchar = :c2, col03varchar = :c3, col04varchar = :c4,
             col05varchar = :c5, col06varchar = :c6, col07varchar = :c7,
             col08varchar = :c8
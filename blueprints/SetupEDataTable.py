@@ -7,6 +7,9 @@ from werkzeug.utils import secure_filename
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from utils import format_error
+from job_runner import run_as_job
+from county_context import get_county_context
+from table_snapshots import drop_snapshots_sql
 
 setup_edata_bp = Blueprint('setup_edata', __name__)
 
@@ -72,11 +75,13 @@ def download_sql():
     if not s: return Response("State not found", 404)
 
     base_folder = os.path.join(current_app.root_path, 'data', secure_filename(s.state_name), secure_filename(c.county_name), 'eData Files')
+    data_table = get_county_context(c.id)['tables']['generic_import']
     
     def generate():
         yield f"-- GSI EDATA IMPORT SCRIPT\n-- County: {c.county_name}\n\n"
-        yield "IF OBJECT_ID('[dbo].[GenericDataImport]', 'U') IS NOT NULL DROP TABLE [dbo].[GenericDataImport]\n"
-        yield "CREATE TABLE [dbo].[GenericDataImport] (ID INT NOT NULL IDENTITY(1,1) PRIMARY KEY, FN VARCHAR(1000), OriginalValue VARCHAR(MAX), col01varchar VARCHAR(1000), col02varchar VARCHAR(1000), col03varchar VARCHAR(1000), col04varchar VARCHAR(1000), col05varchar VARCHAR(1000), col06varchar VARCHAR(1000), col07varchar VARCHAR(1000), col08varchar VARCHAR(1000), col09varchar VARCHAR(1000), col10varchar VARCHAR(1000), col01other VARCHAR(1000), col02other VARCHAR(1000), col03other VARCHAR(1000), col04other VARCHAR(1000), col05other VARCHAR(1000), col06other VARCHAR(1000), col07other VARCHAR(1000), col08other VARCHAR(1000), col09other VARCHAR(1000), col10other VARCHAR(1000), col11other VARCHAR(1000), col12other VARCHAR(1000), col13other VARCHAR(1000), col14other VARCHAR(1000), col15other VARCHAR(1000), col16other VARCHAR(1000), col17other VARCHAR(1000), col18other VARCHAR(1000), col19other VARCHAR(1000), col20other VARCHAR(1000), uf1 VARCHAR(1000), uf2 VARCHAR(1000), uf3 VARCHAR(1000), leftovers VARCHAR(1000))\nGO\n\n"
+        yield f"IF OBJECT_ID('[dbo].[{data_table}]', 'U') IS NOT NULL DROP TABLE [dbo].[{data_table}]\n"
+        yield drop_snapshots_sql(data_table) + "\n"
+        yield f"CREATE TABLE [dbo].[{data_table}] (ID INT NOT NULL IDENTITY(1,1) PRIMARY KEY, FN VARCHAR(1000), OriginalValue VARCHAR(MAX), col01varchar VARCHAR(1000), col02varchar VARCHAR(1000), col03varchar VARCHAR(1000), col04varchar VARCHAR(1000), col05varchar VARCHAR(1000), col06varchar VARCHAR(1000), col07varchar VARCHAR(1000), col08varchar VARCHAR(1000), col09varchar VARCHAR(1000), col10varchar VARCHAR(1000), col01other VARCHAR(1000), col02other VARCHAR(1000), col03other VARCHAR(1000), col04other VARCHAR(1000), col05other VARCHAR(1000), col06other VARCHAR(1000), col07other VARCHAR(1000), col08other VARCHAR(1000), col09other VARCHAR(1000), col10other VARCHAR(1000), col11other VARCHAR(1000), col12other VARCHAR(1000), col13other VARCHAR(1000), col14other VARCHAR(1000), col15other VARCHAR(1000), col16other VARCHAR(1000), col17other VARCHAR(1000), col18other VARCHAR(1000), col19other VARCHAR(1000), col20other VARCHAR(1000), uf1 VARCHAR(1000), uf2 VARCHAR(1000), uf3 VARCHAR(1000), leftovers VARCHAR(1000))\nGO\n\n"
 
         col_list = "FN, OriginalValue, col01varchar, col02varchar, col03varchar, col04varchar, col05varchar, col06varchar, col07varchar, col08varchar, col09varchar, col10varchar, col01other, col02other, col03other, col04other, col05other, col06other, col07other, col08other, col09other, col10other, col11other, col12other, col13other, col14other, col15other, col16other, col17other, col18other, col19other, col20other, uf1, uf2, uf3, leftovers"
         
@@ -93,7 +98,7 @@ def download_sql():
                                 c_vals, o_vals, left = parse_line_waterfall(clean)
                                 vals = [filename, clean[:8000]] + c_vals + o_vals + ['', '', '', left]
                                 vals_sql = ", ".join([f"'{v.replace('\'', '\'\'')}'" for v in vals])
-                                yield f"INSERT INTO [dbo].[GenericDataImport] ({col_list}) VALUES ({vals_sql});\n"
+                                yield f"INSERT INTO [dbo].[{data_table}] ({col_list}) VALUES ({vals_sql});\n"
                     except Exception as e:
                         yield f"-- Error reading {filename}: {str(e)}\n"
 
@@ -121,6 +126,7 @@ def preview_generic_import():
     c_clean = secure_filename(county.county_name)
     base_folder = os.path.join(current_app.root_path, 'data', s_clean, c_clean, 'eData Files')
     abs_folder_path = os.path.abspath(base_folder)
+    data_table = get_county_context(county.id)['tables']['generic_import']
     
     if not os.path.exists(abs_folder_path):
         return jsonify({'success': False, 'message': 'eData Files folder not found.'})
@@ -158,7 +164,7 @@ def preview_generic_import():
                 vals = [filename, clean_line[:8000]] + c_vals + o_vals + ['', '', '', left_val]
                 vals_sql = ", ".join([f"'{v.replace('\'', '\'\'')}'" for v in vals])
                 
-                sql_preview += f"INSERT INTO [dbo].[GenericDataImport] ({col_list}) VALUES ({vals_sql});\n"
+                sql_preview += f"INSERT INTO [dbo].[{data_table}] ({col_list}) VALUES ({vals_sql});\n"
                 rows_shown += 1
     except Exception as e:
         sql_preview += f"\n-- Error reading file: {str(e)}"
@@ -172,6 +178,9 @@ def run_generic_import():
     # [GSI_BLOCK: edata_run]
     req_data = request.json
     user_role = current_user.role
+    # Each county imports into its own table, so mode D only drops this county's rows
+    ctx = get_county_context(req_data.get('county_id'))
+    data_table = ctx['tables']['generic_import'] if ctx else None
 
     def generate():
         if user_role != 'admin':
@@ -205,9 +214,11 @@ def run_generic_import():
         # 2. Database Prep
         if import_mode == 'D':
             try:
-                db.session.execute(text("IF OBJECT_ID('[dbo].[GenericDataImport]', 'U') IS NOT NULL DROP TABLE [dbo].[GenericDataImport]"))
-                create_sql = """
-                CREATE TABLE [dbo].[GenericDataImport] (
+                db.session.execute(text(f"IF OBJECT_ID('[dbo].[{data_table}]', 'U') IS NOT NULL DROP TABLE [dbo].[{data_table}]"))
+                # Undo logs of Initial Preparation runs refer to the old rows
+                db.session.execute(text(drop_snapshots_sql(data_table)))
+                create_sql = f"""
+                CREATE TABLE [dbo].[{data_table}] (
                     ID INT NOT NULL IDENTITY(1,1) PRIMARY KEY,
                     FN VARCHAR(1000),
                     OriginalValue VARCHAR(MAX),
@@ -246,8 +257,8 @@ def run_generic_import():
         errors = []
 
         # 4. Processing Loop (Python Logic)
-        insert_query = text("""
-            INSERT INTO [dbo].[GenericDataImport] (
+        insert_query = text(f"""
+            INSERT INTO [dbo].[{data_table}] (
                 FN, OriginalValue,
                 col01varchar, col02varchar, col03varchar, col04varchar, col05varchar,
                 col06varchar, col07varchar, col08varchar, col09varchar, col10varchar,
@@ -334,5 +345,5 @@ def run_generic_import():
             if errors: msg += f" ({len(errors)} errors)"
             yield json.dumps({'type': 'complete', 'message': msg}) + '\n'
 
-    return Response(stream_with_context(generate()), mimetype='application/json')
+    return run_as_job('setup_edata', generate(), county_id=req_data.get('county_id'), tables=(data_table,) if data_table else ())
     # [GSI_END: edata_run]
\ No newline at end of file
@@ -1,13 +1,16 @@
 import os
 import json
-import csv
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import Blueprint, request, Response, stream_with_context, current_app, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import text
 from werkzeug.utils import secure_filename
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from utils import format_error
+from keli_tables import plan_keli_table, keli_bulk_insert_sql, import_keli_file, import_keli_file_worker, DEFAULT_IMPORT_WORKERS, MAX_IMPORT_WORKERS
+from bulk_loader import resolve_loader
+from job_runner import run_as_job
 
 setup_keli_bp = Blueprint('setup_keli', __name__)
 
@@ -35,18 +38,12 @@ def download_sql():
                 if file.lower().endswith('.csv'):
                     full_path = os.path.join(root, file)
                     filename = os.path.basename(full_path)
-                    raw_name = os.path.splitext(filename)[0]
-                    safe_raw = "".join([c for c in raw_name if c.isalnum() or c in ('_')])
-                    table_name = f"{c_clean}_keli_{safe_raw}"
                     
                     try:
-                        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                            header = f.readline().strip()
-                            rdr = csv.reader([header])
-                            cols = next(rdr)
-                        cols_def = ", ".join([f"[{h.strip()}] VARCHAR(MAX)" for h in cols if h.strip()])
-                        yield f"-- File: {filename}\nDROP TABLE IF EXISTS [dbo].[{table_name}];\nCREATE TABLE [dbo].[{table_name}] ({cols_def});\n"
-                        yield f"BULK INSERT [dbo].[{table_name}] FROM '{full_path}' WITH (FORMAT = 'CSV', FIRSTROW = 2, FIELDQUOTE = '\"', FIELDTERMINATOR = ',', ROWTERMINATOR = '0x0a', TABLOCK);\nGO\n\n"
+                        plan = plan_keli_table(full_path, c_clean)
+                        yield f"-- File: {filename} ({plan['row_count']} rows)\n{plan['create_sql']}"
+                        yield f"{keli_bulk_insert_sql(plan['full_table_name'], full_path, plan['row_terminator']).strip()}\nGO\n\n"
+                        if plan['index_sql']: yield f"-- Lookup Indexes: {plan['table_name']}\n{plan['index_sql']}GO\n\n"
                     except Exception as e:
                         yield f"-- Error: {str(e)}\n"
 
@@ -89,21 +86,13 @@ def preview_keli_import():
     
     for full_path in csv_files:
         filename = os.path.basename(full_path)
-        raw_name = os.path.splitext(filename)[0]
-        safe_raw = "".join([c for c in raw_name if c.isalnum() or c in ('_')])
-        table_name = f"{c_clean}_keli_{safe_raw}"
-        full_table_name = f"[dbo].[{table_name}]"
         
         try:
-            # Read only header for preview
-            with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                header_line = f.readline().strip()
-                reader = csv.reader([header_line])
-                headers = next(reader)
-            
-            cols_def = ", ".join([f"[{h.strip()}] VARCHAR(MAX)" for h in headers if h.strip()])
-            sql_output += f"-- File: {filename}\nDROP TABLE IF EXISTS {full_table_name};\nCREATE TABLE {full_table_name} ({cols_def});\n"
-            sql_output += f"BULK INSERT {full_table_name} FROM '{full_path}' WITH (FORMAT = 'CSV', FIRSTROW = 2, FIELDQUOTE = '\"', FIELDTERMINATOR = ',', ROWTERMINATOR = '0x0a', TABLOCK);\nGO\n\n"
+            # Single streaming pass to infer column types, widths and the primary key
+            plan = plan_keli_table(full_path, c_clean)
+            sql_output += f"-- File: {filename} ({plan['row_count']} rows)\n{plan['create_sql']}"
+            sql_output += f"{keli_bulk_insert_sql(plan['full_table_name'], full_path, plan['row_terminator']).strip()}\nGO\n\n"
+            if plan['index_sql']: sql_output += f"-- Lookup Indexes: {plan['table_name']}\n{plan['index_sql']}GO\n\n"
         except Exception as e:
             sql_output += f"-- Error reading {filename}: {str(e)}\n\n"
             
@@ -161,91 +150,82 @@ def run_keli_import():
 
         yield json.dumps({'type': 'progress', 'current': 0, 'total': total_files, 'percent': 0}) + '\n'
 
+        # Concurrency: 1 = sequential on the request session, N = N pooled connections
+        try:
+            workers = int(req_data.get('workers') or DEFAULT_IMPORT_WORKERS)
+        except (TypeError, ValueError):
+            workers = DEFAULT_IMPORT_WORKERS
+        workers = max(1, min(workers, MAX_IMPORT_WORKERS, total_files))
+        # 'server' = BULK INSERT from the path, 'client' = stream rows from this host
+        loader = resolve_loader(req_data.get('loader'))
+
         processed_count = 0
         errors = []
+        start_time = time.perf_counter()
 
-        # 4. Process Loop
-        for i, filename in enumerate(csv_files):
-            full_path = os.path.join(abs_folder_path, filename)
-            
-            # Construct Table Name: [dbo].[county_keli_filename]
-            raw_name = os.path.splitext(filename)[0]
-            # Sanitize simple chars only for table name to avoid SQL Injection risks
-            safe_raw = "".join([c for c in raw_name if c.isalnum() or c in ('_')])
-            table_name = f"{c_clean}_keli_{safe_raw}"
-            full_table_name = f"[dbo].[{table_name}]"
-
-            try:
-                # --- STEP A: READ HEADER (Python) ---
-                with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                    header_line = f.readline().strip()
-                    if not header_line:
-                        raise Exception("Empty file")
-                    
-                    # Use CSV reader to handle quoted headers correctly
-                    reader = csv.reader([header_line])
-                    headers = next(reader)
-
-                if not headers:
-                    raise Exception("No headers found")
-
-                # --- STEP B: CREATE TABLE ---
-                # Build columns list: [Col1] VARCHAR(MAX), [Col2] VARCHAR(MAX)...
-                cols_def = ", ".join([f"[{h.strip()}] VARCHAR(MAX)" for h in headers if h.strip()])
-                
-                drop_create_sql = f"""
-                    DROP TABLE IF EXISTS {full_table_name};
-                    CREATE TABLE {full_table_name} ({cols_def});
-                """
-                db.session.execute(text(drop_create_sql))
-                db.session.commit()
-
-                # --- STEP C: BULK INSERT (SQL) ---
-                # Escape single quotes in path for SQL (e.g. O'Brien folder)
-                sql_safe_path = full_path.replace("'", "''")
-                
-                # We inject the path directly because BULK INSERT does NOT support parameters (e.g. @Path)
-                bulk_sql = f"""
-                    BULK INSERT {full_table_name} 
-                    FROM '{sql_safe_path}' 
-                    WITH (
-                        FORMAT = 'CSV', 
-                        FIRSTROW = 2, 
-                        FIELDQUOTE = '"', 
-                        FIELDTERMINATOR = ',', 
-                        ROWTERMINATOR = '0x0a',
-                        TABLOCK
-                    );
-                """
-                db.session.execute(text(bulk_sql))
-                db.session.commit()
-
-                processed_count += 1
-
-            except Exception as e:
-                db.session.rollback()
-                
-                # --- NEW ERROR HANDLING ---
-                error_message = format_error(e)
-                errors.append(f"{filename}: {error_message}")
-
-            # Yield Progress
-            percent = int(((i + 1) / total_files) * 100)
-            yield json.dumps({
+        yield json.dumps({'type': 'log', 'message': f"Importing {total_files} files with {workers} connection(s) ({loader} loader)."}) + '\n'
+
+        def file_progress(done, filename, file_error=None):
+            msg = {
                 'type': 'progress',
-                'current': i + 1,
+                'current': done,
                 'total': total_files,
-                'percent': percent,
-                'filename': filename
-            }) + '\n'
+                'percent': int((done / total_files) * 100),
+                'filename': filename,
+                'message': f"Imported {filename}" if not file_error else f"Failed {filename}"
+            }
+            return json.dumps(msg) + '\n'
+
+        # 4. Process Loop
+        if workers == 1:
+            for i, filename in enumerate(csv_files):
+                full_path = os.path.join(abs_folder_path, filename)
+                file_error = None
+                try:
+                    import_keli_file(db.session, full_path, c_clean, loader)
+                    processed_count += 1
+                except Exception as e:
+                    db.session.rollback()
+                    
+                    # --- NEW ERROR HANDLING ---
+                    file_error = format_error(e)
+                    errors.append(f"{filename}: {file_error}")
+                    yield json.dumps({'type': 'log', 'message': f"Error on {filename}: {file_error}"}) + '\n'
+
+                # Yield Progress
+                yield file_progress(i + 1, filename, file_error)
+        else:
+            # Tables are independent: each worker loads whole files on its own connection.
+            # Results are streamed back in completion order.
+            engine = db.engine
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(import_keli_file_worker, engine, os.path.join(abs_folder_path, f), c_clean, loader): f
+                    for f in csv_files
+                }
+                for i, future in enumerate(as_completed(futures)):
+                    filename = futures[future]
+                    file_error = None
+                    try:
+                        future.result()
+                        processed_count += 1
+                    except Exception as e:
+                        file_error = format_error(e)
+                        errors.append(f"{filename}: {file_error}")
+                        yield json.dumps({'type': 'log', 'message': f"Error on {filename}: {file_error}"}) + '\n'
+
+                    yield file_progress(i + 1, filename, file_error)
+
+        elapsed = round(time.perf_counter() - start_time, 2)
+        yield json.dumps({'type': 'log', 'message': f"Keli import finished in {elapsed}s ({workers} connection(s))."}) + '\n'
 
         # 5. Final Summary
         if processed_count == 0 and len(errors) > 0:
             yield json.dumps({'type': 'error', 'message': f"All failed. First: {errors[0]}"}) + '\n'
         else:
-            msg = f"Processed {processed_count} files."
+            msg = f"Processed {processed_count} files in {elapsed}s."
             if errors: msg += f" ({len(errors)} errors)"
             yield json.dumps({'type': 'complete', 'message': msg}) + '\n'
 
-    return Response(stream_with_context(generate()), mimetype='application/json')
+    return run_as_job('setup_keli', generate(), county_id=req_data.get('county_id'))
     # [GSI_END: keli_run]
\ No newline at end of file
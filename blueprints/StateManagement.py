@@ -1,10 +1,12 @@
 import os
-import json
 from flask import Blueprint, jsonify, current_app, request
 from flask_login import login_required, current_user
 from extensions import db
 from models import IndexingStates, IndexingCounties
 from utils import format_error, ensure_folders
+from map_cache import invalidate_map_cache, iter_feature_properties
+from county_context import invalidate_county_context
+from live_events import publish_event, EVENT_MAP
 
 state_mgmt_bp = Blueprint('state_mgmt', __name__)
 
@@ -34,6 +36,9 @@ def toggle_state():
             ensure_folders(s.state_name)
             
         db.session.commit()
+        invalidate_map_cache()
+        invalidate_county_context()
+        publish_event(EVENT_MAP, reason='state_toggled', state_id=s.id)
         return jsonify({'success': True})
     return jsonify({'success': False})
 # [GSI_END: state_toggle]
@@ -50,41 +55,36 @@ def seed_database():
         if not os.path.exists(states_path) or not os.path.exists(counties_path):
             return jsonify({'success': False, 'message': 'JSON source files missing.'})
 
-        # 1. Seed States
-        with open(states_path, 'r') as f:
-            data = json.load(f)
-            items = data.get('features', []) if isinstance(data, dict) and data.get('type') == 'FeatureCollection' else data
+        # 1. Seed States (existing keys in one query, missing rows in one executemany)
+        existing_states = {r[0] for r in db.session.query(IndexingStates.fips_code).all()}
 
-        added_states = 0
-        for item in items:
-            props = item.get('properties', item) 
+        new_states = []
+        for props in iter_feature_properties(states_path):
             fips = props.get('STATE') or props.get('id')
             name = props.get('NAME') or props.get('name')
-            abbr = props.get('abbreviation') or name[:2].upper() 
 
             if not fips or not name: continue
+            abbr = props.get('abbreviation') or name[:2].upper() 
 
-            if not IndexingStates.query.filter_by(fips_code=fips).first():
-                db.session.add(IndexingStates(
-                    state_name=name, 
-                    state_abbr=abbr, 
-                    fips_code=fips, 
-                    is_enabled=False
-                ))
-                added_states += 1
+            if fips not in existing_states:
+                new_states.append({
+                    'state_name': name, 
+                    'state_abbr': abbr, 
+                    'fips_code': fips, 
+                    'is_enabled': False,
+                    'is_locked': False
+                })
+                existing_states.add(fips)
+        if new_states: db.session.bulk_insert_mappings(IndexingStates, new_states)
         db.session.commit()
+        added_states = len(new_states)
 
         # 2. Seed Counties
-        with open(counties_path, 'r') as f:
-            data = json.load(f)
-            items = data.get('features', []) if isinstance(data, dict) and data.get('type') == 'FeatureCollection' else data
-            
-        added_counties = 0
-        state_map = {s.fips_code: s.fips_code for s in IndexingStates.query.all()}
-        
-        for item in items:
-            props = item.get('properties', item)
-            
+        existing_counties = {r[0] for r in db.session.query(IndexingCounties.geo_id).all()}
+        state_map = existing_states
+
+        new_counties = []
+        for props in iter_feature_properties(counties_path):
             s_fips = props.get('STATE')
             c_code = props.get('COUNTY')
             
@@ -99,19 +99,24 @@ def seed_database():
 
             name = props.get('NAME') or props.get('name')
 
-            if s_fips in state_map and name:
-                if not IndexingCounties.query.filter_by(geo_id=full_fips).first():
-                    db.session.add(IndexingCounties(
-                        county_name=name, 
-                        geo_id=full_fips, 
-                        state_fips=s_fips, 
-                        is_active=False, 
-                        is_enabled=False
-                    ))
-                    added_counties += 1
+            if s_fips in state_map and name and full_fips not in existing_counties:
+                new_counties.append({
+                    'county_name': name, 
+                    'geo_id': full_fips, 
+                    'state_fips': s_fips, 
+                    'is_active': False, 
+                    'is_enabled': False,
+                    'is_locked': False,
+                    'is_split_job': False
+                })
+                existing_counties.add(full_fips)
+        if new_counties: db.session.bulk_insert_mappings(IndexingCounties, new_counties)
         db.session.commit()
+        added_counties = len(new_counties)
+        invalidate_county_context()
 
         return jsonify({'success': True, 'message': f'Seeding Complete. +{added_states} States, +{added_counties} Counties.'})
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'message': f"Seeding Error: {str(e)}"})
 # [GSI_END: state_seed]
\ No newline at end of file
@@ -6,6 +6,9 @@ from flask_login import login_required, current_user
 from extensions import db
 from models import IndexingCounties, IndexingStates
 from werkzeug.utils import secure_filename
+from server_control import server_name, schedule_restart
+from db_engine import pool_stats
+import perf_metrics
 
 sys_bp = Blueprint('system_tools', __name__)
 
@@ -28,6 +31,35 @@ def debug_status():
     })
 # [GSI_END: sys_debug_status]
 
+# [GSI_BLOCK: sys_db_pool]
+@sys_bp.route('/api/admin/system/db-pool', methods=['GET'])
+@login_required
+def db_pool_status():
+    """Connection pool usage: checked out / idle connections, overflow, callers waiting, timeouts."""
+    if current_user.role != 'admin': return jsonify({'success': False}), 403
+    try:
+        return jsonify({'success': True, 'pool': pool_stats(db.engine), 'read_only_autocommit': bool(current_app.config.get('DB_READ_ONLY_AUTOCOMMIT'))})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+# [GSI_END: sys_db_pool]
+
+# [GSI_BLOCK: sys_perf]
+@sys_bp.route('/api/admin/system/perf', methods=['GET'])
+@login_required
+def perf_summary():
+    """Slowest endpoints and SQL statements from this server process, with latency percentiles (?top=20)."""
+    if current_user.role != 'admin': return jsonify({'success': False}), 403
+    top = max(1, min(request.args.get('top', 20, type=int), 200))
+    return jsonify(dict(perf_metrics.summary(top), success=True, server=server_name()))
+
+@sys_bp.route('/api/admin/system/perf/reset', methods=['POST'])
+@login_required
+def perf_reset():
+    if current_user.role != 'admin': return jsonify({'success': False}), 403
+    perf_metrics.reset()
+    return jsonify({'success': True})
+# [GSI_END: sys_perf]
+
 # [GSI_BLOCK: sys_folder_check]
 @sys_bp.route('/api/admin/tools/folder-check', methods=['POST'])
 @login_required
@@ -98,8 +130,12 @@ def create_folders():
 def system_restart():
     if current_user.role != 'admin': return jsonify({'success': False}), 403
     
-    # Trigger restart by touching a watched file
+    # Dev server: trigger the reloader by touching a watched file.
+    # waitress / gunicorn (wsgi.py) have no reloader, so use the shared restart hook.
     try:
+        if server_name() != 'werkzeug':
+            schedule_restart(delay=1)
+            return jsonify({'success': True, 'message': 'Restart signal sent.'})
         app_file = os.path.join(current_app.root_path, 'app.py')
         os.utime(app_file, None)
         return jsonify({'success': True, 'message': 'Restart signal sent.'})
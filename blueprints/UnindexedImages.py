@@ -8,6 +8,8 @@ from sqlalchemy import text
 from extensions import db
 from models import IndexingCounties
 from utils import format_error
+from county_context import get_county_context
+from db_engine import read_only_connection
 
 try:
     from PIL import Image
@@ -85,7 +87,7 @@ def scan_unindexed_images():
         db.session.execute(text(sql_create))
 
         # 2. Fetch known paths from DB to exclude
-        sql_known = "SELECT stech_image_path FROM GenericDataImport WHERE fn LIKE '%image%' AND stech_image_path IS NOT NULL"
+        sql_known = f"SELECT stech_image_path FROM [{get_county_context(c.id)['tables']['generic_import']}] WHERE fn LIKE '%image%' AND stech_image_path IS NOT NULL"
         known_rows = db.session.execute(text(sql_known)).fetchall()
         
         known_paths = set()
@@ -104,7 +106,7 @@ def scan_unindexed_images():
         for fpath in tif_files:
             disk_norm = normalize_path_for_comparison(fpath)
             
-            # If disk file is not in GenericDataImport, it's unindexed
+            # If disk file is not in the county's GenericDataImport, it's unindexed
             if disk_norm not in known_paths:
                 dname, fname = os.path.split(fpath)
                 book = os.path.basename(dname)
@@ -135,16 +137,17 @@ def scan_unindexed_images():
 def get_unindexed_list(county_id):
     # [GSI_BLOCK: unindexed_get_list]
     try:
-        c = db.session.get(IndexingCounties, county_id)
-        if not c: return jsonify([])
-        target_table = get_unindexed_table(c.county_name)
+        ctx = get_county_context(county_id)
+        if not ctx: return jsonify([])
+        target_table = ctx['tables']['unindexed_images']
         
-        # Verify table exists before querying
-        check = db.session.execute(text(f"IF OBJECT_ID('[{target_table}]', 'U') IS NOT NULL SELECT 1 ELSE SELECT 0")).fetchone()
-        if not check or check[0] == 0: return jsonify([])
+        with read_only_connection() as conn:
+            # Verify table exists before querying
+            check = conn.execute(text(f"IF OBJECT_ID('[{target_table}]', 'U') IS NOT NULL SELECT 1 ELSE SELECT 0")).fetchone()
+            if not check or check[0] == 0: return jsonify([])
 
-        sql = f"SELECT id, full_path, book_name, page_name, require_indexing FROM [{target_table}] ORDER BY book_name, page_name"
-        rows = db.session.execute(text(sql)).fetchall()
+            sql = f"SELECT id, full_path, book_name, page_name, require_indexing FROM [{target_table}] ORDER BY book_name, page_name"
+            rows = conn.execute(text(sql)).fetchall()
         
         return jsonify([{
             'id': r.id,
@@ -164,8 +167,9 @@ def get_unindexed_image_data():
         county_id = request.json.get('county_id')
         if not county_id: return jsonify({'success': False, 'message': 'County ID required'})
         
-        c = db.session.get(IndexingCounties, county_id)
-        target_table = get_unindexed_table(c.county_name)
+        ctx = get_county_context(county_id)
+        if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+        target_table = ctx['tables']['unindexed_images']
         
         sql = f"SELECT id, page_name FROM [{target_table}] WHERE id = :id"
         row = db.session.execute(text(sql), {'id': img_id}).fetchone()
@@ -192,8 +196,9 @@ def update_image_status():
         status = 1 if data.get('require_indexing') else 0
         county_id = data.get('county_id')
         
-        c = db.session.get(IndexingCounties, county_id)
-        target_table = get_unindexed_table(c.county_name)
+        ctx = get_county_context(county_id)
+        if not ctx: return jsonify({'success': False, 'message': 'County not found'})
+        target_table = ctx['tables']['unindexed_images']
         
         sql = f"UPDATE [{target_table}] SET require_indexing = :status WHERE id = :id"
         db.session.execute(text(sql), {'status': status, 'id': img_id})
@@ -212,8 +217,9 @@ def view_local_image(id):
         county_id = request.args.get('cid')
         if not county_id: return "Context missing", 400
         
-        c = db.session.get(IndexingCounties, county_id)
-        target_table = get_unindexed_table(c.county_name)
+        ctx = get_county_context(county_id)
+        if not ctx: return "County not found", 404
+        target_table = ctx['tables']['unindexed_images']
         
         sql = f"SELECT full_path FROM [{target_table}] WHERE id = :id"
         row = db.session.execute(text(sql), {'id': id}).fetchone()
@@ -0,0 +1,83 @@
+import csv
+
+# [GSI_BLOCK: bulk_loader_constants]
+# Client-side loads: rows are read on the app host and sent over the ODBC connection
+# in parameter arrays, so SQL Server never has to see the data/ folder.
+LOADER_SERVER = 'server'    # BULK INSERT ... FROM '<path>' (needs the server to read the file)
+LOADER_CLIENT = 'client'    # executemany with pyodbc fast_executemany
+LOADERS = (LOADER_SERVER, LOADER_CLIENT)
+
+BULK_BATCH_SIZE = 5000
+# [GSI_END: bulk_loader_constants]
+
+# [GSI_BLOCK: bulk_loader_core]
+def resolve_loader(value):
+    """Normalizes a request's 'loader' option; anything unknown falls back to server BULK INSERT."""
+    value = (value or LOADER_SERVER).lower()
+    return value if value in LOADERS else LOADER_SERVER
+
+def dbapi_connection(conn):
+    """
+    Returns the DBAPI (pyodbc) connection to load through: the one holding the transaction of
+    db.session or of a SQLAlchemy Connection (begun here if none is open, so the caller's
+    commit() covers the rows), or a plain DBAPI connection (engine.raw_connection()) unchanged.
+    """
+    if hasattr(conn, 'get_bind'): return conn.connection().connection   # Session -> its transaction's DBAPI connection
+    if hasattr(conn, 'exec_driver_sql'):
+        if not conn.in_transaction(): conn.begin()
+        return conn.connection
+    return conn
+
+def iter_csv_batches(f, positions, batch_size):
+    """Yields lists of row tuples; empty fields become NULL (matching BULK INSERT)."""
+    reader = csv.reader(f)
+    batch = []
+    for row in reader:
+        if not row: continue
+        n = len(row)
+        batch.append(tuple((row[i] or None) if i < n else None for i in positions))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch: yield batch
+
+def bulk_load_csv(conn, full_table_name, full_path, columns=None, batch_size=BULK_BATCH_SIZE, encoding='utf-8'):
+    """
+    Streams a CSV (header row first) into an existing table over the client connection.
+    columns: target column names matched to the CSV header by name; None loads every
+    header column positionally, like BULK INSERT. conn is db.session, a Connection or a DBAPI
+    connection; it is committed through conn itself (so SQLAlchemy sees the commit) on success.
+    Returns the row count; the caller rolls back on error.
+    """
+    dbapi_conn = dbapi_connection(conn)
+
+    with open(full_path, 'r', encoding=encoding, errors='replace', newline='') as f:
+        headers = next(csv.reader(f), None)
+        if not headers: raise Exception("No headers found")
+
+        if columns:
+            header_pos = {h.strip().lower(): i for i, h in enumerate(headers)}
+            missing = [c for c in columns if c.lower() not in header_pos]
+            if missing: raise Exception(f"Columns not in CSV header: {', '.join(missing)}")
+            positions = [header_pos[c.lower()] for c in columns]
+            col_sql = " (" + ", ".join(f"[{c}]" for c in columns) + ")"
+        else:
+            positions = list(range(len(headers)))
+            col_sql = ""
+
+        insert_sql = f"INSERT INTO {full_table_name}{col_sql} VALUES ({', '.join('?' * len(positions))})"
+
+        cursor = dbapi_conn.cursor()
+        # pyodbc: send each batch as one parameter array instead of one round trip per row
+        if hasattr(cursor, 'fast_executemany'): cursor.fast_executemany = True
+
+        total = 0
+        try:
+            for batch in iter_csv_batches(f, positions, batch_size):
+                cursor.executemany(insert_sql, batch)
+                total += len(batch)
+            conn.commit()
+        finally:
+            cursor.close()
+    return total
+# [GSI_END: bulk_loader_core]
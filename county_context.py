@@ -0,0 +1,139 @@
+import os
+import re
+import time
+import threading
+from flask import current_app
+from sqlalchemy import inspect
+from werkzeug.utils import secure_filename
+from extensions import db
+from models import IndexingCounties, IndexingStates
+
+# [GSI_BLOCK: county_context_cache]
+# Tool endpoints all start from a county id and need the same things: the county and
+# state names, the data/<state>/<county>/ folders and the per-county table names.
+# The context is a plain dict (no ORM objects, safe to share between requests and
+# threads), cached per process for CONTEXT_TTL seconds. The county/state management
+# endpoints call invalidate_county_context() after their commit; the TTL covers edits
+# made by other workers or directly in the database.
+CONTEXT_TTL = 60
+
+COUNTY_FOLDERS = {
+    'edata': 'eData Files',
+    'keli': 'Keli Files',
+    'images': 'Images',
+    'edata_errors': 'eData Errors',
+    'keli_errors': 'Keli Errors',
+}
+
+_lock = threading.Lock()
+_contexts = {}
+
+def _build_context(c, s):
+    state_name = s.state_name if s else ''
+    state_abbr = (s.state_abbr if s.state_abbr else s.state_name[:2].upper()) if s else ''
+    s_clean = secure_filename(state_name)
+    c_clean = secure_filename(c.county_name)
+    county_root = os.path.join(current_app.root_path, 'data', s_clean, c_clean)
+
+    paths = {key: os.path.join(county_root, folder) for key, folder in COUNTY_FOLDERS.items()}
+    paths['county'] = county_root
+    paths['state'] = os.path.dirname(county_root)
+
+    return {
+        'county_id': c.id,
+        'county_name': c.county_name,
+        'geo_id': c.geo_id,
+        'state_fips': c.state_fips,
+        'state_id': s.id if s else None,
+        'state_name': state_name,
+        'state_abbr': state_abbr,
+        's_clean': s_clean,
+        'c_clean': c_clean,
+        'paths': paths,
+        'tables': {
+            'keli_prefix': f"{c.county_name}_keli_",
+            'edata_errors_prefix': f"{c.county_name}_eData_Errors_",
+            'imported_errors_prefix': f"{state_abbr}_{c.county_name}_eData_Errors_",
+            'unindexed_images': f"{c.county_name}_unindexed_images",
+            'inst_type_corrections': f"{c.county_name}_Instrument_Type_Corrections",
+            'generic_import': generic_import_table(c.county_name, state_abbr),
+        },
+    }
+
+def get_county_context(county_id):
+    """
+    Returns the context dict for a county id, or None if the county does not exist.
+    Misses are not cached, so a newly added county is visible immediately.
+    """
+    try:
+        county_id = int(county_id)
+    except (TypeError, ValueError):
+        return None
+
+    now = time.monotonic()
+    cached = _contexts.get(county_id)
+    if cached and cached[0] > now: return cached[1]
+
+    c = db.session.get(IndexingCounties, county_id)
+    if not c: return None
+    s = IndexingStates.query.filter_by(fips_code=c.state_fips).first()
+    ctx = _build_context(c, s)
+
+    with _lock:
+        _contexts[county_id] = (now + CONTEXT_TTL, ctx)
+    return ctx
+
+def invalidate_county_context(county_id=None):
+    """Drops one county's context, or every context when county_id is None (state changes, seeding)."""
+    with _lock:
+        if county_id is None:
+            _contexts.clear()
+        else:
+            try:
+                _contexts.pop(int(county_id), None)
+            except (TypeError, ValueError):
+                pass
+# [GSI_END: county_context_cache]
+
+# [GSI_BLOCK: county_generic_import]
+# Imported eData lives in the single GenericDataImport table unless db_config.json sets
+# "generic_import": "per_county"; then each county gets its own "<state abbr>_<county>_GenericDataImport"
+# (keyed by state too, since county names repeat across states) so several counties can be
+# set up, scanned and prepared at the same time without one tool dropping or rewriting
+# another county's rows. The shared table has no county column, so switching modes does not
+# move existing rows: re-run Setup eData for a county after switching to fill its own table.
+GENERIC_IMPORT_TABLE = 'GenericDataImport'
+GENERIC_IMPORT_MODES = ('shared', 'per_county')
+DEFAULT_GENERIC_IMPORT_MODE = 'shared'
+
+_GENERIC_IMPORT_NAME = re.compile(r"\[?\b" + GENERIC_IMPORT_TABLE + r"\b\]?", re.IGNORECASE)
+
+def generic_import_mode(cfg):
+    mode = (cfg or {}).get('generic_import') or DEFAULT_GENERIC_IMPORT_MODE
+    if mode not in GENERIC_IMPORT_MODES:
+        print(f" >>> db_config.json generic_import={mode!r} is invalid, using {DEFAULT_GENERIC_IMPORT_MODE}")
+        return DEFAULT_GENERIC_IMPORT_MODE
+    return mode
+
+def generic_import_table(county_name, state_abbr):
+    """Name of the GenericDataImport table holding a county's imported eData."""
+    if current_app.config.get('GENERIC_IMPORT_MODE', DEFAULT_GENERIC_IMPORT_MODE) == 'shared':
+        return GENERIC_IMPORT_TABLE
+    # The name is also embedded in string literals (OBJECT_ID, sp_rename), so drop quotes/brackets
+    safe_name = re.sub(r"['\[\]]", '', f"{state_abbr}_{county_name}")
+    return f"{safe_name}_{GENERIC_IMPORT_TABLE}"
+
+def scope_generic_import(sql, table):
+    """
+    Points the GenericDataImport references of a SQL script (bare, dbo.-qualified or
+    bracketed) at `table`. Derived names (GenericDataImport_UndoLog, IX_GenericDataImport_*)
+    are left alone.
+    """
+    if table == GENERIC_IMPORT_TABLE: return sql
+    return _GENERIC_IMPORT_NAME.sub(lambda m: f"[{table}]", sql)
+
+def list_generic_import_tables(engine):
+    """Every existing GenericDataImport table (the shared one and each county's), sorted by name."""
+    names = inspect(engine).get_table_names()
+    return sorted(n for n in names if n == GENERIC_IMPORT_TABLE or n.endswith('_' + GENERIC_IMPORT_TABLE))
+# [GSI_END: county_generic_import]
@@ -108,4 +108,21 @@ CREATE TABLE unindexed_images (
     scanned_at DATETIME DEFAULT GETDATE(),
     CONSTRAINT FK_UnindexedImages_Counties FOREIGN KEY (county_id) 
         REFERENCES indexing_counties(id) ON DELETE CASCADE
+);
+
+-- 6. Background Jobs (long tool runs; job_runner also creates this on first use)
+IF OBJECT_ID('dbo.background_jobs', 'U') IS NOT NULL DROP TABLE dbo.background_jobs;
+CREATE TABLE background_jobs (
+    id NVARCHAR(32) NOT NULL PRIMARY KEY,
+    tool NVARCHAR(100) NOT NULL,
+    county_id INT NULL,
+    user_id INT NULL,
+    status NVARCHAR(20) NOT NULL,
+    [percent] INT DEFAULT 0,
+    message NVARCHAR(MAX),
+    log_path NVARCHAR(500),
+    created_at DATETIME,
+    started_at DATETIME,
+    finished_at DATETIME,
+    updated_at DATETIME
 );
\ No newline at end of file
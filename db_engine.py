@@ -0,0 +1,124 @@
+import threading
+from flask import current_app
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+from extensions import db
+
+# [GSI_BLOCK: db_engine_options]
+# Engine settings, overridable per install with an "engine" object in db_config.json:
+#   "engine": {"pool_size": 10, "max_overflow": 20, "pool_recycle": 1800, "pool_pre_ping": true,
+#              "pool_timeout": 30, "fast_executemany": true, "read_only_autocommit": true}
+# Streaming tools keep their session (and its connection) for the whole run, and the
+# production server runs dozens of threads, so the pool is larger than SQLAlchemy's 5 + 10.
+# pool_recycle / pool_pre_ping drop connections the server or a firewall closed overnight.
+DEFAULT_ENGINE_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True,
+    'fast_executemany': True,
+}
+DEFAULT_READ_ONLY_AUTOCOMMIT = True
+
+def _coerce(value, default):
+    if isinstance(default, bool):
+        return value.strip().lower() in ('1', 'true', 'yes') if isinstance(value, str) else bool(value)
+    return type(default)(value)
+
+def _engine_setting(cfg, key, default):
+    overrides = (cfg or {}).get('engine') or {}
+    if key not in overrides: return default
+    try:
+        return _coerce(overrides[key], default)
+    except (TypeError, ValueError):
+        # A bad value must not fail startup (that path discards db_config.json)
+        print(f" >>> db_config.json engine.{key}={overrides[key]!r} is invalid, using {default}")
+        return default
+
+def engine_options(cfg):
+    """SQLALCHEMY_ENGINE_OPTIONS for a loaded db_config.json (unknown keys are ignored)."""
+    options = {k: _engine_setting(cfg, k, v) for k, v in DEFAULT_ENGINE_OPTIONS.items()}
+    options['poolclass'] = InstrumentedQueuePool
+    return options
+
+def read_only_autocommit(cfg):
+    return _engine_setting(cfg, 'read_only_autocommit', DEFAULT_READ_ONLY_AUTOCOMMIT)
+# [GSI_END: db_engine_options]
+
+# [GSI_BLOCK: db_engine_pool]
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that also counts callers waiting for a connection, timeouts and the peak in use."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.waiting = 0
+        self.peak_checked_out = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        with self._stats_lock:
+            self.waiting += 1
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.waiting -= 1
+        with self._stats_lock:
+            in_use = self.checkedout()
+            if in_use > self.peak_checked_out: self.peak_checked_out = in_use
+        return conn
+
+    def recreate(self):
+        # Keep the counters across pool recreation (invalidated connections)
+        new_pool = super().recreate()
+        new_pool.peak_checked_out = self.peak_checked_out
+        new_pool.timeouts = self.timeouts
+        return new_pool
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {
+        'pool_class': type(pool).__name__,
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+        'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+        'max_overflow': getattr(pool, '_max_overflow', None),
+        'timeout': pool.timeout() if hasattr(pool, 'timeout') else None,
+        'status': pool.status(),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(waiting=pool.waiting, peak_checked_out=pool.peak_checked_out, timeouts=pool.timeouts)
+    return stats
+# [GSI_END: db_engine_pool]
+
+# [GSI_BLOCK: db_engine_read_only]
+# Read-only endpoints (lists, searches, lookups) run on an AUTOCOMMIT view of the same engine:
+# no transaction is opened, shared locks are released per statement and the connection goes
+# back to the pool as soon as the block ends instead of at request teardown.
+_read_only_lock = threading.Lock()
+_read_only_engines = {}
+
+def read_only_engine():
+    engine = db.engine
+    if not current_app.config.get('DB_READ_ONLY_AUTOCOMMIT', DEFAULT_READ_ONLY_AUTOCOMMIT): return engine
+    key = id(engine)
+    ro = _read_only_engines.get(key)
+    if ro is None:
+        with _read_only_lock:
+            ro = _read_only_engines.get(key)
+            if ro is None:
+                ro = engine.execution_options(isolation_level='AUTOCOMMIT')
+                _read_only_engines[key] = ro
+    return ro
+
+def read_only_connection():
+    """Context manager: `with read_only_connection() as conn: conn.execute(text(...))`."""
+    return read_only_engine().connect()
+# [GSI_END: db_engine_read_only]
@@ -0,0 +1,557 @@
+import os
+import json
+import time
+import uuid
+import cProfile
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, current_app, copy_current_request_context, jsonify, request
+from flask_login import current_user
+from sqlalchemy import text
+from extensions import db
+from utils import format_error
+
+# [GSI_BLOCK: job_runner_constants]
+# Long tools (imports, scans, prep) run as background jobs instead of inside the HTTP
+# response. The tool's NDJSON generator is consumed on a job thread; every line is appended
+# to instance/jobs/<job_id>.ndjson and the job row in background_jobs tracks status and the
+# last progress. Browsers tail the log (from any line offset), so closing the tab or
+# reconnecting does not affect the run.
+DEFAULT_MAX_CONCURRENT_JOBS = 4   # jobs running at once per process ("jobs": {"max_concurrent": N} in db_config.json)
+JOB_STATUS_INTERVAL = 2      # seconds between progress writes to the job row
+JOB_HEARTBEAT = 30           # running/queued rows are touched this often by their process
+JOB_STALE_AFTER = 120        # rows not touched for this long belong to a dead process
+JOB_TAIL_WAIT = 15           # idle seconds before a tail sends a heartbeat line
+JOB_LOG_FOLDER = 'jobs'
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETE = 'complete'
+STATUS_ERROR = 'error'
+STATUS_CANCELLED = 'cancelled'
+STATUS_INTERRUPTED = 'interrupted'
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+INTERRUPTED_MESSAGE = 'Interrupted: the server stopped before the job finished.'
+
+JOB_TABLE_SQL = """
+IF OBJECT_ID('background_jobs', 'U') IS NULL
+CREATE TABLE background_jobs (
+    id NVARCHAR(32) NOT NULL PRIMARY KEY,
+    tool NVARCHAR(100) NOT NULL,
+    county_id INT NULL,
+    user_id INT NULL,
+    status NVARCHAR(20) NOT NULL,
+    [percent] INT DEFAULT 0,
+    message NVARCHAR(MAX),
+    log_path NVARCHAR(500),
+    created_at DATETIME,
+    started_at DATETIME,
+    finished_at DATETIME,
+    updated_at DATETIME
+)
+"""
+# [GSI_END: job_runner_constants]
+
+# [GSI_BLOCK: job_runner_state]
+class LiveJob:
+    """In-process state of a queued/running job: cancel flag, scheduling state and a condition tails wait on."""
+
+    def __init__(self, job_id, tool, log_path, resources=(), profile=False):
+        self.id = job_id
+        self.tool = tool
+        self.log_path = log_path
+        self.resources = tuple(resources)
+        self.profile = profile
+        self.cancel = threading.Event()
+        self.cond = threading.Condition()
+        self.done = False
+        self.started = False
+        self.position = None
+        self.waiting_for = None
+
+    def notify(self, done=False):
+        with self.cond:
+            if done: self.done = True
+            self.cond.notify_all()
+
+    def wait(self, timeout):
+        with self.cond:
+            if not self.done: self.cond.wait(timeout)
+
+_lock = threading.Lock()
+_live = {}
+_executor = None
+_heartbeat = None
+_table_ready = False
+
+def _now():
+    return datetime.utcnow()
+
+def job_log_dir():
+    path = os.path.join(current_app.instance_path, JOB_LOG_FOLDER)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def ensure_job_table(engine):
+    global _table_ready
+    if _table_ready: return
+    with engine.begin() as conn:
+        conn.execute(text(JOB_TABLE_SQL))
+    _table_ready = True
+
+def _update_job(engine, job_id, **fields):
+    fields['updated_at'] = _now()
+    assignments = ", ".join(f"[{k}] = :{k}" for k in fields)
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE background_jobs SET {assignments} WHERE id = :job_id"), dict(fields, job_id=job_id))
+
+def configured_job_limit(cfg):
+    """max_concurrent from db_config.json's "jobs" object; invalid values fall back to the default."""
+    value = ((cfg or {}).get('jobs') or {}).get('max_concurrent', DEFAULT_MAX_CONCURRENT_JOBS)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        print(f" >>> db_config.json jobs.max_concurrent={value!r} is invalid, using {DEFAULT_MAX_CONCURRENT_JOBS}")
+        return DEFAULT_MAX_CONCURRENT_JOBS
+
+def max_concurrent_jobs():
+    return current_app.config.get('JOB_MAX_CONCURRENT', DEFAULT_MAX_CONCURRENT_JOBS)
+
+def _get_executor(size):
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None: _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='gsi-job')
+    return _executor
+
+def _heartbeat_loop(engine):
+    # One UPDATE for every job this process owns, so other processes can tell live rows from orphans
+    while True:
+        time.sleep(JOB_HEARTBEAT)
+        with _lock:
+            ids = list(_live)
+        if not ids: continue
+        try:
+            params = {f"id{i}": job_id for i, job_id in enumerate(ids)}
+            placeholders = ", ".join(f":{k}" for k in params)
+            with engine.begin() as conn:
+                conn.execute(text(f"UPDATE background_jobs SET updated_at = :now WHERE id IN ({placeholders})"), dict(params, now=_now()))
+        except Exception as e:
+            print(f" >>> JOB HEARTBEAT ERROR: {e}")
+
+def _ensure_heartbeat(engine):
+    global _heartbeat
+    if _heartbeat is None:
+        with _lock:
+            if _heartbeat is None:
+                _heartbeat = threading.Thread(target=_heartbeat_loop, args=(engine,), name='gsi-job-heartbeat', daemon=True)
+                _heartbeat.start()
+
+def mark_stale_jobs(engine):
+    """Active rows nobody has touched for JOB_STALE_AFTER (process restarted or died) become 'interrupted'."""
+    cutoff = _now() - timedelta(seconds=JOB_STALE_AFTER)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE background_jobs SET status = :interrupted, finished_at = :now, message = :message
+            WHERE status IN (:queued, :running) AND updated_at < :cutoff
+        """), {'interrupted': STATUS_INTERRUPTED, 'queued': STATUS_QUEUED, 'running': STATUS_RUNNING,
+               'message': INTERRUPTED_MESSAGE, 'now': _now(), 'cutoff': cutoff})
+
+def is_live(job_id):
+    return job_id in _live
+# [GSI_END: job_runner_state]
+
+# [GSI_BLOCK: job_runner_run]
+def start_job(tool, generator, county_id=None, user_id=None, resources=(), profile=False):
+    """
+    Queues a tool's NDJSON generator as a background job and returns the job id.
+    resources: what the job modifies (see job_resources); conflicting jobs run in order.
+    profile: record a profile of the run (see job_runner_profile).
+    Must be called inside the request: the job thread runs with a copy of the request
+    context (request.json, current_user) and its own app context / db.session.
+    """
+    engine = db.engine
+    limit = max_concurrent_jobs()
+    ensure_job_table(engine)
+    _ensure_heartbeat(engine)
+
+    job_id = uuid.uuid4().hex
+    log_path = os.path.join(job_log_dir(), f"{job_id}.ndjson")
+    with open(log_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'type': 'job', 'job_id': job_id, 'tool': tool, 'status': STATUS_QUEUED}) + '\n')
+
+    now = _now()
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO background_jobs (id, tool, county_id, user_id, status, [percent], message, log_path, created_at, updated_at)
+            VALUES (:id, :tool, :county_id, :user_id, :status, 0, NULL, :log_path, :now, :now)
+        """), {'id': job_id, 'tool': tool, 'county_id': county_id, 'user_id': user_id,
+               'status': STATUS_QUEUED, 'log_path': log_path, 'now': now})
+
+    live = LiveJob(job_id, tool, log_path, resources, profile=profile)
+    with _lock:
+        _live[job_id] = live
+
+    @copy_current_request_context
+    def run():
+        try:
+            _run_job(engine, live, generator)
+        finally:
+            _release(live)
+
+    _enqueue(live, run, limit)
+    return job_id
+
+def _run_job(engine, live, generator):
+    status, percent, message = None, 0, None
+    saw_complete = saw_error = False
+    last_write = 0.0
+    profiler = JobProfiler(live) if live.profile else None
+    try:
+        with open(live.log_path, 'a', encoding='utf-8') as log:
+            def append(line):
+                log.write(line + '\n')
+                log.flush()
+                live.notify()
+
+            if live.cancel.is_set():
+                status, message = STATUS_CANCELLED, 'Cancelled before start.'
+                append(json.dumps({'type': 'error', 'message': message}))
+                return
+
+            _update_job(engine, live.id, status=STATUS_RUNNING, started_at=_now())
+            if profiler:
+                profile_error = profiler.start()
+                if profile_error: append(json.dumps({'type': 'log', 'message': f"Profiling unavailable: {profile_error}"}))
+            try:
+                for chunk in generator:
+                    for line in str(chunk).splitlines():
+                        if not line.strip(): continue
+                        try:
+                            msg = json.loads(line)
+                        except ValueError:
+                            append(line)
+                            continue
+                        if not isinstance(msg, dict):
+                            append(line)
+                            continue
+                        if profiler and profiler.running and msg.get('type') == 'complete':
+                            # The profile is saved before the final line so the link in it is ready
+                            msg['profile'] = profiler.stop()
+                            line = json.dumps(msg)
+                        append(line)
+                        if isinstance(msg.get('percent'), (int, float)): percent = int(msg['percent'])
+                        if msg.get('message'): message = str(msg['message'])
+                        if msg.get('type') == 'complete': saw_complete = True
+                        if msg.get('type') == 'error': saw_error = True
+
+                    if live.cancel.is_set():
+                        generator.close()   # GeneratorExit inside the tool: open transactions roll back
+                        status, message = STATUS_CANCELLED, 'Cancelled by user.'
+                        append(json.dumps({'type': 'error', 'message': message}))
+                        break
+
+                    if time.monotonic() - last_write >= JOB_STATUS_INTERVAL:
+                        _update_job(engine, live.id, percent=percent, message=message)
+                        last_write = time.monotonic()
+            except Exception as e:
+                status, message = STATUS_ERROR, format_error(e)
+                append(json.dumps({'type': 'error', 'message': message}))
+
+            if profiler and profiler.running:
+                append(json.dumps({'type': 'log', 'message': 'Profile saved.', 'profile': profiler.stop()}))
+
+            if status is None:
+                status = STATUS_COMPLETE if saw_complete or not saw_error else STATUS_ERROR
+                if status == STATUS_COMPLETE: percent = 100
+    except Exception as e:
+        status, message = STATUS_ERROR, format_error(e)
+    finally:
+        generator.close()
+        if profiler and profiler.running: profiler.stop()
+        try:
+            _update_job(engine, live.id, status=status or STATUS_ERROR, percent=percent, message=message, finished_at=_now())
+        except Exception as e:
+            print(f" >>> JOB STATUS ERROR ({live.id}): {e}")
+        with _lock:
+            _live.pop(live.id, None)
+        live.notify(done=True)
+
+def cancel_job(job_id):
+    """Asks a job owned by this process to stop after its current step. False if it is not running here."""
+    live = _live.get(job_id)
+    if not live: return False
+    live.cancel.set()
+    _drop_pending(live)
+    return True
+# [GSI_END: job_runner_run]
+
+# [GSI_BLOCK: job_runner_profile]
+# "profile": true in a tool's request body (or ?profile=true) records the job thread while the
+# generator runs. pyinstrument, when installed, samples the stack every PROFILE_INTERVAL seconds
+# and is saved as speedscope JSON (open at https://www.speedscope.app); otherwise cProfile is
+# used and saved as .pstats (python -m pstats, snakeviz). The file sits next to the job log and
+# the 'complete' line carries {'format', 'url'} for GET /api/jobs/<job_id>/profile.
+PROFILE_INTERVAL = 0.001
+PROFILE_FORMATS = {'speedscope': '.speedscope.json', 'pstats': '.pstats'}
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    SamplingProfiler = None
+
+class JobProfiler:
+    """Profiles the job thread from start() to stop(); stop() saves the artifact and returns its link."""
+
+    def __init__(self, live):
+        self.live = live
+        self.running = False
+        self.format = 'speedscope' if SamplingProfiler else 'pstats'
+        self._profiler = None
+
+    def start(self):
+        """None, or why profiling could not start (e.g. cProfile is already active in another job)."""
+        try:
+            if SamplingProfiler:
+                self._profiler = SamplingProfiler(interval=PROFILE_INTERVAL, async_mode='disabled')
+                self._profiler.start()
+            else:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+        except Exception as e:
+            return format_error(e)
+        self.running = True
+        return None
+
+    def stop(self):
+        self.running = False
+        path = os.path.splitext(self.live.log_path)[0] + PROFILE_FORMATS[self.format]
+        try:
+            if SamplingProfiler:
+                session = self._profiler.stop()
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(SpeedscopeRenderer().render(session))
+            else:
+                self._profiler.disable()
+                self._profiler.dump_stats(path)
+        except Exception as e:
+            return {'format': self.format, 'error': format_error(e)}
+        return {'format': self.format, 'url': f"/api/jobs/{self.live.id}/profile"}
+
+def wants_profile():
+    value = request.args.get('profile') or (request.get_json(silent=True) or {}).get('profile')
+    return value is True or str(value).lower() in ('1', 'true', 'yes')
+
+def job_profile_path(job):
+    """(path, format) of a job's saved profile, or (None, None)."""
+    if not job.get('log_path'): return None, None
+    base = os.path.splitext(job['log_path'])[0]
+    for fmt, ext in PROFILE_FORMATS.items():
+        if os.path.exists(base + ext): return base + ext, fmt
+    return None, None
+# [GSI_END: job_runner_profile]
+
+# [GSI_BLOCK: job_runner_scheduler]
+# Jobs declare the resources they modify ('table:Adams_GenericDataImport', 'county:12'). Jobs sharing
+# a resource run one after another in submission order; unrelated jobs run side by side, up to
+# max_concurrent_jobs() per process. A queued job is never overtaken by a later job it conflicts
+# with, so a steady stream of scans on a table cannot starve a waiting re-import.
+# The held resources live in this process only, so the app must be served by a single process
+# (wsgi.py refuses more than one gunicorn worker).
+_sched_lock = threading.Lock()
+_pending = []        # [(live, run)] in submission order
+_held = {}           # resource -> job id
+_running = set()
+_slots = DEFAULT_MAX_CONCURRENT_JOBS
+
+def job_resources(county_id=None, tables=()):
+    resources = [f"table:{t}" for t in tables]
+    if county_id is not None: resources.append(f"county:{county_id}")
+    return tuple(resources)
+
+def _describe(resource):
+    kind, _, name = resource.partition(':')
+    return f"the {name} table" if kind == 'table' else "another job on this county"
+
+def _append_line(live, message):
+    with open(live.log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(message) + '\n')
+    live.notify()
+
+def _enqueue(live, run, limit):
+    global _slots
+    with _sched_lock:
+        _slots = limit
+        _pending.append((live, run))
+        _dispatch_locked()
+
+def _release(live):
+    with _sched_lock:
+        if live.id in _running:
+            _running.discard(live.id)
+            for r in live.resources:
+                if _held.get(r) == live.id: del _held[r]
+        _dispatch_locked()
+
+def _drop_pending(live):
+    # A cancelled job that has not started leaves the queue now; its thread only records the cancel
+    with _sched_lock:
+        entry = next((e for e in _pending if e[0] is live), None)
+        if entry is None: return
+        _pending.remove(entry)
+        _dispatch_locked()
+    threading.Thread(target=entry[1], daemon=True).start()
+
+def _dispatch_locked():
+    blocked, waiting = set(), []
+    for live, run in _pending:
+        conflict = next((r for r in live.resources if r in _held or r in blocked), None)
+        if conflict is None and len(_running) < _slots:
+            _running.add(live.id)
+            for r in live.resources: _held[r] = live.id
+            live.started = True
+            live.position = live.waiting_for = None
+            _get_executor(_slots).submit(run)
+        else:
+            blocked.update(live.resources)
+            waiting.append((live, run, conflict))
+    _pending[:] = [(live, run) for live, run, _ in waiting]
+
+    for position, (live, _, conflict) in enumerate(waiting, 1):
+        reason = _describe(conflict) if conflict else "a free job slot"
+        if (live.position, live.waiting_for) != (position, reason):
+            live.position, live.waiting_for = position, reason
+            try:
+                _append_line(live, {'type': 'log', 'queue_position': position,
+                                    'message': f"Queued (position {position}), waiting for {reason}."})
+            except OSError:
+                pass
+
+def queue_snapshot():
+    """Running and queued jobs of this process, with what each queued job waits for."""
+    with _sched_lock:
+        running = [{'id': job_id, 'tool': _live[job_id].tool, 'resources': list(_live[job_id].resources)}
+                   for job_id in _running if job_id in _live]
+        queued = [{'id': live.id, 'tool': live.tool, 'resources': list(live.resources),
+                   'position': live.position, 'waiting_for': live.waiting_for} for live, _ in _pending]
+        return {'max_concurrent': _slots, 'running': running, 'queued': queued}
+
+def queue_position(job_id):
+    live = _live.get(job_id)
+    if not live or live.started: return None
+    return {'position': live.position, 'waiting_for': live.waiting_for}
+# [GSI_END: job_runner_scheduler]
+
+# [GSI_BLOCK: job_runner_query]
+JOB_COLUMNS = "id, tool, county_id, user_id, status, [percent], message, created_at, started_at, finished_at, updated_at"
+
+def _job_dict(row):
+    def iso(value): return value.isoformat() + 'Z' if value else None
+    return {
+        'id': row.id, 'tool': row.tool, 'county_id': row.county_id, 'user_id': row.user_id,
+        'status': row.status, 'percent': row.percent, 'message': row.message,
+        'created_at': iso(row.created_at), 'started_at': iso(row.started_at),
+        'finished_at': iso(row.finished_at), 'updated_at': iso(row.updated_at),
+    }
+
+def get_job(job_id):
+    engine = db.engine
+    ensure_job_table(engine)
+    with engine.connect() as conn:
+        row = conn.execute(text(f"SELECT {JOB_COLUMNS}, log_path FROM background_jobs WHERE id = :id"), {'id': job_id}).fetchone()
+    if not row: return None
+    job = _job_dict(row)
+    job['log_path'] = row.log_path
+    return job
+
+def list_jobs(county_id=None, user_id=None, active_only=False, limit=50):
+    engine = db.engine
+    ensure_job_table(engine)
+    mark_stale_jobs(engine)
+    where, params = [], {'limit': int(limit)}
+    if county_id is not None:
+        where.append("county_id = :county_id")
+        params['county_id'] = county_id
+    if user_id is not None:
+        where.append("user_id = :user_id")
+        params['user_id'] = user_id
+    if active_only:
+        where.append("status IN (:queued, :running)")
+        params.update(queued=STATUS_QUEUED, running=STATUS_RUNNING)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT TOP (:limit) {JOB_COLUMNS} FROM background_jobs {where_sql} ORDER BY created_at DESC"), params).fetchall()
+    return [_job_dict(r) for r in rows]
+# [GSI_END: job_runner_query]
+
+# [GSI_BLOCK: job_runner_stream]
+def iter_job_lines(engine, job_id, log_path, offset=0):
+    """
+    Tails a job log from line `offset` until the job finishes. Jobs of this process wake the
+    tail directly; jobs of another process are polled, and one whose row has not been touched
+    for JOB_STALE_AFTER (its process died) is marked interrupted and ends the tail with an
+    error line. Idle periods send heartbeat lines, which is also how a closed browser is noticed.
+    """
+    last_output = time.monotonic()
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for _ in range(max(0, offset)):
+            if not f.readline(): break
+        pending = ''
+        while True:
+            chunk = f.readline()
+            if chunk:
+                pending += chunk
+                if pending.endswith('\n'):
+                    yield pending
+                    pending = ''
+                    last_output = time.monotonic()
+                continue
+
+            live = _live.get(job_id)
+            if live:
+                live.wait(JOB_TAIL_WAIT)
+            else:
+                cutoff = _now() - timedelta(seconds=JOB_STALE_AFTER)
+                with engine.connect() as conn:
+                    row = conn.execute(text("""
+                        SELECT status, CASE WHEN updated_at < :cutoff THEN 1 ELSE 0 END FROM background_jobs WHERE id = :id
+                    """), {'id': job_id, 'cutoff': cutoff}).fetchone()
+                status, expired = row if row else (None, 0)
+                stale = status in ACTIVE_STATUSES and bool(expired)
+                if stale:
+                    mark_stale_jobs(engine)
+                if status not in ACTIVE_STATUSES or stale:
+                    rest = f.read()
+                    if rest: yield rest if rest.endswith('\n') else rest + '\n'
+                    if stale:
+                        yield json.dumps({'type': 'error', 'job_id': job_id, 'status': STATUS_INTERRUPTED, 'message': INTERRUPTED_MESSAGE}) + '\n'
+                    return
+                time.sleep(1)
+
+            if time.monotonic() - last_output >= JOB_TAIL_WAIT:
+                yield json.dumps({'type': 'heartbeat', 'job_id': job_id}) + '\n'
+                last_output = time.monotonic()
+
+def job_stream_response(job_id, offset=0):
+    job = get_job(job_id)
+    if not job or not job['log_path'] or not os.path.exists(job['log_path']):
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    # No stream_with_context: the tail must not keep the request's db.session open
+    return Response(iter_job_lines(db.engine, job_id, job['log_path'], offset), mimetype='application/json')
+
+def run_as_job(tool, generator, county_id=None, tables=()):
+    """
+    Tool endpoint helper: starts the generator as a job. The response streams the job's log
+    (same NDJSON the tool used to stream, preceded by a 'job' line carrying the job id), or
+    returns {'job_id'} straight away when the request body has "background": true.
+    tables: shared tables the tool modifies; the county itself is always a resource.
+    "profile": true records a profile of the run (see job_runner_profile).
+    """
+    job_id = start_job(tool, generator, county_id=county_id, user_id=getattr(current_user, 'id', None),
+                       resources=job_resources(county_id, tables), profile=wants_profile())
+    if (request.get_json(silent=True) or {}).get('background'):
+        return jsonify({'success': True, 'job_id': job_id})
+    return job_stream_response(job_id)
+# [GSI_END: job_runner_stream]
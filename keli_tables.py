@@ -0,0 +1,344 @@
+import os
+import re
+import csv
+from datetime import datetime
+from sqlalchemy import text
+from extensions import db
+from bulk_loader import LOADER_CLIENT, LOADER_SERVER, bulk_load_csv
+
+# [GSI_BLOCK: keli_lookup_keys]
+# Join keys used by the linkup / error tools, keyed by the Keli table suffix ({county}_keli_{suffix}).
+# Each entry is one index; multi-column tuples become composite indexes.
+KELI_LOOKUP_KEYS = {
+    'instrument_types': [('name',), ('id',)],
+    'additions': [('name',), ('id',)],
+    'record_series': [('name',)],
+    'party_suffixes': [('name',)],
+    'township_ranges': [('Township', 'Range')],
+    'combined_manifest': [('linkup_path',), ('book',), ('id',)],
+    'pages': [('key_id',), ('book', 'page_number')],
+    'pages_internal': [('key_id',)],
+    'InstTypes_Externals': [('InstTypeName',)],
+}
+
+# Persisted lookup columns so joins on a normalized expression can seek instead of scan.
+# suffix -> [(new_column, expression, source_column)]
+KELI_COMPUTED_KEYS = {
+    'combined_manifest': [('linkup_path', "REPLACE(REPLACE([path], 'MS', '00'), '/', '\\')", 'path')],
+}
+
+# SQL Server index keys are limited to 900 bytes; wider columns stay VARCHAR(MAX) and unindexed.
+MAX_INDEX_WIDTH = 900
+WIDTH_BUFFER = 50
+# [GSI_END: keli_lookup_keys]
+
+# [GSI_BLOCK: keli_index_sql]
+def keli_table_name(county_name, suffix):
+    return f"{county_name}_keli_{suffix}"
+
+def generate_keli_index_sql(table_name, columns, keys, computed=None, resize=True):
+    """
+    Builds the post-import SQL for one Keli table: right-sizes the VARCHAR(MAX)
+    key columns (widths measured in a single scan), adds persisted lookup columns
+    and creates the lookup indexes. Safe to re-run. Pass resize=False when the
+    table was created with typed columns already.
+    """
+    col_map = {c.lower(): c for c in columns}
+    computed = [x for x in (computed or []) if x[2].lower() in col_map]
+    for new_col, _, _ in computed:
+        col_map.setdefault(new_col.lower(), new_col)
+
+    index_cols = [tuple(col_map[k.lower()] for k in key) for key in keys if all(k.lower() in col_map for k in key)]
+    computed_names = {x[0].lower() for x in computed}
+    size_cols = []
+    for key in index_cols:
+        for col in key:
+            if col.lower() not in computed_names and col not in size_cols: size_cols.append(col)
+    for _, _, source in computed:
+        if col_map[source.lower()] not in size_cols: size_cols.append(col_map[source.lower()])
+
+    if not index_cols: return None
+    if not resize: size_cols = []
+
+    full_table = f"[dbo].[{table_name}]"
+    obj = f"dbo.{table_name}".replace("'", "''")
+    exec_table = full_table.replace("'", "''")
+    var_prefix = "@w_" + "".join(ch for ch in table_name if ch.isalnum() or ch == '_')
+    sql = f"IF OBJECT_ID('{obj}', 'U') IS NOT NULL\nBEGIN\n"
+
+    # 1. Measure every key column in one pass, then shrink the ones still at MAX
+    if size_cols:
+        variables = [f"{var_prefix}_{i}" for i in range(len(size_cols))]
+        sql_var = f"{var_prefix}_sql"
+        sql += "    DECLARE " + ", ".join(f"{v} INT" for v in variables) + f", {sql_var} NVARCHAR(MAX);\n"
+        sql += "    SELECT " + ", ".join(f"{v} = ISNULL(MAX(DATALENGTH([{c}])), 0)" for v, c in zip(variables, size_cols)) + f" FROM {full_table};\n"
+        for v, c in zip(variables, size_cols):
+            sql += (
+                f"    IF COL_LENGTH('{obj}', '{c}') = -1 AND {v} <= {MAX_INDEX_WIDTH}\n"
+                f"    BEGIN\n"
+                f"        SET {sql_var} = N'ALTER TABLE {exec_table} ALTER COLUMN [{c}] VARCHAR(' + CAST(IIF({v} + {WIDTH_BUFFER} > {MAX_INDEX_WIDTH}, {MAX_INDEX_WIDTH}, {v} + {WIDTH_BUFFER}) AS NVARCHAR(10)) + N')';\n"
+                f"        EXEC sp_executesql {sql_var};\n"
+                f"    END\n"
+            )
+
+    # 2. Persisted lookup columns. REPLACE() returns VARCHAR(8000) (MAX for a MAX input), which
+    # fails the index fits-check below, so the column is cast to the key limit when its source fits
+    for new_col, expression, source in computed:
+        expr_sql = expression.replace("'", "''")
+        sql += (
+            f"    IF COL_LENGTH('{obj}', '{new_col}') IS NULL AND COL_LENGTH('{obj}', '{col_map[source.lower()]}') BETWEEN 1 AND {MAX_INDEX_WIDTH}\n"
+            f"        EXEC('ALTER TABLE {exec_table} ADD [{new_col}] AS CAST({expr_sql} AS VARCHAR({MAX_INDEX_WIDTH})) PERSISTED');\n"
+            f"    IF COL_LENGTH('{obj}', '{new_col}') IS NULL\n"
+            f"        EXEC('ALTER TABLE {exec_table} ADD [{new_col}] AS {expr_sql} PERSISTED');\n"
+        )
+
+    # 3. Lookup indexes (only when every key column fits an index key)
+    for key in index_cols:
+        ix_name = f"IX_{table_name}_{'_'.join(key)}".replace("'", "''")
+        fits = " AND ".join(f"COL_LENGTH('{obj}', '{c}') BETWEEN 1 AND {MAX_INDEX_WIDTH}" for c in key)
+        cols_sql = ", ".join(f"[{c}]" for c in key)
+        sql += (
+            f"    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{ix_name}' AND object_id = OBJECT_ID('{obj}')) AND {fits}\n"
+            f"        EXEC('CREATE INDEX [{ix_name}] ON {exec_table} ({cols_sql})');\n"
+        )
+
+    sql += "END\n"
+    return sql
+
+def keli_index_sql_for(county_name, suffix, columns):
+    """Index SQL for a Keli table identified by suffix, or None if it has no known lookup keys."""
+    if suffix not in KELI_LOOKUP_KEYS: return None
+    return generate_keli_index_sql(
+        keli_table_name(county_name, suffix), columns,
+        KELI_LOOKUP_KEYS[suffix], KELI_COMPUTED_KEYS.get(suffix)
+    )
+
+def build_keli_index_steps(county_name):
+    """
+    Returns (step_name, sql) pairs that index every existing Keli lookup table for the county.
+    Column metadata comes from one INFORMATION_SCHEMA query.
+    """
+    tables = {keli_table_name(county_name, s): s for s in KELI_LOOKUP_KEYS}
+    params = {f"t{i}": t for i, t in enumerate(tables)}
+    placeholders = ", ".join(f":{k}" for k in params)
+    rows = db.session.execute(text(
+        f"SELECT TABLE_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = 'dbo' AND TABLE_NAME IN ({placeholders}) ORDER BY TABLE_NAME, ORDINAL_POSITION"
+    ), params).fetchall()
+
+    columns = {}
+    for r in rows:
+        columns.setdefault(r[0], []).append(r[1])
+
+    steps = []
+    for table_name, suffix in tables.items():
+        if table_name not in columns: continue
+        sql = keli_index_sql_for(county_name, suffix, columns[table_name])
+        if sql: steps.append((f"Indexing {table_name}", sql))
+    return steps
+# [GSI_END: keli_index_sql]
+
+# [GSI_BLOCK: keli_schema_inference]
+# Columns that are joined/concatenated against GenericDataImport text columns stay VARCHAR
+# (converting them would change implicit-conversion results in the linkup/final prep SQL).
+KELI_TEXT_COLUMNS = {'id'}
+
+INT_PATTERN = re.compile(r'^-?(0|[1-9][0-9]{0,9})$')
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+DATETIME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d{1,7})?)?$')
+# The patterns only check the shape; strptime rejects 2023-02-30, month 13, 25:00 and the like
+# (fractional seconds are left to the pattern: DATETIME2 keeps 7 digits, strptime parses 6)
+DATE_FORMATS = {10: '%Y-%m-%d', 16: '%Y-%m-%d %H:%M', 19: '%Y-%m-%d %H:%M:%S'}
+INT_MIN, INT_MAX = -2147483648, 2147483647
+VARCHAR_LIMIT = 8000
+
+def is_valid_date(value):
+    """True for a DATE_PATTERN / DATETIME_PATTERN match that is a real calendar date and time."""
+    head = value[:19].replace('T', ' ')
+    try:
+        datetime.strptime(head, DATE_FORMATS[len(head)])
+    except (KeyError, ValueError):
+        return False
+    return True
+
+def detect_row_terminator(full_path):
+    """BULK INSERT ROWTERMINATOR for a CSV: '0x0d0a' when its first line ends in CRLF, else '0x0a'."""
+    with open(full_path, 'rb') as f:
+        chunk = f.read(1 << 16)
+    end = chunk.find(b'\n')
+    return '0x0d0a' if end > 0 and chunk[end - 1:end] == b'\r' else '0x0a'
+
+def keli_text_columns(suffix):
+    """Lower-cased column names that must remain VARCHAR for a Keli table suffix."""
+    cols = set(KELI_TEXT_COLUMNS)
+    for key in KELI_LOOKUP_KEYS.get(suffix, []):
+        cols.update(k.lower() for k in key)
+    for _, _, source in KELI_COMPUTED_KEYS.get(suffix, []):
+        cols.add(source.lower())
+    return cols
+
+def infer_keli_schema(full_path, suffix=''):
+    """
+    Streams a Keli CSV once and works out a SQL type per column (INT, DATE, DATETIME2 or VARCHAR(n)).
+    Returns (columns, primary_key, row_count) where columns is [(name, sql_type)].
+    The primary key is the 'id' column when every row has a unique, index-sized value.
+    """
+    with open(full_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        reader = csv.reader(f)
+        headers = next(reader, None)
+        if not headers: raise Exception("No headers found")
+
+        names = [h.strip() for h in headers]
+        width = [0] * len(names)
+        is_int = [True] * len(names)
+        is_date = [True] * len(names)
+        has_time = [False] * len(names)
+        has_value = [False] * len(names)
+
+        id_idx = next((i for i, n in enumerate(names) if n.lower() == 'id'), None)
+        seen_ids = set()
+        ids_unique = id_idx is not None
+        row_count = 0
+
+        for row in reader:
+            if not row: continue
+            row_count += 1
+            for i, v in enumerate(row[:len(names)]):
+                if not v: continue
+                has_value[i] = True
+                n = len(v.encode('utf-8'))
+                if n > width[i]: width[i] = n
+                if is_int[i] and not (INT_PATTERN.match(v) and INT_MIN <= int(v) <= INT_MAX): is_int[i] = False
+                if is_date[i]:
+                    if DATETIME_PATTERN.match(v) and is_valid_date(v): has_time[i] = True
+                    elif not (DATE_PATTERN.match(v) and is_valid_date(v)): is_date[i] = False
+
+            if ids_unique:
+                v = row[id_idx] if id_idx < len(row) else ''
+                if not v or v in seen_ids: ids_unique = False
+                else: seen_ids.add(v)
+
+    text_cols = keli_text_columns(suffix)
+    columns = []
+    for i, name in enumerate(names):
+        if not name: continue
+        if not has_value[i]:
+            sql_type = f"VARCHAR({WIDTH_BUFFER})"
+        elif name.lower() not in text_cols and is_int[i]:
+            sql_type = "INT"
+        elif name.lower() not in text_cols and is_date[i]:
+            sql_type = "DATETIME2" if has_time[i] else "DATE"
+        elif width[i] + WIDTH_BUFFER <= VARCHAR_LIMIT:
+            sql_type = f"VARCHAR({width[i] + WIDTH_BUFFER})"
+        else:
+            sql_type = "VARCHAR(MAX)"
+        columns.append((name, sql_type))
+
+    primary_key = None
+    if ids_unique and row_count and width[id_idx] + WIDTH_BUFFER <= MAX_INDEX_WIDTH:
+        primary_key = names[id_idx]
+    return columns, primary_key, row_count
+
+def plan_keli_table(full_path, county_name):
+    """
+    Builds the typed load plan for one Keli CSV: table name, inferred columns,
+    CREATE TABLE (with primary key), the BULK INSERT row terminator and the
+    post-load lookup index SQL.
+    """
+    raw_name = os.path.splitext(os.path.basename(full_path))[0]
+    # Sanitize simple chars only for table name to avoid SQL Injection risks
+    suffix = "".join([c for c in raw_name if c.isalnum() or c in ('_')])
+    table_name = keli_table_name(county_name, suffix)
+    full_table_name = f"[dbo].[{table_name}]"
+
+    columns, primary_key, row_count = infer_keli_schema(full_path, suffix)
+    if not columns: raise Exception("No headers found")
+
+    cols_def = []
+    for name, sql_type in columns:
+        if name == primary_key:
+            cols_def.append(f"[{name}] {sql_type} NOT NULL CONSTRAINT [PK_{table_name}] PRIMARY KEY")
+        else:
+            cols_def.append(f"[{name}] {sql_type}")
+    create_sql = f"DROP TABLE IF EXISTS {full_table_name};\nCREATE TABLE {full_table_name} ({', '.join(cols_def)});\n"
+
+    index_sql = None
+    if suffix in KELI_LOOKUP_KEYS:
+        keys = [k for k in KELI_LOOKUP_KEYS[suffix] if not (primary_key and len(k) == 1 and k[0].lower() == primary_key.lower())]
+        index_sql = generate_keli_index_sql(table_name, [c[0] for c in columns], keys, KELI_COMPUTED_KEYS.get(suffix), resize=False)
+
+    return {
+        'table_name': table_name,
+        'full_table_name': full_table_name,
+        'suffix': suffix,
+        'columns': columns,
+        'primary_key': primary_key,
+        'row_count': row_count,
+        'row_terminator': detect_row_terminator(full_path),
+        'create_sql': create_sql,
+        'index_sql': index_sql
+    }
+# [GSI_END: keli_schema_inference]
+
+# [GSI_BLOCK: keli_file_import]
+# Parallel import limits: each worker holds its own pooled connection for the whole file.
+DEFAULT_IMPORT_WORKERS = 1
+MAX_IMPORT_WORKERS = 8
+
+def keli_bulk_insert_sql(full_table_name, full_path, row_terminator='0x0a'):
+    # CRLF files need ROWTERMINATOR '0x0d0a' (see detect_row_terminator); with '0x0a' the last
+    # column of every row keeps a trailing '\r' and typed last columns fail to convert
+    # Escape single quotes in path for SQL (e.g. O'Brien folder)
+    sql_safe_path = full_path.replace("'", "''")
+
+    # We inject the path directly because BULK INSERT does NOT support parameters (e.g. @Path)
+    return f"""
+        BULK INSERT {full_table_name} 
+        FROM '{sql_safe_path}' 
+        WITH (
+            FORMAT = 'CSV', 
+            FIRSTROW = 2, 
+            FIELDQUOTE = '"', 
+            FIELDTERMINATOR = ',', 
+            ROWTERMINATOR = '{row_terminator}',
+            TABLOCK
+        );
+    """
+
+def import_keli_file(conn, full_path, county_name, loader=LOADER_SERVER):
+    """
+    Loads one Keli CSV: infer schema, CREATE, bulk load, lookup indexes.
+    conn is db.session or a Connection from db.engine.connect() (anything with execute/commit).
+    loader 'server' uses BULK INSERT from the path; 'client' streams the rows over conn.
+    Returns the table plan; the caller rolls back on error.
+    """
+    # --- STEP A: INFER SCHEMA (Python, single streaming pass) ---
+    # Table name [dbo].[county_keli_filename], typed columns (INT/DATE/VARCHAR(n)) and primary key
+    plan = plan_keli_table(full_path, county_name)
+
+    # --- STEP B: CREATE TABLE ---
+    conn.execute(text(plan['create_sql']))
+    conn.commit()
+
+    # --- STEP C: BULK LOAD ---
+    if loader == LOADER_CLIENT:
+        # Rows travel over the client connection; no shared folder / mapped drive needed
+        bulk_load_csv(conn, plan['full_table_name'], full_path, [c[0] for c in plan['columns']])
+    else:
+        conn.execute(text(keli_bulk_insert_sql(plan['full_table_name'], full_path, plan['row_terminator'])))
+        conn.commit()
+
+    # --- STEP D: LOOKUP INDEXES ---
+    if plan['index_sql']:
+        conn.execute(text(plan['index_sql']))
+        conn.commit()
+    return plan
+
+def import_keli_file_worker(engine, full_path, county_name, loader=LOADER_SERVER):
+    """Thread entry point for the parallel import: one engine connection per file."""
+    with engine.connect() as conn:
+        try:
+            return import_keli_file(conn, full_path, county_name, loader)
+        except Exception:
+            conn.rollback()
+            raise
+# [GSI_END: keli_file_import]
@@ -0,0 +1,72 @@
+import json
+import time
+import queue
+import itertools
+import threading
+
+# [GSI_BLOCK: live_events_broker]
+# In-process fan-out for Server-Sent Events. Each connected client owns a bounded queue;
+# writers call publish_event() after their commit. Events are small change notices
+# (which county / what changed), clients re-read the data they need.
+#
+# Every open stream holds a server thread, so the number of listeners is capped and each
+# stream ends after STREAM_LIFETIME (EventSource reconnects on its own). Over the cap the
+# endpoint answers 503 and the UI falls back to polling.
+MAX_SUBSCRIBERS = 32
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 20
+STREAM_LIFETIME = 300
+RETRY_MS = 3000
+
+EVENT_COUNTY = 'county'   # status of one county changed (work / split / notes / active / locked)
+EVENT_MAP = 'map'         # enabled sets changed (state/county enabled, added, edited, deleted)
+
+_lock = threading.Lock()
+_subscribers = set()
+_event_ids = itertools.count(1)
+
+def publish_event(event_type, **data):
+    """Queues an event for every listener. Never blocks; a full (stalled) client just misses it."""
+    event = {'id': next(_event_ids), 'type': event_type, 'data': data, 'ts': round(time.time(), 3)}
+    with _lock:
+        targets = list(_subscribers)
+    for q in targets:
+        try:
+            q.put_nowait(event)
+        except queue.Full:
+            pass
+    return event
+
+def subscribe():
+    """Returns a new listener queue, or None when MAX_SUBSCRIBERS streams are already open."""
+    with _lock:
+        if len(_subscribers) >= MAX_SUBSCRIBERS: return None
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        _subscribers.add(q)
+        return q
+
+def unsubscribe(q):
+    with _lock:
+        _subscribers.discard(q)
+
+def subscriber_count():
+    with _lock:
+        return len(_subscribers)
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+def event_stream(q):
+    """SSE generator: events as they arrive, a comment heartbeat when idle, closes after STREAM_LIFETIME."""
+    deadline = time.monotonic() + STREAM_LIFETIME
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            try:
+                yield format_sse(q.get(timeout=HEARTBEAT_SECONDS))
+            except queue.Empty:
+                # Also how a closed connection is noticed (the write fails)
+                yield ": ping\n\n"
+    finally:
+        unsubscribe(q)
+# [GSI_END: live_events_broker]
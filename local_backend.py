@@ -0,0 +1,238 @@
+import re
+import csv
+import time
+import sqlite3
+from bulk_loader import BULK_BATCH_SIZE, iter_csv_batches
+from sql_dialect import get_dialect, object_name, translate_script
+
+# DuckDB is optional; SQLite from the standard library is the fallback
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# [GSI_BLOCK: local_backend_functions]
+# T-SQL built-ins the local databases lack: SQL macros on DuckDB (its Python UDFs need numpy),
+# Python functions on SQLite.
+ISNUMERIC_MONEY = r"^[+-]?[$£€¥]?[+-]?(?:\d[\d,]*\.?\d*|\.\d*|[.,]?)$"
+ISNUMERIC_FLOAT = r"^[+-]?(?:\d+\.?\d*|\.\d+)[eE][+-]?\d+$"
+_ISNUMERIC_MONEY = re.compile(ISNUMERIC_MONEY)
+_ISNUMERIC_FLOAT = re.compile(ISNUMERIC_FLOAT)
+
+def isnumeric(value):
+    """Close to SQL Server's ISNUMERIC: 1 for anything convertible to int, decimal, money or float."""
+    if value is None: return 0
+    v = str(value).strip()
+    if not v: return 0
+    return 1 if _ISNUMERIC_MONEY.match(v) or _ISNUMERIC_FLOAT.match(v) else 0
+
+def replace_ci(value, search, replacement):
+    if value is None or search is None or replacement is None: return None
+    if search == '': return value
+    return re.sub(re.escape(search), lambda _: replacement, value, flags=re.I)
+
+def _regexp(pattern, value):
+    return value is not None and re.search(pattern, str(value)) is not None
+
+def _left(value, n):
+    return None if value is None or n is None else str(value)[:max(int(n), 0)]
+
+def _right(value, n):
+    if value is None or n is None: return None
+    n = int(n)
+    return str(value)[-n:] if n > 0 else ''
+
+def _reverse(value):
+    return None if value is None else str(value)[::-1]
+
+def register_functions(conn, engine):
+    if engine == 'duckdb':
+        conn.execute(f"""CREATE OR REPLACE MACRO isnumeric(v) AS CASE
+            WHEN trim(CAST(v AS VARCHAR)) = '' THEN 0
+            WHEN regexp_full_match(trim(CAST(v AS VARCHAR)), '{ISNUMERIC_MONEY}')
+              OR regexp_full_match(trim(CAST(v AS VARCHAR)), '{ISNUMERIC_FLOAT}') THEN 1
+            ELSE 0 END""")
+        conn.execute("CREATE OR REPLACE MACRO gsi_replace_ci(v, search, replacement) AS "
+                     "CASE WHEN search = '' THEN v ELSE regexp_replace(v, '(?i)' || regexp_escape(search), replace(replacement, '\\', '\\\\'), 'g') END")
+    else:
+        conn.create_function('isnumeric', 1, isnumeric, deterministic=True)
+        conn.create_function('gsi_replace_ci', 3, replace_ci, deterministic=True)
+        conn.create_function('regexp', 2, _regexp, deterministic=True)
+        conn.create_function('gsi_left', 2, _left, deterministic=True)
+        conn.create_function('gsi_right', 2, _right, deterministic=True)
+        conn.create_function('reverse', 1, _reverse, deterministic=True)
+# [GSI_END: local_backend_functions]
+
+# [GSI_BLOCK: local_backend_database]
+DUCKDB_VALUES_ROWS = 500
+_ALTER_TABLE = re.compile(r"^\s*ALTER\s+TABLE\b", re.I)
+
+def _literal(value):
+    if value is None: return 'NULL'
+    if isinstance(value, bool): return '1' if value else '0'
+    if isinstance(value, (int, float)): return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+class LocalDatabase:
+    """
+    In-process stand-in for the SQL Server database: runs the tools' generated T-SQL scripts
+    through sql_dialect.translate_script on DuckDB (preferred) or SQLite. Used by the benchmark
+    suite to run the import, preparation, linkup and error scan pipelines without a server.
+    """
+    def __init__(self, path=':memory:', engine=None):
+        engine = engine or ('duckdb' if duckdb else 'sqlite')
+        if engine == 'duckdb' and duckdb is None: raise RuntimeError("duckdb is not installed (pip install duckdb).")
+        self.engine = engine
+        self.dialect = get_dialect(engine)
+        if engine == 'duckdb':
+            self.conn = duckdb.connect(path)
+            self.version = duckdb.__version__
+        else:
+            # Autocommit mode: transactions are opened explicitly by begin()
+            self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self.version = sqlite3.sqlite_version
+        register_functions(self.conn, engine)
+        self.skipped = []
+        self.in_transaction = False
+        self.split_transactions = 0
+
+    def close(self):
+        self.conn.close()
+
+    # Plain statements in the local dialect (qmark parameters)
+    def execute(self, sql, params=()):
+        cursor = self.conn.execute(sql, params)
+        if self.engine == 'duckdb':
+            row = cursor.fetchone() if cursor.description and cursor.description[0][0] == 'Count' else None
+            return row[0] if row else -1
+        return cursor.rowcount
+
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def scalar(self, sql, params=()):
+        row = self.conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def begin(self):
+        self.conn.execute("BEGIN TRANSACTION")
+        self.in_transaction = True
+
+    def commit(self):
+        if self.in_transaction: self.conn.execute("COMMIT")
+        self.in_transaction = False
+
+    def rollback(self):
+        if self.in_transaction: self.conn.execute("ROLLBACK")
+        self.in_transaction = False
+
+    # Catalog
+    def table_exists(self, table):
+        return bool(self.query(self.dialect.table_exists_sql, (object_name(table),)))
+
+    def column_exists(self, table, column):
+        return bool(self.query(self.dialect.column_exists_sql, (object_name(table), object_name(column))))
+
+    def index_exists(self, name):
+        return bool(self.query(self.dialect.index_exists_sql, (object_name(name),)))
+
+    def columns(self, table):
+        if self.engine == 'duckdb':
+            return [r[0] for r in self.query("SELECT column_name FROM information_schema.columns WHERE lower(table_name) = lower(?) ORDER BY ordinal_position", (table,))]
+        return [r[1] for r in self.query("SELECT * FROM pragma_table_info(?)", (table,))]
+
+    def tables_like(self, pattern):
+        return [r[0] for r in self.query(self.dialect.tables_like_sql(), (pattern,))]
+
+    def _holds(self, guard):
+        kind, args, expected = guard
+        if kind == 'table': found = self.table_exists(*args)
+        elif kind == 'column': found = self.column_exists(*args)
+        else: found = self.index_exists(*args)
+        return found == expected
+
+    # Generated T-SQL
+    def _run_items(self, items):
+        rows = -1
+        for item in items:
+            if item[0] == 'sql':
+                if self.in_transaction and self.engine == 'duckdb' and _ALTER_TABLE.match(item[1]):
+                    # DuckDB cannot commit row changes and an ALTER of the same table together
+                    self.commit()
+                    self.begin()
+                    self.split_transactions += 1
+                rows = self.execute(item[1])
+            elif item[0] == 'skip':
+                self.skipped.append((item[1], item[2].strip()[:200]))
+            elif item[1] is None:
+                self.skipped.append(('condition cannot be evaluated locally', repr(item[2])[:200]))
+            elif all(self._holds(g) for g in item[1]):
+                rows = self._run_items(item[2])
+        return rows
+
+    def run_script(self, tsql):
+        """Runs one generated T-SQL script; returns the row count of its last statement (-1 if unknown)."""
+        return self._run_items(translate_script(tsql, self.dialect))
+
+    def run_steps(self, steps, on_step=None):
+        """
+        Runs (name, sql) steps in one transaction, like the tools do, and returns
+        [(name, seconds, rows)]. on_step(name, seconds, rows) is called after each step.
+        On DuckDB the transaction is committed before each ALTER TABLE (see _run_items),
+        so a failure there only rolls back the statements since the last ALTER.
+        """
+        timings = []
+        self.begin()
+        try:
+            for name, sql in steps:
+                start = time.perf_counter()
+                rows = self.run_script(sql)
+                elapsed = time.perf_counter() - start
+                timings.append((name, elapsed, rows))
+                if on_step: on_step(name, elapsed, rows)
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        return timings
+
+    # Loading
+    def insert_rows(self, table, columns, rows):
+        """Row tuples into an existing table."""
+        cols = ", ".join(self.dialect.quote(c) for c in columns)
+        prefix = f"INSERT INTO {self.dialect.quote(object_name(table))} ({cols}) VALUES "
+        rows = list(rows)
+        if not rows: return 0
+        if self.engine == 'duckdb':
+            # DuckDB binds executemany parameters row by row (~20x slower), so send literal VALUES lists
+            for start in range(0, len(rows), DUCKDB_VALUES_ROWS):
+                chunk = rows[start:start + DUCKDB_VALUES_ROWS]
+                self.conn.execute(prefix + ", ".join("(" + ", ".join(_literal(v) for v in row) + ")" for row in chunk))
+        else:
+            self.conn.executemany(prefix + f"({', '.join('?' * len(columns))})", rows)
+        return len(rows)
+
+    def load_csv(self, table, full_path, columns, batch_size=BULK_BATCH_SIZE):
+        """CSV (header row first) into an existing table; empty fields become NULL like BULK INSERT."""
+        with open(full_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            headers = next(csv.reader(f), None)
+            if not headers: raise Exception("No headers found")
+            header_pos = {h.strip().lower(): i for i, h in enumerate(headers)}
+            positions = [header_pos[c.lower()] for c in columns]
+            total = 0
+            self.begin()
+            try:
+                for batch in iter_csv_batches(f, positions, batch_size):
+                    total += self.insert_rows(table, columns, batch)
+                self.commit()
+            except Exception:
+                self.rollback()
+                raise
+        return total
+
+    def drop_tables_like(self, pattern):
+        names = self.tables_like(pattern)
+        for name in names:
+            self.execute(self.dialect.drop_table_sql(name))
+        return names
+# [GSI_END: local_backend_database]
@@ -0,0 +1,184 @@
+import os
+import glob
+import json
+import hashlib
+import tempfile
+import time
+from flask import current_app
+from sqlalchemy import text
+from bulk_loader import BULK_BATCH_SIZE
+from db_engine import read_only_connection
+from local_backend import LocalDatabase, duckdb
+from sql_dialect import sqlglot, exp, translate_script, server_semantics
+
+# [GSI_BLOCK: local_scan_load]
+# Local scan engine for the eData error scan ("engine": "local"): the rules are group-by and
+# anti-join work, which DuckDB's vectorized engine does far faster than row-store scans on
+# SQL Server Express. The columns the rules read are copied into an in-process DuckDB once
+# (the eData side is kept as a Parquet file under instance/scan_cache and reused while the
+# table's row count and checksums are unchanged), every rule's WHERE clause runs there
+# through sql_dialect, and only the flagged IDs go back to SQL Server (see local_scan_write).
+# The table has no rowversion to key on, and row checksums can collide, so a cached copy is
+# also rebuilt after SCAN_CACHE_MAX_AGE seconds or when the request asks for "refresh_cache".
+# The rules are translated with sql_dialect.server_semantics: comparisons, IN and GROUP BY ignore
+# trailing spaces, and a cast to INT fails on text SQL Server cannot convert (the rule then runs on
+# SQL Server, like any rule that fails locally). Results can still differ from the server scan:
+#   - a grouped subquery returns trimmed values where SQL Server returns any one of the padded
+#     rows (headerDuplicateInstrumentNumber: 'A ' + 'B' is compared with 'AB');
+#   - DuckDB may evaluate a cast on rows another condition excludes, so a rule can fail locally
+#     and fall back where the server plan would not have failed.
+SCAN_CACHE_FOLDER = 'scan_cache'
+SCAN_CACHE_MAX_AGE = 24 * 3600
+FETCH_ROWS = 10000
+_INT_TYPES = {'int', 'bigint', 'smallint', 'tinyint', 'bit'}
+_NUMBER_TYPES = {'decimal', 'numeric', 'float', 'real', 'money', 'smallmoney'}
+
+def local_scan_unavailable():
+    """Why the local scan engine cannot run in this install, or None."""
+    if duckdb is None: return "The local scan engine needs duckdb (pip install duckdb)."
+    if sqlglot is None: return "The local scan engine needs sqlglot (pip install sqlglot)."
+    return None
+
+def scan_cache_dir():
+    path = os.path.join(current_app.instance_path, SCAN_CACHE_FOLDER)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def format_age(seconds):
+    """'45 s', '12 min', '3 h 05 min' for the scan log."""
+    seconds = int(seconds)
+    if seconds < 60: return f"{seconds} s"
+    if seconds < 3600: return f"{seconds // 60} min"
+    return f"{seconds // 3600} h {seconds % 3600 // 60:02d} min"
+
+def _local_type(data_type):
+    data_type = (data_type or '').lower()
+    if data_type in _INT_TYPES: return 'BIGINT'
+    if data_type in _NUMBER_TYPES: return 'DOUBLE'
+    return 'VARCHAR'
+
+def id_query(scan_sql):
+    """A scan rule's SELECT * INTO [target] FROM ... WHERE ... as SELECT ID FROM ... WHERE ... (T-SQL)."""
+    tree = sqlglot.parse_one(scan_sql, read='tsql')
+    tree.set('into', None)
+    tree.set('expressions', [exp.column('ID')])
+    return tree.sql('tsql')
+
+def referenced_names(queries):
+    """(table names, lower-case column names) the T-SQL queries read."""
+    tables, columns = {}, set()
+    for sql in queries:
+        tree = sqlglot.parse_one(sql, read='tsql')
+        for t in tree.find_all(exp.Table): tables.setdefault(t.name.lower(), t.name)
+        columns.update(c.name.lower() for c in tree.find_all(exp.Column))
+    return list(tables.values()), columns
+
+def _source_columns(conn, table, wanted):
+    """[(column, local type)] of a SQL Server table that the rules read (ID always)."""
+    rows = conn.execute(text("""
+        SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = 'dbo' AND TABLE_NAME = :t ORDER BY ORDINAL_POSITION
+    """), {'t': table}).fetchall()
+    return [(r[0], _local_type(r[1])) for r in rows if r[0].lower() in wanted or r[0].lower() == 'id']
+
+def _fingerprint(conn, table, columns):
+    """
+    Cache key of a table's scanned columns: row count, CHECKSUM_AGG (XOR-like) and the sum of
+    the row checksums. Two aggregates miss far fewer edits than CHECKSUM_AGG alone, but a
+    checksum is not a change log; see SCAN_CACHE_MAX_AGE.
+    """
+    cols = ", ".join(f"[{c}]" for c, _ in columns)
+    row = conn.execute(text(f"""
+        SELECT COUNT_BIG(*), CHECKSUM_AGG(BINARY_CHECKSUM({cols})), SUM(CAST(BINARY_CHECKSUM({cols}) AS BIGINT)) FROM [{table}]
+    """)).fetchone()
+    return hashlib.sha1(json.dumps([table, columns, list(row)]).encode('utf-8')).hexdigest()[:16]
+
+def _copy_table(conn, local, table, columns, ndjson_path):
+    """Streams the columns of a SQL Server table through an NDJSON file into a local table; returns the row count."""
+    names = [c for c, _ in columns]
+    result = conn.execute(text(f"SELECT {', '.join(f'[{c}]' for c in names)} FROM [{table}]"))
+    rows = 0
+    with open(ndjson_path, 'w', encoding='utf-8') as f:
+        while True:
+            batch = result.fetchmany(FETCH_ROWS)
+            if not batch: break
+            for row in batch:
+                f.write(json.dumps(dict(zip(names, row)), default=str) + '\n')
+            rows += len(batch)
+    types = ", ".join(f"'{c.replace(chr(39), chr(39) * 2)}': '{t}'" for c, t in columns)
+    local.execute(f"CREATE TABLE {local.dialect.quote(table)} AS SELECT * FROM read_json(?, format='newline_delimited', columns={{{types}}})",
+                  (ndjson_path,))
+    return rows
+
+class LocalScan:
+    """
+    The scan rules of build_scan_queries evaluated in DuckDB. load() copies what the rules
+    read; flagged_ids(name) runs one rule and returns the IDs it flags.
+    Comparisons use DuckDB's NOCASE collation, like the server's case-insensitive default.
+    refresh: copy the eData table from SQL Server even when a cached copy matches.
+    """
+    def __init__(self, data_table, scan_queries, cache_dir=None, refresh=False):
+        self.data_table = data_table
+        self.id_queries = {name: id_query(sql) for name, _, sql in scan_queries}
+        self.cache_dir = cache_dir or scan_cache_dir()
+        self.refresh = refresh
+        self.local = LocalDatabase(engine='duckdb')
+        self.local.execute("SET default_collation = 'nocase'")
+
+    def close(self):
+        self.local.close()
+
+    def _load_cached(self, conn, columns, tmp):
+        """
+        The eData table from its Parquet snapshot, refreshed when the fingerprint changed, the
+        snapshot is older than SCAN_CACHE_MAX_AGE or a refresh was asked for.
+        Returns (rows, cache age in seconds, or None when copied from SQL Server).
+        """
+        table = self.data_table
+        path = os.path.join(self.cache_dir, f"{table}_{_fingerprint(conn, table, columns)}.parquet")
+        age = time.time() - os.path.getmtime(path) if os.path.exists(path) else None
+        if age is not None and age <= SCAN_CACHE_MAX_AGE and not self.refresh:
+            self.local.execute(f"CREATE TABLE {self.local.dialect.quote(table)} AS SELECT * FROM read_parquet(?)", (path,))
+            return self.local.scalar(f"SELECT COUNT(*) FROM {self.local.dialect.quote(table)}"), age
+        rows = _copy_table(conn, self.local, table, columns, os.path.join(tmp, 'edata.ndjson'))
+        for stale in glob.glob(os.path.join(glob.escape(self.cache_dir), glob.escape(table) + '_*.parquet')):
+            os.remove(stale)
+        self.local.execute(f"COPY {self.local.dialect.quote(table)} TO ? (FORMAT parquet)", (path + '.tmp',))
+        os.replace(path + '.tmp', path)
+        return rows, None
+
+    def load(self):
+        """Copies the eData and lookup columns the rules read; returns (eData rows, cache age or None)."""
+        tables, wanted = referenced_names(self.id_queries.values())
+        rows, cached = 0, None
+        with read_only_connection() as conn, tempfile.TemporaryDirectory() as tmp:
+            for table in tables:
+                columns = _source_columns(conn, table, wanted)
+                if not columns: continue    # missing on the server: its rules fail and fall back
+                if table.lower() == self.data_table.lower():
+                    rows, cached = self._load_cached(conn, columns, tmp)
+                else:
+                    _copy_table(conn, self.local, table, columns, os.path.join(tmp, 'lookup.ndjson'))
+        return rows, cached
+
+    def flagged_ids(self, name):
+        statements = [item[1] for item in translate_script(self.id_queries[name], server_semantics(self.local.dialect)) if item[0] == 'sql']
+        if len(statements) != 1: raise ValueError(f"{name} does not translate to a single SELECT.")
+        return [r[0] for r in self.local.query(statements[0])]
+# [GSI_END: local_scan_load]
+
+# [GSI_BLOCK: local_scan_write]
+FLAG_TABLE = '#gsi_scan_flags'
+
+def stage_flagged_ids(session, flagged):
+    """Sends {rule_no: [ID, ...]} to a session temp table, so only the IDs cross the wire."""
+    session.execute(text(f"IF OBJECT_ID('tempdb..{FLAG_TABLE}') IS NOT NULL DROP TABLE {FLAG_TABLE}"))
+    session.execute(text(f"CREATE TABLE {FLAG_TABLE} (rule_no INT NOT NULL, ID INT NOT NULL, PRIMARY KEY (rule_no, ID))"))
+    pairs = [{'rule_no': rule_no, 'id': i} for rule_no, ids in flagged.items() for i in ids]
+    for start in range(0, len(pairs), BULK_BATCH_SIZE):
+        session.execute(text(f"INSERT INTO {FLAG_TABLE} (rule_no, ID) VALUES (:rule_no, :id)"), pairs[start:start + BULK_BATCH_SIZE])
+
+def flagged_rows_sql(target_table, data_table, rule_no):
+    """The error table of one rule from its staged IDs (IN, not a join, so ID keeps its IDENTITY like the server scan)."""
+    return f"SELECT * INTO [{target_table}] FROM [{data_table}] WHERE ID IN (SELECT ID FROM {FLAG_TABLE} WHERE rule_no = {int(rule_no)})"
+# [GSI_END: local_scan_write]
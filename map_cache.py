@@ -0,0 +1,293 @@
+import os
+import json
+import math
+import gzip
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response, request
+
+# [GSI_BLOCK: map_cache_index]
+# The boundary files are static, so they are parsed and indexed once per process.
+# Geometry is serialized once here; requests only serialize the (small) properties.
+_lock = threading.Lock()
+_index = {}
+
+COUNTIES_FILE = 'us-counties.json'
+STATES_FILE = 'us-states.json'
+
+def _load_features(root_path, filename):
+    path = os.path.join(root_path, 'static', filename)
+    if not os.path.exists(path): return []
+    # us-counties.json is Latin-1 encoded (e.g. Doña Ana)
+    with open(path, 'r', encoding='latin-1') as f: data = json.load(f)
+    return data.get('features', []) if isinstance(data, dict) else data
+
+def iter_feature_properties(path, encoding='latin-1'):
+    """
+    Yields each feature's properties without decoding any geometry: only the
+    "properties" objects are parsed (raw_decode at each key). Plain arrays of
+    property objects are supported too.
+    """
+    with open(path, 'r', encoding=encoding) as f: raw = f.read()
+    decoder = json.JSONDecoder()
+    pos = raw.find('"properties"')
+    if pos == -1:
+        data = json.loads(raw)
+        items = data.get('features', []) if isinstance(data, dict) else data
+        for item in items: yield item.get('properties', item)
+        return
+    while pos != -1:
+        start = raw.index(':', pos + 12) + 1
+        while raw[start] in ' \t\r\n': start += 1
+        props, end = decoder.raw_decode(raw, start)
+        if isinstance(props, dict): yield props
+        pos = raw.find('"properties"', end)
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'))
+
+def _build_county_index(root_path):
+    """
+    by_state: state FIPS -> [entry] (file order), by_geo_id: geo_id -> entry.
+    entry = {'ids': [candidate geo ids], 'properties': {...}, 'geometry': '<json>',
+             'coords': raw geometry, 'bbox': (w, s, e, n), 'simplified': {level: '<json>'}}
+    """
+    by_state, by_geo_id = {}, {}
+    for f in _load_features(root_path, COUNTIES_FILE):
+        props = f.get('properties', {})
+
+        # Robust ID Construction (Padding is crucial)
+        s = props.get('STATE', '')
+        c = props.get('COUNTY', '')
+        geo_id = props.get('id') or props.get('GEO_ID')
+
+        check_ids = []
+        if s and c: check_ids.append(s + c)
+        if geo_id: check_ids.append(geo_id)
+
+        geometry = f.get('geometry')
+        entry = {
+            'ids': check_ids, 'properties': props, 'geometry': _dumps(geometry),
+            'coords': geometry, 'bbox': geometry_bbox(geometry), 'simplified': {}
+        }
+        by_state.setdefault(s, []).append(entry)
+        for cid in check_ids: by_geo_id.setdefault(cid, entry)
+    return {'by_state': by_state, 'by_geo_id': by_geo_id}
+
+def _build_state_index(root_path):
+    """state FIPS -> serialized Feature."""
+    by_fips = {}
+    for f in _load_features(root_path, STATES_FILE):
+        props = f.get('properties', {})
+        # Robust ID check
+        fips = props.get('STATE') or props.get('id')
+        if fips: by_fips.setdefault(fips, []).append(_dumps(f))
+    return by_fips
+
+def county_index(root_path):
+    if 'counties' not in _index:
+        with _lock:
+            if 'counties' not in _index: _index['counties'] = _build_county_index(root_path)
+    return _index['counties']
+
+def state_index(root_path):
+    if 'states' not in _index:
+        with _lock:
+            if 'states' not in _index: _index['states'] = _build_state_index(root_path)
+    return _index['states']
+
+def county_feature_json(entry, extra_props=None, level=0):
+    """Serializes one indexed county feature, merging extra (DB) properties into a copy."""
+    props = dict(entry['properties'], **extra_props) if extra_props else entry['properties']
+    return '{"type":"Feature","properties":' + _dumps(props) + ',"geometry":' + simplified_geometry(entry, level) + '}'
+# [GSI_END: map_cache_index]
+
+# [GSI_BLOCK: map_cache_simplify]
+# Douglas-Peucker tolerances in degrees; level 0 is the full-resolution geometry.
+# A zoom uses the coarsest level that stays under half a screen pixel.
+SIMPLIFY_TOLERANCES = (0.0, 0.002, 0.01, 0.04)
+TILE_SIZE = 256
+
+def level_for_zoom(zoom):
+    if zoom is None: return 0
+    half_pixel = 360.0 / (TILE_SIZE * 2 ** max(0, zoom)) / 2
+    level = 0
+    for i, tol in enumerate(SIMPLIFY_TOLERANCES):
+        if tol <= half_pixel: level = i
+    return level
+
+def _rings(geometry):
+    if not geometry: return []
+    if geometry.get('type') == 'Polygon': return geometry.get('coordinates', [])
+    if geometry.get('type') == 'MultiPolygon': return [r for poly in geometry.get('coordinates', []) for r in poly]
+    return []
+
+def geometry_bbox(geometry):
+    w = s = math.inf
+    e = n = -math.inf
+    for ring in _rings(geometry):
+        for x, y, *_ in ring:
+            if x < w: w = x
+            if x > e: e = x
+            if y < s: s = y
+            if y > n: n = y
+    return (w, s, e, n) if w != math.inf else None
+
+def douglas_peucker(points, tolerance):
+    """Iterative Douglas-Peucker; keeps the first and last point."""
+    if tolerance <= 0 or len(points) < 3: return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    tol_sq = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first][0], points[first][1]
+        bx, by = points[last][0], points[last][1]
+        dx, dy = bx - ax, by - ay
+        seg_sq = dx * dx + dy * dy
+        max_sq, index = -1.0, None
+        for i in range(first + 1, last):
+            px, py = points[i][0], points[i][1]
+            if seg_sq == 0:
+                d_sq = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg_sq))
+                d_sq = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if d_sq > max_sq: max_sq, index = d_sq, i
+        if index is not None and max_sq > tol_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+def _simplify_ring(ring, tolerance):
+    # Closed rings: split at the point farthest from the start so both halves have distinct endpoints
+    if len(ring) < 5: return ring
+    ax, ay = ring[0][0], ring[0][1]
+    far = max(range(1, len(ring) - 1), key=lambda i: (ring[i][0] - ax) ** 2 + (ring[i][1] - ay) ** 2)
+    out = douglas_peucker(ring[:far + 1], tolerance)[:-1] + douglas_peucker(ring[far:], tolerance)
+    return out if len(out) >= 4 else ring
+
+def simplify_geometry(geometry, tolerance):
+    if not geometry or tolerance <= 0: return geometry
+    if geometry.get('type') == 'Polygon':
+        coords = [_simplify_ring(r, tolerance) for r in geometry.get('coordinates', [])]
+    elif geometry.get('type') == 'MultiPolygon':
+        coords = [[_simplify_ring(r, tolerance) for r in poly] for poly in geometry.get('coordinates', [])]
+    else:
+        return geometry
+    return {'type': geometry['type'], 'coordinates': coords}
+
+def simplified_geometry(entry, level):
+    """Serialized geometry for a county entry at a simplification level (computed once per level)."""
+    if not level: return entry['geometry']
+    cached = entry['simplified'].get(level)
+    if cached is None:
+        cached = _dumps(simplify_geometry(entry['coords'], SIMPLIFY_TOLERANCES[level]))
+        entry['simplified'][level] = cached
+    return cached
+
+def precompute_simplified(root_path):
+    """Warms every simplification level for all counties (optional; levels are otherwise built lazily)."""
+    for entry in county_index(root_path)['by_geo_id'].values():
+        for level in range(1, len(SIMPLIFY_TOLERANCES)): simplified_geometry(entry, level)
+
+def tile_bbox(z, x, y):
+    """(west, south, east, north) in degrees for a slippy-map tile."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+def bbox_intersects(a, b):
+    return a is not None and a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+# [GSI_END: map_cache_simplify]
+
+# [GSI_BLOCK: map_cache_responses]
+# Serialized FeatureCollections keyed by ETag. The ETag covers the cache version plus a
+# signature of everything that shapes the output (enabled set, per-county status), so a
+# stale entry can never be served; invalidate_map_cache() just frees them early.
+MAX_CACHED_RESPONSES = 32
+_responses = OrderedDict()
+_version = 0
+
+def invalidate_map_cache():
+    """Called when states/counties are toggled, added, edited or deleted."""
+    global _version
+    with _lock:
+        _version += 1
+        _responses.clear()
+    bump_status_version()
+
+def _etag(kind, signature):
+    raw = _dumps([kind, _version, signature])
+    return f"{kind}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+def cached_response(etag, build_body, max_age=0, store=True):
+    """
+    Serves a cached JSON body for etag with 304 / gzip support.
+    build_body() -> bytes is only called on a cache miss; store=False skips the
+    body cache (small per-user payloads that only benefit from the 304 path).
+    """
+    cache_control = f'private, max-age={max_age}' if max_age else 'private, no-cache'
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': cache_control})
+
+    entry = _responses.get(etag)
+    if entry is None:
+        entry = {'body': build_body(), 'gzip': None}
+        if store:
+            with _lock:
+                _responses[etag] = entry
+                while len(_responses) > MAX_CACHED_RESPONSES: _responses.popitem(last=False)
+    else:
+        with _lock:
+            if etag in _responses: _responses.move_to_end(etag)
+
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        if entry['gzip'] is None: entry['gzip'] = gzip.compress(entry['body'], compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+        return Response(entry['gzip'], mimetype='application/json', headers=headers)
+    return Response(entry['body'], mimetype='application/json', headers=headers)
+
+def geojson_response(kind, signature, build_features, max_age=0):
+    """
+    Returns a FeatureCollection response with ETag / gzip support.
+    signature: JSON-serializable description of the inputs; build_features() -> [feature json]
+    is only called on a cache miss.
+    """
+    def build():
+        return ('{"type":"FeatureCollection","features":[' + ','.join(build_features()) + ']}').encode('utf-8')
+    return cached_response(_etag(kind, signature), build, max_age)
+# [GSI_END: map_cache_responses]
+
+# [GSI_BLOCK: map_cache_status]
+# County status (occupied / mine / active / notes) changes far more often than geometry.
+# Every write that affects it bumps this counter, so status ETags are checked without a query.
+# The counter is per process: the token keeps ETags from matching across restarts or workers,
+# and the time bucket bounds staleness for changes made outside this process (other workers, SSMS).
+STATUS_MAX_STALENESS = 60
+_status_version = 0
+_process_token = uuid.uuid4().hex[:8]
+
+def bump_status_version():
+    """Called by toggle_work, toggle_split, save_notes and the county/state management writes."""
+    global _status_version
+    with _lock:
+        _status_version += 1
+    return _status_version
+
+def status_version():
+    return _status_version
+
+def status_etag(user_id):
+    bucket = int(time.time() // STATUS_MAX_STALENESS)
+    return f"status-{_process_token}-{_status_version}-{user_id}-{bucket}"
+# [GSI_END: map_cache_status]
@@ -50,6 +50,7 @@ class CountyImages(db.Model):
     county_id = db.Column(db.Integer, db.ForeignKey('indexing_counties.id'))
     image_path = db.Column(db.String(255))
 
+# The shared import table; per-county tables (county_context.generic_import_table) have the same columns
 class GenericDataImport(db.Model):
     __tablename__ = 'GenericDataImport'
     id = db.Column(db.Integer, primary_key=True)
\ No newline at end of file
@@ -0,0 +1,169 @@
+import re
+import time
+import threading
+from collections import deque
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# [GSI_BLOCK: perf_metrics_buffers]
+# Per-process timing of HTTP requests and SQL statements, kept in fixed-size ring buffers
+# (the most recent QUERY_RING_SIZE statements / REQUEST_RING_SIZE requests) and summarized on
+# demand for the SystemTools performance dashboard. Statements are attributed to the Flask
+# endpoint that ran them; background jobs copy the request context, so their statements are
+# attributed to the tool endpoint that started them.
+# Streaming responses are timed to the first byte; their SQL shows up under the endpoint.
+QUERY_RING_SIZE = 5000
+REQUEST_RING_SIZE = 2000
+STATEMENT_MAX_LEN = 400
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+_lock = threading.Lock()
+_queries = deque(maxlen=QUERY_RING_SIZE)
+_requests = deque(maxlen=REQUEST_RING_SIZE)
+_started_at = time.time()
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or request.path
+    return threading.current_thread().name
+
+def fingerprint(statement):
+    """Statement with literals replaced, so runs with different book ranges/ids group together."""
+    return _LITERALS.sub('?', statement)
+
+def reset():
+    global _started_at
+    with _lock:
+        _queries.clear()
+        _requests.clear()
+        _started_at = time.time()
+# [GSI_END: perf_metrics_buffers]
+
+# [GSI_BLOCK: perf_metrics_hooks]
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('gsi_query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('gsi_query_start')
+    if not starts: return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    try:
+        rows = cursor.rowcount
+    except Exception:
+        rows = -1
+    text_ = _WHITESPACE.sub(' ', statement).strip()[:STATEMENT_MAX_LEN]
+    entry = (time.time(), elapsed_ms, rows, _endpoint(), text_, executemany)
+    with _lock:
+        _queries.append(entry)
+    if has_request_context():
+        g.perf_sql_count = g.get('perf_sql_count', 0) + 1
+        g.perf_sql_ms = g.get('perf_sql_ms', 0.0) + elapsed_ms
+
+def _before_request():
+    g.perf_start = time.perf_counter()
+
+def _after_request(response):
+    start = g.get('perf_start')
+    # Static files and map tiles would crowd the ring buffer out
+    if start is not None and request.endpoint != 'static':
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        entry = (time.time(), elapsed_ms, request.endpoint or request.path, request.method,
+                 response.status_code, g.get('perf_sql_count', 0), g.get('perf_sql_ms', 0.0))
+        with _lock:
+            _requests.append(entry)
+    return response
+
+_installed = False
+
+def init_perf_metrics(app):
+    """Registers the request hooks on `app` and the cursor hooks on every SQLAlchemy engine."""
+    global _installed
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if not _installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _installed = True
+# [GSI_END: perf_metrics_hooks]
+
+# [GSI_BLOCK: perf_metrics_summary]
+def percentile(ordered, pct):
+    if not ordered: return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def histogram(values_ms):
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for v in values_ms:
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if v <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+    return [{'bucket': label, 'count': c} for label, c in zip(labels, counts)]
+
+def _stats(durations):
+    ordered = sorted(durations)
+    return {
+        'count': len(ordered),
+        'total_ms': round(sum(ordered), 1),
+        'avg_ms': round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50), 2),
+        'p95_ms': round(percentile(ordered, 95), 2),
+        'p99_ms': round(percentile(ordered, 99), 2),
+        'max_ms': round(ordered[-1], 2) if ordered else 0.0,
+    }
+
+def summary(top=20):
+    """Slowest endpoints and statements (by p95 / total time) with latency histograms."""
+    with _lock:
+        queries = list(_queries)
+        requests_ = list(_requests)
+        started_at = _started_at
+
+    by_endpoint = {}
+    for ts, ms, endpoint, method, status, sql_count, sql_ms in requests_:
+        e = by_endpoint.setdefault(endpoint, {'durations': [], 'sql_count': 0, 'sql_ms': 0.0, 'errors': 0, 'methods': set()})
+        e['durations'].append(ms)
+        e['sql_count'] += sql_count
+        e['sql_ms'] += sql_ms
+        e['methods'].add(method)
+        if status >= 500: e['errors'] += 1
+    endpoints = []
+    for name, e in by_endpoint.items():
+        item = dict(_stats(e['durations']), endpoint=name, methods=sorted(e['methods']), errors=e['errors'])
+        item['avg_sql_count'] = round(e['sql_count'] / item['count'], 1)
+        item['avg_sql_ms'] = round(e['sql_ms'] / item['count'], 2)
+        endpoints.append(item)
+    endpoints.sort(key=lambda x: x['p95_ms'], reverse=True)
+
+    by_statement = {}
+    for ts, ms, rows, endpoint, statement, executemany in queries:
+        q = by_statement.setdefault(fingerprint(statement), {'durations': [], 'rows': 0, 'endpoints': set(), 'sample': statement})
+        q['durations'].append(ms)
+        if rows and rows > 0: q['rows'] += rows
+        q['endpoints'].add(endpoint)
+    statements = []
+    for fp, q in by_statement.items():
+        item = dict(_stats(q['durations']), statement=q['sample'], rows=q['rows'], endpoints=sorted(q['endpoints'])[:10])
+        statements.append(item)
+    statements.sort(key=lambda x: x['total_ms'], reverse=True)
+
+    slowest = sorted(queries, key=lambda q: q[1], reverse=True)[:top]
+    return {
+        'since': started_at,
+        'window': {'requests': len(requests_), 'queries': len(queries),
+                   'request_capacity': REQUEST_RING_SIZE, 'query_capacity': QUERY_RING_SIZE},
+        'requests': dict(_stats([r[1] for r in requests_]), histogram=histogram([r[1] for r in requests_])),
+        'queries': dict(_stats([q[1] for q in queries]), histogram=histogram([q[1] for q in queries])),
+        'endpoints': endpoints[:top],
+        'statements': statements[:top],
+        'slowest_queries': [{'at': ts, 'ms': round(ms, 2), 'rows': rows, 'endpoint': endpoint, 'statement': statement}
+                            for ts, ms, rows, endpoint, statement, executemany in slowest],
+    }
+# [GSI_END: perf_metrics_summary]
@@ -0,0 +1,182 @@
+import re
+import xml.etree.ElementTree as ET
+from extensions import db
+
+# [GSI_BLOCK: query_plans_modes]
+# Plan mode for the script preview endpoints ("plan": "estimated" | "actual" in the request body).
+#   estimated: SET SHOWPLAN_XML ON. Nothing is executed; steps that use a table an earlier step
+#              creates cannot be compiled and report an error instead of a plan.
+#   actual:    SET STATISTICS IO, TIME, XML ON and the steps really run, in one transaction that
+#              is rolled back at the end. Gives logical reads, CPU/elapsed time and actual rows,
+#              but takes as long (and holds the same locks) as a real run.
+# Each step gets logical reads, scans vs seeks, estimated (and actual) rows and SQL Server's
+# missing-index suggestions; annotate_script() puts the summary on the '-- STEP:' line.
+PLAN_MODES = ('estimated', 'actual')
+SHOWPLAN_NS = {'p': 'http://schemas.microsoft.com/sqlserver/2004/07/showplan'}
+SCAN_OPS = ('Table Scan', 'Clustered Index Scan', 'Index Scan')
+SEEK_OPS = ('Index Seek', 'Clustered Index Seek')
+
+_IO_LINE = re.compile(r"Table '([^']+)'\. Scan count (\d+), logical reads (\d+), physical reads (\d+)")
+_TIME_LINE = re.compile(r"CPU time = (\d+) ms,\s+elapsed time = (\d+) ms")
+
+def plan_mode(data):
+    """The requested plan mode, or None for a plain preview. Raises ValueError for unknown modes."""
+    mode = (data or {}).get('plan')
+    if not mode: return None
+    if mode is True: return 'estimated'
+    if mode not in PLAN_MODES: raise ValueError(f"Unknown plan mode '{mode}' (use {' or '.join(PLAN_MODES)}).")
+    return mode
+# [GSI_END: query_plans_modes]
+
+# [GSI_BLOCK: query_plans_parse]
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _missing_indexes(root):
+    out = []
+    for group in root.iterfind('.//p:MissingIndexGroup', SHOWPLAN_NS):
+        for idx in group.iterfind('p:MissingIndex', SHOWPLAN_NS):
+            cols = {'EQUALITY': [], 'INEQUALITY': [], 'INCLUDE': []}
+            for cg in idx.iterfind('p:ColumnGroup', SHOWPLAN_NS):
+                cols.setdefault(cg.get('Usage'), []).extend(c.get('Name') for c in cg.iterfind('p:Column', SHOWPLAN_NS))
+            table = f"{idx.get('Schema')}.{idx.get('Table')}"
+            key = cols['EQUALITY'] + cols['INEQUALITY']
+            create = f"CREATE NONCLUSTERED INDEX ON {table} ({', '.join(key)})"
+            if cols['INCLUDE']: create += f" INCLUDE ({', '.join(cols['INCLUDE'])})"
+            out.append({'impact': _float(group.get('Impact')), 'table': idx.get('Table', '').strip('[]'),
+                        'equality': cols['EQUALITY'], 'inequality': cols['INEQUALITY'],
+                        'include': cols['INCLUDE'], 'create_sql': create})
+    return out
+
+def parse_showplan(xml_text):
+    """Statements, scan/seek operators and missing indexes of one showplan XML document."""
+    root = ET.fromstring(xml_text)
+    statements, operators = [], []
+    for stmt in root.iterfind('.//p:StmtSimple', SHOWPLAN_NS):
+        statements.append({'text': (stmt.get('StatementText') or '').strip()[:200],
+                           'type': stmt.get('StatementType'),
+                           'est_rows': _float(stmt.get('StatementEstRows')),
+                           'cost': _float(stmt.get('StatementSubTreeCost'))})
+    for op in root.iterfind('.//p:RelOp', SHOWPLAN_NS):
+        physical = op.get('PhysicalOp')
+        if physical not in SCAN_OPS and physical not in SEEK_OPS: continue
+        obj = op.find('.//p:Object', SHOWPLAN_NS)
+        actual = [_float(c.get('ActualRows')) for c in op.iterfind('p:RunTimeInformation/p:RunTimeCountersPerThread', SHOWPLAN_NS)]
+        operators.append({'op': physical,
+                          'object': '.'.join(obj.get(k, '').strip('[]') for k in ('Table', 'Index') if obj is not None and obj.get(k)),
+                          'est_rows': _float(op.get('EstimateRows')),
+                          'actual_rows': sum(a for a in actual if a is not None) if actual else None})
+    return {'statements': statements, 'operators': operators, 'missing_indexes': _missing_indexes(root)}
+
+def parse_statistics_messages(messages):
+    """Per-table reads and total CPU/elapsed ms from STATISTICS IO / TIME messages."""
+    tables, cpu_ms, elapsed_ms = {}, 0, 0
+    for _, text_ in messages:
+        for m in _IO_LINE.finditer(text_):
+            t = tables.setdefault(m.group(1), {'scan_count': 0, 'logical_reads': 0, 'physical_reads': 0})
+            t['scan_count'] += int(m.group(2))
+            t['logical_reads'] += int(m.group(3))
+            t['physical_reads'] += int(m.group(4))
+        for m in _TIME_LINE.finditer(text_):
+            cpu_ms += int(m.group(1))
+            elapsed_ms += int(m.group(2))
+    return {'tables': tables, 'cpu_ms': cpu_ms, 'elapsed_ms': elapsed_ms}
+# [GSI_END: query_plans_parse]
+
+# [GSI_BLOCK: query_plans_capture]
+def _drain(cursor):
+    """Showplan XML documents and informational messages of every result set of a batch."""
+    plans, messages = [], []
+    while True:
+        # pyodbc >= 4.0.31 exposes the messages of the current result set; older versions have none
+        current = getattr(cursor, 'messages', None)
+        messages.extend(current or [])
+        if cursor.description:
+            is_plan = 'showplan' in (cursor.description[0][0] or '').lower()
+            for row in cursor.fetchall():
+                if is_plan and row[0]: plans.append(row[0])
+        if not cursor.nextset(): break
+    trailing = getattr(cursor, 'messages', None)
+    if trailing and trailing is not current: messages.extend(trailing)
+    return plans, messages
+
+def _summarize(name, plans, messages):
+    step = {'step': name, 'statements': [], 'operators': [], 'missing_indexes': []}
+    for xml_text in plans:
+        parsed = parse_showplan(xml_text)
+        for key in ('statements', 'operators', 'missing_indexes'): step[key].extend(parsed[key])
+    stats = parse_statistics_messages(messages)
+    step.update(stats)
+    step['logical_reads'] = sum(t['logical_reads'] for t in stats['tables'].values()) if stats['tables'] else None
+    step['scans'] = sum(1 for o in step['operators'] if o['op'] in SCAN_OPS)
+    step['seeks'] = sum(1 for o in step['operators'] if o['op'] in SEEK_OPS)
+    step['est_rows'] = sum(s['est_rows'] or 0 for s in step['statements'])
+    actual = [o['actual_rows'] for o in step['operators'] if o['actual_rows'] is not None]
+    step['actual_rows'] = sum(actual) if actual else None
+    step['missing_indexes'].sort(key=lambda m: m['impact'] or 0, reverse=True)
+    return step
+
+def capture_plans(steps, mode):
+    """
+    [{step, statements, operators, missing_indexes, tables, logical_reads, scans, seeks,
+      est_rows, actual_rows, cpu_ms, elapsed_ms, error}] for (name, sql) steps.
+    Uses its own pooled connection; session settings are switched back off and any changes
+    rolled back before it is returned.
+    """
+    settings = 'SHOWPLAN_XML' if mode == 'estimated' else 'STATISTICS IO, TIME, XML'
+    results = []
+    with db.engine.connect() as conn:
+        raw = conn.connection
+        cursor = raw.cursor()
+        try:
+            # SET SHOWPLAN_XML has to be alone in its batch
+            cursor.execute(f"SET {settings} ON")
+            for name, sql in steps:
+                try:
+                    cursor.execute(sql)
+                    step = _summarize(name, *_drain(cursor))
+                except Exception as e:
+                    step = _summarize(name, [], [])
+                    step['error'] = str(e).split('(SQLExecDirectW)')[0].strip()
+                results.append(step)
+        finally:
+            try:
+                raw.rollback()
+                cursor.execute(f"SET {settings} OFF")
+                cursor.close()
+            except Exception:
+                conn.invalidate()   # never hand a showplan session back to the pool
+    return results
+# [GSI_END: query_plans_capture]
+
+# [GSI_BLOCK: query_plans_annotate]
+def step_label(step):
+    """'name | reads, scans/seeks, rows | MISSING INDEX ...' for the preview script."""
+    parts = []
+    if step.get('error'): parts.append(f"PLAN ERROR: {step['error'][:150]}")
+    else:
+        if step['logical_reads'] is not None: parts.append(f"{step['logical_reads']:,} logical reads")
+        parts.append(f"{step['scans']} scans / {step['seeks']} seeks")
+        parts.append(f"est. {int(step['est_rows']):,} rows")
+        if step['actual_rows'] is not None: parts.append(f"actual {int(step['actual_rows']):,} rows")
+        if step['elapsed_ms']: parts.append(f"{step['elapsed_ms']:,} ms")
+    for m in step['missing_indexes']:
+        parts.append(f"MISSING INDEX ({m['impact'] or 0:.0f}%): {m['create_sql']}")
+    return f"{step['step']} | " + " | ".join(parts)
+
+def annotate_script(steps, plans):
+    """The preview script with every step headed by its plan summary."""
+    return "\n".join(f"-- STEP: {step_label(p)}\n{sql}" for (name, sql), p in zip(steps, plans))
+# [GSI_END: query_plans_annotate]
+
+# [GSI_BLOCK: query_plans_preview]
+def plan_preview(steps, data):
+    """Preview response fields: the plain script, or in plan mode the annotated script and the per-step plans."""
+    mode = plan_mode(data)
+    if not mode: return {'sql': "\n".join(sql for _, sql in steps)}
+    plans = capture_plans(steps, mode)
+    return {'sql': annotate_script(steps, plans), 'plan': plans, 'plan_mode': mode}
+# [GSI_END: query_plans_preview]
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+import signal
+import threading
+
+# [GSI_BLOCK: server_control_restart]
+# One restart path for PatchManager, the first-time setup /restart and the SystemTools button.
+# The dev server and waitress run in a single process, which re-executes itself with the same
+# command line (wsgi.py makes argv[0] absolute, since it changes directory). Under gunicorn the
+# worker asks the master to reload (SIGHUP): it starts fresh workers, which import the app
+# (patched code, new db_config.json), then retires the old ones. That only works because the
+# master never imports the app (wsgi.py loads it in the workers, preload_app off); modules the
+# master itself runs (wsgi.py, server_control.py, live_events.py) change on a full restart only.
+SERVER_ENV = 'GSI_SERVER'   # set by wsgi.py: 'waitress' / 'gunicorn'
+
+def server_name():
+    """'gunicorn', 'waitress' or 'werkzeug' (app.py run directly)."""
+    if 'gunicorn' in sys.modules: return 'gunicorn'
+    return os.environ.get(SERVER_ENV) or 'werkzeug'
+
+def restart_process(delay=1, message=" >>> RESTARTING APPLICATION..."):
+    time.sleep(delay)
+    print(message)
+    if server_name() == 'gunicorn':
+        os.kill(os.getppid(), signal.SIGHUP)
+    else:
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+def schedule_restart(delay=1, message=" >>> RESTARTING APPLICATION..."):
+    """Restarts after delay seconds on a background thread, so the current response can finish."""
+    threading.Thread(target=restart_process, args=(delay, message)).start()
+# [GSI_END: server_control_restart]
@@ -0,0 +1,567 @@
+import re
+import copy
+
+# sqlglot is optional: it is only needed to run the generated scripts on a local stand-in database
+try:
+    import sqlglot
+    from sqlglot import exp
+except ImportError:
+    sqlglot = None
+    exp = None
+
+# [GSI_BLOCK: sql_dialect_registry]
+# The tools generate T-SQL: SQL Server is the production database and the downloadable scripts
+# are run as-is in SSMS. translate_script() turns a generated script into statements for a local
+# stand-in database (DuckDB, or SQLite from the standard library; see local_backend.py) so the
+# import, preparation, linkup and error scan pipelines can run offline for benchmarks and
+# regression checks.
+#   - The control flow the generators use (IF OBJECT_ID / COL_LENGTH / sys.* guards, BEGIN/END,
+#     EXEC('...'), sp_rename, GO) becomes guard items the backend evaluates against its catalog.
+#   - Statements are translated by sqlglot, plus the T-SQL behaviour sqlglot does not carry over:
+#     '+' on text, case-insensitive LIKE / REPLACE (default collation), LIKE character classes,
+#     LEN ignoring trailing spaces, UPDATE <alias> ... FROM and updatable CTEs, IDENTITY columns.
+#   - Session variables (DECLARE / SET @v / sp_executesql) only size Keli key columns for SQL
+#     Server's index limits; those blocks are skipped because local column types are unbounded.
+# Known differences: '=' comparisons stay case-sensitive, on DuckDB text that is not a number
+# casts to NULL instead of failing the statement, and ISNULL(<number>, '') gives '' rather than 0.
+# Trailing spaces count in '=', '<>', IN and GROUP BY, where SQL Server ignores them.
+# server_semantics(dialect) narrows these for results that must match the server (the local error
+# scan): text comparisons, IN lists / subqueries and GROUP BY keys are RTRIMmed on both sides,
+# ISNULL(<number>, '') gives 0, and on DuckDB a cast to an integer type accepts only what SQL Server
+# accepts (blank is 0, anything but digits fails the statement instead of giving NULL or rounding).
+# Still different: a grouped subquery's output takes the trimmed value where SQL Server returns any
+# of the padded ones, so 'A ' + 'B' against a group of 'A' / 'B' rows compares 'A B' with 'AB'.
+class Dialect:
+    name = 'tsql'
+    sqlglot_name = 'tsql'
+    text_type = 'VARCHAR(MAX)'
+    local = False
+    server_semantics = False
+
+    def quote(self, name):
+        return '[' + name.replace(']', ']]') + ']'
+
+    def drop_table_sql(self, table):
+        return f"IF OBJECT_ID(N'{self.quote(table)}', 'U') IS NOT NULL DROP TABLE {self.quote(table)}"
+
+    def rename_column_sql(self, table, old, new):
+        return f"EXEC sp_rename '{self.quote(table)}.{old}', '{new}', 'COLUMN'"
+
+    def tables_like_sql(self):
+        """Base tables whose name matches the :pattern LIKE parameter."""
+        return "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = 'dbo' AND TABLE_TYPE = 'BASE TABLE' AND TABLE_NAME LIKE :pattern"
+
+class LocalDialect(Dialect):
+    local = True
+    text_type = 'VARCHAR'
+    secondary_indexes = True
+    # Catalog lookups for the translated guards (qmark parameters, case-insensitive names)
+    table_exists_sql = "SELECT 1 FROM information_schema.tables WHERE lower(table_name) = lower(?)"
+    column_exists_sql = "SELECT 1 FROM information_schema.columns WHERE lower(table_name) = lower(?) AND lower(column_name) = lower(?)"
+    index_exists_sql = "SELECT 1 FROM duckdb_indexes() WHERE lower(index_name) = lower(?)"
+
+    def quote(self, name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def drop_table_sql(self, table):
+        return f"DROP TABLE IF EXISTS {self.quote(table)}"
+
+    def rename_column_sql(self, table, old, new):
+        return f"ALTER TABLE {self.quote(table)} RENAME COLUMN {self.quote(old)} TO {self.quote(new)}"
+
+    def tables_like_sql(self):
+        return "SELECT table_name FROM information_schema.tables WHERE table_type = 'BASE TABLE' AND table_name LIKE ?"
+
+class DuckDBDialect(LocalDialect):
+    name = 'duckdb'
+    sqlglot_name = 'duckdb'
+    # Joins are hash joins either way, and DuckDB cannot build an index in a transaction that
+    # already changed the table, so CREATE INDEX is skipped (primary keys are kept)
+    secondary_indexes = False
+
+class SQLiteDialect(LocalDialect):
+    name = 'sqlite'
+    sqlglot_name = 'sqlite'
+    text_type = 'TEXT'
+    table_exists_sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND lower(name) = lower(?)"
+    column_exists_sql = "SELECT 1 FROM sqlite_master m, pragma_table_info(m.name) c WHERE m.type = 'table' AND lower(m.name) = lower(?) AND lower(c.name) = lower(?)"
+    index_exists_sql = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND lower(name) = lower(?)"
+
+    def tables_like_sql(self):
+        return "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?"
+
+DIALECTS = {d.name: d for d in (Dialect(), DuckDBDialect(), SQLiteDialect())}
+
+def get_dialect(name):
+    if name not in DIALECTS: raise ValueError(f"Unknown SQL dialect '{name}' (use {', '.join(DIALECTS)}).")
+    return DIALECTS[name]
+
+def server_semantics(dialect):
+    """A copy of a local dialect whose translations keep SQL Server's comparison and cast rules (slower)."""
+    if isinstance(dialect, str): dialect = get_dialect(dialect)
+    strict = copy.copy(dialect)
+    strict.server_semantics = True
+    return strict
+# [GSI_END: sql_dialect_registry]
+
+# [GSI_BLOCK: sql_dialect_split]
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>N?'(?:[^']|'')*')
+  | (?P<ident>\[(?:[^\]]|\]\])*\]|"(?:[^"]|"")*")
+  | (?P<word>[@#]*[A-Za-z_][\w@$#]*)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<op>.)
+""", re.S | re.X)
+
+# Words that start a new statement when met outside parentheses (T-SQL does not need ';')
+STATEMENT_WORDS = {'CREATE', 'DROP', 'ALTER', 'INSERT', 'UPDATE', 'DELETE', 'TRUNCATE', 'MERGE',
+                   'IF', 'BEGIN', 'END', 'EXEC', 'EXECUTE', 'DECLARE', 'SET', 'SELECT', 'WITH', 'GO', 'PRINT'}
+
+def _tokens(sql):
+    out = []
+    for m in _TOKEN.finditer(sql):
+        kind = m.lastgroup
+        if kind in ('ws', 'comment'): continue
+        value = m.group()
+        out.append((kind, value.upper() if kind == 'word' else value, m.start(), m.end()))
+    return out
+
+def _continues(first, word, seen, previous):
+    """True if `word` (met outside parentheses) still belongs to a statement that began with `first`."""
+    if word == 'IF': return previous in ('TABLE', 'INDEX', 'VIEW', 'SEQUENCE', 'SCHEMA')   # DROP TABLE IF EXISTS
+    if word == 'SELECT': return first in ('INSERT', 'SELECT', 'WITH', 'CREATE')
+    if word == 'SET': return (first == 'UPDATE' or 'UPDATE' in seen) and 'SET' not in seen
+    if word in ('UPDATE', 'INSERT', 'DELETE'): return first == 'WITH' and not seen & {'UPDATE', 'INSERT', 'DELETE'}
+    # A CTE has to follow a ';' in T-SQL, so WITH inside a statement is a table or index option
+    return word == 'WITH'
+
+def _statement_end(tokens, i):
+    """Index just past the statement starting at tokens[i] (the ';' is consumed)."""
+    first = tokens[i][1]
+    depth, case_depth, seen = 0, 0, set()
+    j = i + 1
+    while j < len(tokens):
+        kind, value, _, _ = tokens[j]
+        if kind == 'op':
+            if value == '(': depth += 1
+            elif value == ')': depth -= 1
+            elif value == ';' and depth == 0: return j + 1
+        elif kind == 'word' and depth == 0:
+            if value == 'CASE': case_depth += 1
+            elif value == 'END' and case_depth: case_depth -= 1
+            elif value in STATEMENT_WORDS and not _continues(first, value, seen, tokens[j - 1][1]):
+                return j
+            seen.add(value)
+        j += 1
+    return j
+
+def _condition_end(tokens, i):
+    """Index of the first statement word after an IF condition starting at tokens[i]."""
+    depth = 0
+    j = i
+    while j < len(tokens):
+        kind, value, _, _ = tokens[j]
+        if kind == 'op' and value == '(': depth += 1
+        elif kind == 'op' and value == ')': depth -= 1
+        elif kind == 'word' and depth == 0 and value in STATEMENT_WORDS: return j
+        j += 1
+    return j
+
+def split_script(sql):
+    """
+    Nested T-SQL structure of a script: a list of ('sql', text) and ('if', condition_text, [items]).
+    BEGIN ... END blocks are flattened into their parent; GO separators are dropped.
+    """
+    tokens = _tokens(sql)
+
+    def statement(i):
+        j = _statement_end(tokens, i)
+        last = j - 2 if tokens[j - 1][1] == ';' else j - 1
+        return ('sql', sql[tokens[i][2]:tokens[last][3]]), j
+
+    def if_block(i):
+        j = _condition_end(tokens, i + 1)
+        condition = sql[tokens[i + 1][2]:tokens[j - 1][3]] if j > i + 1 else ''
+        if j < len(tokens) and tokens[j][1] == 'BEGIN':
+            body, k = block(j + 1, True)
+        elif j < len(tokens) and tokens[j][1] == 'IF':
+            item, k = if_block(j)
+            body = [item]
+        elif j < len(tokens):
+            item, k = statement(j)
+            body = [item]
+        else:
+            body, k = [], j
+        return ('if', condition, body), k
+
+    def block(i, until_end):
+        items = []
+        while i < len(tokens):
+            kind, value = tokens[i][:2]
+            if (kind == 'op' and value == ';') or (kind == 'word' and value == 'GO'):
+                i += 1
+            elif kind == 'word' and value == 'END' and until_end:
+                return items, i + 1
+            elif kind == 'word' and value == 'BEGIN' and not (i + 1 < len(tokens) and tokens[i + 1][1] in ('TRAN', 'TRANSACTION')):
+                inner, i = block(i + 1, True)
+                items.extend(inner)
+            elif kind == 'word' and value == 'IF':
+                item, i = if_block(i)
+                items.append(item)
+            else:
+                item, i = statement(i)
+                items.append(item)
+        return items, i
+
+    return block(0, False)[0]
+# [GSI_END: sql_dialect_split]
+
+# [GSI_BLOCK: sql_dialect_guards]
+_STRING_OR_BRACKET = re.compile(r"'(?:[^']|'')*'|\[[^\]]*\]")
+_GUARDS = [
+    # (NOT) EXISTS (SELECT * FROM sysobjects WHERE name = 'x')
+    (re.compile(r"^(NOT\s+)?EXISTS\s*\(\s*SELECT\s.+?\sFROM\s+(?:dbo\.)?(?:sysobjects|sys\.objects|sys\.tables)\s+WHERE\s+name\s*=\s*N?'([^']*)'.*\)$", re.I | re.S),
+     lambda m: ('table', (m.group(2),), not m.group(1))),
+    # OBJECT_ID(N'[x]', 'U') IS (NOT) NULL
+    (re.compile(r"^OBJECT_ID\s*\(\s*N?'([^']*)'\s*(?:,\s*N?'U'\s*)?\)\s+IS\s+(NOT\s+)?NULL$", re.I),
+     lambda m: ('table', (m.group(1),), bool(m.group(2)))),
+    # (NOT) EXISTS (SELECT 1 FROM sys.columns WHERE Name = N'c' AND Object_ID = Object_ID(N'[t]'))
+    (re.compile(r"^(NOT\s+)?EXISTS\s*\(\s*SELECT\s.+?\sFROM\s+sys\.columns\s+WHERE\s+Name\s*=\s*N?'([^']*)'\s+AND\s+Object_ID\s*=\s*Object_ID\s*\(\s*N?'([^']*)'\s*\)\s*\)$", re.I | re.S),
+     lambda m: ('column', (m.group(3), m.group(2)), not m.group(1))),
+    # (NOT) EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix' ...)
+    (re.compile(r"^(NOT\s+)?EXISTS\s*\(\s*SELECT\s.+?\sFROM\s+sys\.indexes\s+WHERE\s+name\s*=\s*N?'([^']*)'.*\)$", re.I | re.S),
+     lambda m: ('index', (m.group(2),), not m.group(1))),
+    # COL_LENGTH('t', 'c') IS (NOT) NULL
+    (re.compile(r"^COL_LENGTH\s*\(\s*N?'([^']*)'\s*,\s*N?'([^']*)'\s*\)\s+IS\s+(NOT\s+)?NULL$", re.I),
+     lambda m: ('column', (m.group(1), m.group(2)), bool(m.group(3)))),
+    # COL_LENGTH('t', 'c') BETWEEN 1 AND n: the column exists and fits an index key (local types are unbounded)
+    (re.compile(r"^COL_LENGTH\s*\(\s*N?'([^']*)'\s*,\s*N?'([^']*)'\s*\)\s+BETWEEN\s+\d+\s+AND\s+\d+$", re.I),
+     lambda m: ('column', (m.group(1), m.group(2)), True)),
+]
+
+def object_name(name):
+    """'[dbo].[x]', 'dbo.x' or '[x]' -> 'x' (local databases have a single schema)."""
+    parts = re.findall(r'\[(?:[^\]]|\]\])*\]|"[^"]*"|[^.]+', name.strip())
+    last = parts[-1] if parts else name
+    return last[1:-1].replace(']]', ']') if last[:1] in '["' else last
+
+def _split_and(condition):
+    tokens = _tokens(condition)
+    parts, depth, start = [], 0, 0
+    for kind, value, s, e in tokens:
+        if kind == 'op' and value == '(': depth += 1
+        elif kind == 'op' and value == ')': depth -= 1
+        elif kind == 'word' and value == 'AND' and depth == 0 and not _between_pending(condition[start:s]):
+            parts.append(condition[start:s].strip())
+            start = e
+    parts.append(condition[start:].strip())
+    return parts
+
+def _between_pending(text_):
+    """True while the AND belongs to a BETWEEN ... AND ... still open in text_."""
+    words = [t[1] for t in _tokens(text_) if t[0] == 'word']
+    return words.count('BETWEEN') > words.count('AND')
+
+def parse_condition(condition):
+    """
+    [(kind, args, expected)] for an IF condition (kind 'table', 'column' or 'index'; all must hold),
+    or None when the condition cannot be evaluated locally (session variables, other functions).
+    """
+    if '@' in _STRING_OR_BRACKET.sub('', condition): return None
+    guards = []
+    for part in _split_and(condition):
+        for pattern, build in _GUARDS:
+            m = pattern.match(part)
+            if m:
+                kind, args, expected = build(m)
+                guards.append((kind, tuple(object_name(a) for a in args), expected))
+                break
+        else:
+            return None
+    return guards
+# [GSI_END: sql_dialect_guards]
+
+# [GSI_BLOCK: sql_dialect_rewrite]
+# Integer columns of the generated tables; every other column is text, so '+' with a column or a
+# string literal on either side is string concatenation in T-SQL.
+NUMERIC_COLUMNS = {'id', 'instrumentid', 'snapshot_id', 'max_id', 'row_id', 'addid', 'instid', 'seriesid', 'townshiprangeid'}
+KEY_ALIAS = '__gsi_key'
+SOURCE_ALIAS = '__gsi_u'
+
+def _is_text(node):
+    if isinstance(node, exp.Literal): return node.is_string
+    if isinstance(node, (exp.National, exp.DPipe, exp.Concat, exp.Substring, exp.Replace, exp.Reverse,
+                         exp.Left, exp.Right, exp.Upper, exp.Lower, exp.Trim)): return True
+    if isinstance(node, exp.Cast): return node.to.is_type(*exp.DataType.TEXT_TYPES)
+    if isinstance(node, exp.Column): return node.name.lower() not in NUMERIC_COLUMNS
+    if isinstance(node, (exp.Paren, exp.Coalesce)): return _is_text(node.this)
+    if isinstance(node, exp.Add): return _is_text(node.this) or _is_text(node.expression)
+    if isinstance(node, exp.Anonymous): return node.name.upper() in ('RTRIM', 'LTRIM', 'REGEXP_REPLACE', 'GSI_REPLACE_CI', 'GSI_LEFT', 'GSI_RIGHT')
+    return False
+
+def _rtrim(node):
+    """A text operand with trailing spaces removed, as SQL Server compares it."""
+    if isinstance(node, exp.Literal) and node.is_string: return exp.Literal.string(node.this.rstrip(' '))
+    if not _is_text(node) or (isinstance(node, exp.Anonymous) and node.name.upper() == 'RTRIM'): return node
+    return exp.Anonymous(this='RTRIM', expressions=[node])
+
+def _server_int(value, to):
+    """DuckDB expression converting text to an integer type like SQL Server: blank is 0, non-digits fail."""
+    text_ = value.sql('duckdb')
+    return sqlglot.parse_one(
+        f"CASE WHEN TRIM({text_}) = '' THEN 0 WHEN regexp_full_match(TRIM({text_}), '[+-]?[0-9]+') "
+        f"THEN CAST(TRIM({text_}) AS {to.sql('duckdb')}) "
+        f"ELSE error('Conversion failed when converting the varchar value ''' || {text_} || ''' to data type int.') END",
+        read='duckdb')
+
+def _server_comparisons(node):
+    """SQL Server ignores trailing spaces in comparisons, IN and GROUP BY (server_semantics only)."""
+    if isinstance(node, (exp.EQ, exp.NEQ, exp.GT, exp.GTE, exp.LT, exp.LTE)):
+        # SET col = value in an UPDATE is an EQ too, and must stay an assignment
+        if isinstance(node.parent, exp.Update) or not (_is_text(node.this) or _is_text(node.expression)): return node
+        return node.__class__(this=_rtrim(node.this), expression=_rtrim(node.expression))
+    if isinstance(node, exp.In) and _is_text(node.this):
+        query = node.args.get('query')
+        select = query.this if isinstance(query, exp.Subquery) else query
+        if isinstance(select, exp.Select) and len(select.expressions) == 1:
+            projection = select.expressions[0]
+            target = projection.this if isinstance(projection, exp.Alias) else projection
+            target.replace(_rtrim(target.copy()))
+        node.set('expressions', [_rtrim(e) for e in node.expressions])
+        node.set('this', _rtrim(node.this))
+    elif isinstance(node, exp.Select) and node.args.get('group'):
+        keys = set()
+        for key in list(node.args['group'].expressions):
+            if not _is_text(key): continue
+            if isinstance(key, exp.Column): keys.add(key.name.lower())
+            key.replace(_rtrim(key.copy()))
+        # Grouped columns outside aggregates must match the (trimmed) GROUP BY expressions
+        for projection in node.expressions:
+            for col in list(projection.find_all(exp.Column)):
+                if col.name.lower() in keys and not col.find_ancestor(exp.AggFunc) and not (isinstance(col.parent, exp.Anonymous) and col.parent.name.upper() == 'RTRIM'):
+                    col.replace(_rtrim(col.copy()))
+    return node
+
+def like_to_regex(pattern):
+    """T-SQL LIKE pattern (with [...] character classes) as an anchored, case-insensitive regex."""
+    out, i = ['(?is)^'], 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '%': out.append('.*')
+        elif ch == '_': out.append('.')
+        elif ch == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                out.append(re.escape(ch))
+            else:
+                body = pattern[i + 1:end]
+                negate = body.startswith('^')
+                if negate: body = body[1:]
+                # '[_]' / '[%]' are literal escapes; other characters keep their class meaning
+                body = ''.join('\\' + c if c in '\\]^' else c for c in body)
+                out.append('[' + ('^' if negate else '') + body + ']')
+                i = end
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    out.append('$')
+    return ''.join(out)
+
+def _rewrite(node, dialect):
+    """T-SQL expression semantics for the target dialect (applied to every node of a statement)."""
+    if dialect.server_semantics and isinstance(node, (exp.EQ, exp.NEQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.In, exp.Select)):
+        return _server_comparisons(node)
+    if isinstance(node, exp.Table) and (node.text('db') or '').lower() == 'dbo':
+        node.set('db', None)
+    elif isinstance(node, exp.National):
+        return exp.Literal.string(node.this)
+    elif isinstance(node, exp.Add) and (_is_text(node.this) or _is_text(node.expression)):
+        return exp.DPipe(this=node.this, expression=node.expression)
+    elif isinstance(node, exp.Length) and not (isinstance(node.this, exp.Anonymous) and node.this.name.upper() == 'RTRIM'):
+        # LEN ignores trailing spaces
+        return exp.Length(this=exp.Anonymous(this='RTRIM', expressions=[node.this]))
+    elif isinstance(node, exp.Like) and isinstance(node.expression, exp.Literal):
+        pattern = node.expression.this
+        if '[' in pattern:
+            like = exp.RegexpLike(this=node.this, expression=exp.Literal.string(like_to_regex(pattern)))
+        elif dialect.name == 'duckdb':
+            like = exp.ILike(this=node.this, expression=node.expression)
+        else:
+            return node
+        # NOT LIKE is a Like with negate set; the rebuilt node has to keep it
+        return exp.Not(this=like) if node.args.get('negate') else like
+    elif isinstance(node, exp.Replace) and isinstance(node.expression, exp.Literal) and re.search('[A-Za-z]', node.expression.this or ''):
+        # REPLACE follows the (case-insensitive) collation
+        search, replacement = node.expression.this, node.args.get('replacement')
+        if dialect.name == 'duckdb' and isinstance(replacement, exp.Literal):
+            return exp.Anonymous(this='REGEXP_REPLACE', expressions=[
+                node.this, exp.Literal.string('(?i)' + re.escape(search)),
+                exp.Literal.string(replacement.this.replace('\\', '\\\\')), exp.Literal.string('g')])
+        return exp.Anonymous(this='GSI_REPLACE_CI', expressions=[node.this, node.expression, replacement])
+    elif isinstance(node, (exp.Left, exp.Right)) and dialect.name == 'sqlite':
+        # LEFT / RIGHT are join keywords to SQLite's parser; local_backend registers these
+        return exp.Anonymous(this='GSI_' + node.key.upper(), expressions=[node.this, node.expression])
+    elif isinstance(node, exp.Ordered) and not isinstance(node.parent, exp.Order):
+        # Key columns of PRIMARY KEY / INDEX definitions take no NULLS FIRST
+        return node.this
+    elif isinstance(node, exp.DataType):
+        if node.is_type(*exp.DataType.TEXT_TYPES):
+            return exp.DataType.build(dialect.text_type)
+        if node.is_type('datetime', 'datetime2', 'smalldatetime'):
+            return exp.DataType.build('TIMESTAMP')
+    elif isinstance(node, exp.Coalesce) and dialect.server_semantics and not _is_text(node.this) and any(_is_text(e) for e in node.expressions):
+        # ISNULL(<number>, '') converts the text to the number's type: '' is 0
+        args = [exp.Literal.number(int(a.this.strip() or 0)) if isinstance(a, exp.Literal) and a.is_string and re.fullmatch(r"\s*([+-]?\d+)?\s*", a.this)
+                else a for a in node.expressions]
+        return exp.Coalesce(this=node.this, expressions=args)
+    elif isinstance(node, exp.Coalesce) and dialect.name == 'duckdb' and any(_is_text(e) for e in [node.this] + node.expressions):
+        # ISNULL(<int>, '') converts '' on SQL Server; DuckDB needs text on both sides
+        args = [a if _is_text(a) else exp.cast(a, dialect.text_type) for a in [node.this] + node.expressions]
+        return exp.Coalesce(this=args[0], expressions=args[1:])
+    elif isinstance(node, exp.Cast) and dialect.name == 'duckdb' and node.to.is_type(*exp.DataType.INTEGER_TYPES) and _is_text(node.this):
+        if dialect.server_semantics: return _server_int(node.this, node.to)
+        return exp.TryCast(this=node.this, to=node.to)
+    return node
+
+def _transform(tree, dialect):
+    """Applies _rewrite bottom-up, so rewritten nodes keep rewritten children."""
+    for node in reversed(list(tree.walk())):
+        new = _rewrite(node, dialect)
+        if new is not node:
+            if node is tree: tree = new
+            else: node.replace(new)
+    return tree
+
+def _from_sources(from_):
+    table = from_.this
+    return [table] + [j.this for j in (table.args.get('joins') or [])]
+
+def _assignments(update, dialect):
+    """(column, value sql) for the SET list; the column loses its alias qualifier."""
+    return [(eq.this.name, eq.expression.sql(dialect.sqlglot_name)) for eq in update.expressions]
+
+def _update_from_source(table_sql, assignments, source_sql, dialect):
+    sets = ", ".join(f"{dialect.quote(col)} = {SOURCE_ALIAS}.v{i}" for i, (col, _) in enumerate(assignments))
+    return (f"UPDATE {table_sql} SET {sets} FROM ({source_sql}) AS {SOURCE_ALIAS} "
+            f"WHERE {table_sql}.rowid = {SOURCE_ALIAS}.{KEY_ALIAS}")
+
+def rewrite_update(update, dialect):
+    """
+    UPDATE <alias> SET ... FROM <tables/joins> WHERE ... and UPDATE <cte> SET ... as an
+    UPDATE of the base table joined to a derived table of (rowid, new values); the local
+    databases only accept the base table as the target. Returns None for plain updates.
+    """
+    target = update.this.name.lower()
+    assignments = _assignments(update, dialect)
+    values = ", ".join(f"{value} AS v{i}" for i, (_, value) in enumerate(assignments))
+    where = update.args.get('where')
+    where_sql = (" " + where.sql(dialect.sqlglot_name)) if where else ""
+
+    from_ = update.args.get('from_') or update.args.get('from')
+    if from_:
+        source = next((t for t in _from_sources(from_) if isinstance(t, exp.Table) and t.alias_or_name.lower() == target), None)
+        if source is None: return None
+        base = exp.Table(this=source.this.copy()).sql(dialect.sqlglot_name)
+        key = f"{dialect.quote(source.alias_or_name)}.rowid"
+        source_sql = f"SELECT {key} AS {KEY_ALIAS}, {values} {from_.sql(dialect.sqlglot_name)}{where_sql}"
+        return _update_from_source(base, assignments, source_sql, dialect)
+
+    with_ = update.args.get('with_') or update.args.get('with')
+    cte = next((c for c in (with_.expressions if with_ else []) if c.alias.lower() == target), None)
+    if cte is None: return None
+    body = cte.this.copy()
+    body_from = body.args.get('from_') or body.args.get('from')
+    if not body_from or not isinstance(body_from.this, exp.Table) or body_from.this.args.get('joins'):
+        raise ValueError(f"Updatable CTE '{cte.alias}' must select from a single table.")
+    base_table = body_from.this
+    body.select(exp.alias_(exp.column('rowid', table=base_table.alias_or_name), KEY_ALIAS), copy=False)
+    base = exp.Table(this=base_table.this.copy()).sql(dialect.sqlglot_name)
+    source_sql = (f"WITH {dialect.quote(cte.alias)} AS ({body.sql(dialect.sqlglot_name)}) "
+                  f"SELECT {KEY_ALIAS}, {values} FROM {dialect.quote(cte.alias)}{where_sql}")
+    return _update_from_source(base, assignments, source_sql, dialect)
+
+def _identity_columns(create, dialect):
+    """DuckDB has no IDENTITY: each identity column draws from its own sequence instead."""
+    before = []
+    schema = create.this
+    if dialect.name != 'duckdb' or not isinstance(schema, exp.Schema): return before
+    table = schema.this.name
+    for col in schema.expressions:
+        if not isinstance(col, exp.ColumnDef): continue
+        constraints = col.args.get('constraints') or []
+        identity = [c for c in constraints if isinstance(c.args.get('kind'), exp.GeneratedAsIdentityColumnConstraint)]
+        if not identity: continue
+        seq = f"{table}_{col.name}_seq"
+        start = identity[0].args['kind'].args.get('start')
+        before.append(f"CREATE OR REPLACE SEQUENCE {dialect.quote(seq)} START {start.this if start else 1}")
+        col.set('constraints', [c for c in constraints if c not in identity] + [
+            exp.ColumnConstraint(kind=exp.DefaultColumnConstraint(this=exp.Anonymous(this='nextval', expressions=[exp.Literal.string(seq)])))])
+    return before
+# [GSI_END: sql_dialect_rewrite]
+
+# [GSI_BLOCK: sql_dialect_translate]
+_EXEC_STRING = re.compile(r"^EXEC(?:UTE)?\s*\(\s*N?'((?:[^']|'')*)'\s*\)$", re.I | re.S)
+_SP_RENAME = re.compile(r"^EXEC(?:UTE)?\s+sp_rename\s+N?'((?:[^']|'')*)'\s*,\s*N?'((?:[^']|'')*)'(?:\s*,\s*N?'COLUMN')?$", re.I | re.S)
+_COMPUTED_COLUMN = re.compile(r"^ALTER\s+TABLE\s+(.+?)\s+ADD\s+(\[[^\]]+\]|\w+)\s+AS\s+(.+?)\s+PERSISTED$", re.I | re.S)
+_INDEX_INCLUDE = re.compile(r"\s+INCLUDE\s*\([^)]*\)", re.I)
+
+def _statement_items(text_, dialect):
+    """Translated items for one T-SQL statement."""
+    head = text_.lstrip().split(None, 1)[0].upper() if text_.strip() else ''
+    m = _EXEC_STRING.match(text_)
+    if m: return translate_script(m.group(1).replace("''", "'"), dialect)
+    m = _SP_RENAME.match(text_)
+    if m:
+        table, _, column = m.group(1).replace("''", "'").rpartition('.')
+        return [('sql', dialect.rename_column_sql(object_name(table), object_name(column), object_name(m.group(2))))]
+    if head in ('EXEC', 'EXECUTE', 'DECLARE', 'PRINT') or (head in ('SET', 'SELECT') and re.match(r"^\w+\s+@", text_.strip())):
+        return [('skip', 'session variables / procedures have no local equivalent', text_)]
+    if head == 'SET' or head in ('COMMIT', 'ROLLBACK') or re.match(r"^BEGIN\s+TRAN", text_.strip(), re.I):
+        return [('skip', 'session options and transactions are handled by the local backend', text_)]
+    if re.match(r"^ALTER\s+TABLE\s+.+?\s+ALTER\s+COLUMN\s", text_.strip(), re.I | re.S):
+        return [('skip', 'column types are not enforced locally', text_)]
+    m = _COMPUTED_COLUMN.match(text_.strip())
+    if m:
+        # Persisted computed column -> plain column filled once (rows inserted later are not recomputed)
+        table, column, expression = m.groups()
+        return (_statement_items(f"ALTER TABLE {table} ADD {column} VARCHAR(MAX)", dialect)
+                + _statement_items(f"UPDATE {table} SET {column} = {expression}", dialect))
+    if head == 'CREATE': text_ = _INDEX_INCLUDE.sub('', text_)
+
+    try:
+        tree = sqlglot.parse_one(text_, read='tsql')
+    except Exception as e:
+        raise ValueError(f"Cannot translate statement: {text_.strip()[:200]} ({e})")
+    tree = _transform(tree, dialect)
+    if isinstance(tree, exp.Update):
+        rewritten = rewrite_update(tree, dialect)
+        if rewritten: return [('sql', rewritten)]
+    if isinstance(tree, exp.Create) and tree.kind == 'INDEX' and not dialect.secondary_indexes:
+        return [('skip', f'{dialect.name} does not use secondary indexes for these joins', text_)]
+    before = _identity_columns(tree, dialect) if isinstance(tree, exp.Create) else []
+    return [('sql', s) for s in before] + [('sql', tree.sql(dialect.sqlglot_name))]
+
+def translate_script(sql, dialect):
+    """
+    A generated T-SQL script as items for a local database:
+      ('sql', statement)             run as-is
+      ('if', guards, items)          run items when every (kind, args, expected) guard holds;
+                                     guards is None when the condition cannot be evaluated locally
+      ('skip', reason, statement)    no local equivalent (reported, not run)
+    """
+    if isinstance(dialect, str): dialect = get_dialect(dialect)
+    if not dialect.local: return [('sql', sql)]
+    if sqlglot is None: raise RuntimeError("sqlglot is not installed (pip install sqlglot); it is needed to run T-SQL locally.")
+    return _translate_items(split_script(sql), dialect)
+
+def _translate_items(split_items, dialect):
+    out = []
+    for item in split_items:
+        if item[0] == 'if':
+            out.append(('if', parse_condition(item[1]), _translate_items(item[2], dialect)))
+        else:
+            out.extend(_statement_items(item[1], dialect))
+    return out
+# [GSI_END: sql_dialect_translate]
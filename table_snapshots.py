@@ -0,0 +1,119 @@
+import re
+from sqlalchemy import text
+
+# [GSI_BLOCK: table_snapshots_schema]
+# Undo-log snapshots of a GenericDataImport table. Instead of copying the whole table before a
+# script runs, a snapshot records the table's highest id, and each step saves the old values of
+# only the columns it changes, only for the rows it will change:
+#
+#   [<table>_Snapshots]  snapshot_id, label, created_at, created_by, max_id
+#   [<table>_UndoLog]    snapshot_id, col, row_id, val   (clustered on snapshot_id, col, row_id)
+#
+# Restoring snapshot N replays the undo logs of N and every later snapshot (newest first), deletes
+# the rows added since N and drops those snapshots. Edits made by other tools between runs are
+# not logged and are kept unless a later run touched the same cells. Everything is plain T-SQL
+# with no variables, so the same statements work in the downloadable scripts (separate GO batches).
+SNAPSHOT_RETENTION = 5
+
+def snapshot_tables(table):
+    return {'snapshots': f"{table}_Snapshots", 'undo': f"{table}_UndoLog"}
+
+def _literal(value):
+    return "N'" + str(value).replace("'", "''") + "'"
+
+def _quote(name):
+    return '[' + name.replace(']', ']]') + ']'
+
+def begin_snapshot_sql(table, label, created_by=''):
+    """Creates the snapshot tables if needed, opens a new snapshot and prunes the oldest ones."""
+    t = snapshot_tables(table)
+    # Plain characters only: the script also runs through text(), where ':name' is a bind parameter
+    created_by = re.sub(r"[^\w .@-]", '', created_by or '')
+    return f"""
+    IF OBJECT_ID(N'{_quote(t['snapshots'])}', 'U') IS NULL
+        CREATE TABLE {_quote(t['snapshots'])} (
+            snapshot_id INT NOT NULL IDENTITY(1,1) PRIMARY KEY,
+            label NVARCHAR(200), created_at DATETIME NOT NULL DEFAULT GETDATE(),
+            created_by NVARCHAR(150), max_id INT NOT NULL
+        );
+    IF OBJECT_ID(N'{_quote(t['undo'])}', 'U') IS NULL
+        CREATE TABLE {_quote(t['undo'])} (
+            snapshot_id INT NOT NULL, col NVARCHAR(128) NOT NULL, row_id INT NOT NULL, val NVARCHAR(MAX),
+            CONSTRAINT {_quote('PK_' + t['undo'])} PRIMARY KEY (snapshot_id, col, row_id)
+        );
+    INSERT INTO {_quote(t['snapshots'])} (label, created_by, max_id)
+    SELECT {_literal(label)}, {_literal(created_by)}, ISNULL(MAX(id), 0) FROM {_quote(table)};
+    DELETE FROM {_quote(t['undo'])} WHERE snapshot_id <= (SELECT MAX(snapshot_id) FROM {_quote(t['snapshots'])}) - {SNAPSHOT_RETENTION};
+    DELETE FROM {_quote(t['snapshots'])} WHERE snapshot_id <= (SELECT MAX(snapshot_id) FROM {_quote(t['snapshots'])}) - {SNAPSHOT_RETENTION};
+    """
+
+def capture_sql(table, changes):
+    """
+    Saves the current values of {column: predicate} into the newest snapshot, for the rows the
+    predicate selects (the rows the following statement will change). A cell already saved by an
+    earlier step of the same run keeps its first (original) value.
+    """
+    t = snapshot_tables(table)
+    parts = []
+    for col, predicate in changes.items():
+        parts.append(f"""
+    INSERT INTO {_quote(t['undo'])} (snapshot_id, col, row_id, val)
+    SELECT s.snapshot_id, {_literal(col)}, g.id, CAST(g.{_quote(col)} AS NVARCHAR(MAX))
+    FROM {_quote(table)} g CROSS JOIN (SELECT MAX(snapshot_id) AS snapshot_id FROM {_quote(t['snapshots'])}) s
+    WHERE ({predicate})
+      AND NOT EXISTS (SELECT 1 FROM {_quote(t['undo'])} u WHERE u.snapshot_id = s.snapshot_id AND u.col = {_literal(col)} AND u.row_id = g.id);""")
+    return "".join(parts) + "\n"
+
+def drop_snapshots_sql(table):
+    """For when the data table itself is dropped and recreated (the logs no longer apply)."""
+    t = snapshot_tables(table)
+    return (f"IF OBJECT_ID(N'{_quote(t['undo'])}', 'U') IS NOT NULL DROP TABLE {_quote(t['undo'])}; "
+            f"IF OBJECT_ID(N'{_quote(t['snapshots'])}', 'U') IS NOT NULL DROP TABLE {_quote(t['snapshots'])};")
+# [GSI_END: table_snapshots_schema]
+
+# [GSI_BLOCK: table_snapshots_restore]
+def _has_snapshots(conn, table):
+    return conn.execute(text("SELECT OBJECT_ID(:t, 'U')"), {'t': _quote(snapshot_tables(table)['snapshots'])}).scalar() is not None
+
+def list_snapshots(conn, table):
+    """Snapshots of a table, newest first, with the number of saved cells per column."""
+    if not _has_snapshots(conn, table): return []
+    t = snapshot_tables(table)
+    rows = conn.execute(text(f"""
+        SELECT snapshot_id, label, created_at, created_by, max_id FROM {_quote(t['snapshots'])} ORDER BY snapshot_id DESC
+    """)).mappings().fetchall()
+    counts = {}
+    for r in conn.execute(text(f"SELECT snapshot_id, col, COUNT(*) AS cells FROM {_quote(t['undo'])} GROUP BY snapshot_id, col")):
+        counts.setdefault(r.snapshot_id, {})[r.col] = r.cells
+    out = []
+    for r in rows:
+        item = dict(r)
+        item['created_at'] = item['created_at'].isoformat() if item['created_at'] else None
+        item['columns'] = counts.get(r['snapshot_id'], {})
+        item['cells'] = sum(item['columns'].values())
+        out.append(item)
+    return out
+
+def restore_steps(conn, table, snapshot_id):
+    """
+    (name, sql) steps that return `table` to its state when `snapshot_id` was taken.
+    Returns None if the snapshot does not exist.
+    """
+    snapshots = [s for s in list_snapshots(conn, table) if s['snapshot_id'] >= snapshot_id]
+    if not snapshots or snapshots[-1]['snapshot_id'] != snapshot_id: return None
+    t = snapshot_tables(table)
+    steps = []
+    for snap in snapshots:
+        for col in sorted(snap['columns']):
+            steps.append((f"Snapshot {snap['snapshot_id']}: restoring {col}", f"""
+            UPDATE g SET g.{_quote(col)} = u.val
+            FROM {_quote(table)} g INNER JOIN {_quote(t['undo'])} u ON u.row_id = g.id
+            WHERE u.snapshot_id = {snap['snapshot_id']} AND u.col = {_literal(col)}
+            """))
+    steps.append(('Removing rows added since the snapshot', f"DELETE FROM {_quote(table)} WHERE id > {snapshots[-1]['max_id']}"))
+    steps.append(('Dropping restored snapshots', f"""
+        DELETE FROM {_quote(t['undo'])} WHERE snapshot_id >= {snapshot_id};
+        DELETE FROM {_quote(t['snapshots'])} WHERE snapshot_id >= {snapshot_id};
+    """))
+    return steps
+# [GSI_END: table_snapshots_restore]
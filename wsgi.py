@@ -0,0 +1,113 @@
+"""
+Production entry point.
+
+    python wsgi.py                                   # waitress, 48 threads, port 5000
+    python wsgi.py --server gunicorn --threads 64    # gunicorn gthread workers (Linux)
+    gunicorn -k gthread --threads 48 wsgi:application
+
+app.py run directly is the single-process debug server with the reloader; use it for
+development only. Streaming routes (NDJSON tools, /api/events/stream) hold a server thread
+for as long as they run, so the thread pool is sized for the SSE listener cap plus the
+long-running tools, with threads to spare for ordinary page/API requests.
+
+Run a single process. The background job scheduler (job_runner) holds its table and county
+locks in memory, so two gunicorn workers could run conflicting jobs on the same county's
+tables at once; --workers above 1 is refused, and a gunicorn command line must not pass
+--workers either. The caches (map, county context) and the live-event broker are per process
+as well. Scale with --threads instead.
+Restarts (PatchManager, /restart, SystemTools) go through server_control. Under gunicorn the
+app is imported in each worker, never in the master (no preload), so the workers a restart
+starts load patched code and the new db_config.json; do not pass --preload to gunicorn.
+"""
+import os
+import sys
+import argparse
+import importlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if __name__ == '__main__':
+    # Restarts re-execute this command line after the chdir below
+    sys.argv[0] = os.path.abspath(sys.argv[0])
+# app.py reads db_config.json / secret.key relative to the working directory
+os.chdir(BASE_DIR)
+if BASE_DIR not in sys.path: sys.path.insert(0, BASE_DIR)
+
+from live_events import MAX_SUBSCRIBERS  # noqa: E402
+from server_control import SERVER_ENV  # noqa: E402
+
+# [GSI_BLOCK: wsgi_tuning]
+STREAMING_THREADS = 8      # concurrent long tool runs (imports, scans, prep)
+REQUEST_THREADS = 8        # ordinary requests while all of the above are busy
+DEFAULT_THREADS = MAX_SUBSCRIBERS + STREAMING_THREADS + REQUEST_THREADS
+DEFAULT_WORKERS = 1
+CHANNEL_TIMEOUT = 600      # a tool may be silent for minutes inside one SQL statement
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5000
+# [GSI_END: wsgi_tuning]
+
+# [GSI_BLOCK: wsgi_servers]
+def load_application():
+    """Imports the Flask app in the calling process (a gunicorn worker, or waitress's only process)."""
+    app = importlib.import_module('app').app
+    if not app.config.get('DB_CONFIGURED'):
+        print(" !! WARNING: Database not configured. Go to /setup !!")
+    return app
+
+if __name__ != '__main__':
+    # Imported by a WSGI server (gunicorn wsgi:application, waitress-serve wsgi:application)
+    application = load_application()
+
+def run_waitress(host, port, threads):
+    from waitress import serve
+    os.environ[SERVER_ENV] = 'waitress'
+    application = load_application()
+    print(f" >>> waitress on {host}:{port} ({threads} threads)")
+    serve(application, host=host, port=port, threads=threads,
+          channel_timeout=CHANNEL_TIMEOUT, connection_limit=max(100, threads * 4))
+
+def run_gunicorn(host, port, threads, workers):
+    from gunicorn.app.base import BaseApplication
+    os.environ[SERVER_ENV] = 'gunicorn'
+
+    class StandaloneApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            # gthread heartbeats from its main loop, so long streams are not killed by this
+            self.cfg.set('timeout', 120)
+            self.cfg.set('graceful_timeout', 30)
+            self.cfg.set('keepalive', 5)
+            self.cfg.set('preload_app', False)
+
+        def load(self):
+            # Runs in each worker after the fork: a SIGHUP reload gets freshly imported code
+            return load_application()
+
+    print(f" >>> gunicorn on {host}:{port} ({workers} worker(s) x {threads} threads)")
+    StandaloneApplication().run()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the app with a production WSGI server.")
+    parser.add_argument('--server', choices=('waitress', 'gunicorn'),
+                        default=os.environ.get(SERVER_ENV) or 'waitress')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="gunicorn only; must be 1 (see above)")
+    args = parser.parse_args(argv)
+
+    if args.workers != 1:
+        parser.error("--workers must be 1: the job scheduler's table and county locks live in one process")
+    if args.server == 'gunicorn':
+        if os.name == 'nt':
+            parser.error("gunicorn does not run on Windows; use --server waitress")
+        run_gunicorn(args.host, args.port, args.threads, args.workers)
+    else:
+        run_waitress(args.host, args.port, args.threads)
+# [GSI_END: wsgi_servers]
+
+
+if __name__ == '__main__':
+    main()